@@ -4,16 +4,21 @@
 # - .env = GOOGLE_API_KEY="ABCDEFGHIJKLMNOPXYZ" muss gesetzt sein. Mit einem korrekten Key.
 # - functions/suchbegriffe.json = Enthält die Suchbegriffe. Kann erweitert werden.  
 # - config.py = Einstellen der Gemini Model Version
-# - matching/aussagen = Hier müssen die Ergebnisse aus top_down_klassifizierungs_report.xlsx (siehe unten) hinein kopiert werden. Name=JAHR.xlsx (z.b. 2019.xlsx). Benötigt, um zu vergleichen ob Aussagen in vergangenen Jahren bereits getätigt wurden.
+# - matching/aussagen = Hier müssen die Ergebnisse aus top_down_klassifizierungs_report.parquet bzw. .xlsx (siehe unten) hinein kopiert werden. Name=JAHR.parquet oder JAHR.xlsx (z.b. 2019.parquet). Benötigt, um zu vergleichen ob Aussagen in vergangenen Jahren bereits getätigt wurden.
 
 
 # Wo sind die Ergebnisse?
 # - text_passages/analyse/AI/JSON_Reports = Anteile pro Unternehmen an Kategrien, sowie Metadaten des Unternehmens
 # - text_passages/analyse/AI/Screenshots = Markierte Textstellen in den Berichten als PNG
-# - text_passages/analyse/AI/Top_Down_Analyse/top_down_klassifizierungs_report.xlsx = Alle Aussagen mit Kategorie, Status (planned/done) etc.
+# - text_passages/analyse/AI/Top_Down_Analyse/top_down_klassifizierungs_report.parquet = Alle Aussagen mit Kategorie, Status (planned/done) etc. Wird von allen nachgelagerten Schritten gelesen.
+# - text_passages/analyse/AI/Top_Down_Analyse/top_down_klassifizierungs_report.xlsx = Derselbe Report als Excel-Export zum Ansehen.
+# - matching/aussagen/_aussagen_index/JAHR.parquet = Kompakter Index der Aussagen je Jahr für den Abgleich mit früheren Jahren. Wird automatisch erstellt und bei Änderungen an JAHR.parquet/.xlsx neu aufgebaut.
+# - matching/aussagen_index.sqlite = Bereits klassifizierte (normalisierte) Aussagen über alle Unternehmen und Jahre. Bleibt zwischen den Jahren liegen, damit wiederkehrende Aussagen nicht erneut klassifiziert werden. Einträge gelten nur für dasselbe Modell und dieselben Prompts; aussagen_index_version in config.py erhöhen, um alle zu verwerfen.
+# - matching/smart_bewertungen.sqlite = SMART-Bewertungen je Aussage und Modell. Fehlgeschlagene Bewertungen stehen mit Fehlertext und Versuchen in der Tabelle 'fehler'; beim nächsten Lauf werden nur die in JAHR_analysis.json unter "smart_failed_statements" aufgeführten Aussagen wiederholt, nach smart_max_versuche Fehlschlägen nicht mehr (Zeile löschen, um es erneut zu versuchen).
 # ---> Die Ergebisse der aus top_down_klassifizierungs_report.xlsx müssen nach matching/aussagen kopiert werden (umbenennen auf JAHR.xlsx), damit verglichen werden kann, ob aussagen bereits in früheren Jahren getätigt wurden.
  
 
+import argparse
 import os
 from dotenv import load_dotenv
 from functions.setup import nltlk_setup
@@ -22,17 +27,23 @@ from functions.analyze_measures import analyze_measures_and_smartness
 from functions.AI_clustering import fuehre_top_down_klassifizierung_durch
 from functions.deduplicate_statements import deduplicate_globally_per_file
 from functions.find_actions_and_metrics import extract_details_from_passages
+from functions.postprocessing import fuehre_postprocessing_durch
 from functions.remove_empty_passages import bereinige_leere_passagen
-from functions.robust_matching import behebe_zuordnungsfehler
-from functions.screenshots import generate_screenshots
-from functions.statistics import generate_company_jsons
 from functions.status import status_setup
-from functions.summary_stats import generate_global_summary
 from functions.text_validation_gemini import text_validation_gemini
 from functions.text_extraction import text_extraction
 from functions.check_pdfs import clean_report_folder   
-    
-def main():
+from config import text_extraction_workers, postprocessing_parallel
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="BioDiv-Pipeline für Nachhaltigkeitsberichte")
+    parser.add_argument("--workers", type=int, default=text_extraction_workers,
+                        help="Anzahl paralleler Prozesse für die Text-Extraktion (1 = sequentiell)")
+    parser.add_argument("--parallel-postprocessing", action="store_true", default=postprocessing_parallel,
+                        help="Zusammenfassung, JSON-Reports und Screenshots gleichzeitig erstellen")
+    return parser.parse_args()
+
+def main(workers=text_extraction_workers, parallel_postprocessing=postprocessing_parallel):
     if not os.path.isdir(input_ordner):
         os.makedirs(input_ordner, exist_ok=True)
         
@@ -65,7 +76,7 @@ def main():
 # ========= >> Actions Identifikation << =========
 # > Beginne mit Identifikation relevanter Stellen (+/- 5 Sätze) anhand von Keywords
     print(">>>> Starte mit text_extraction <<<<< ")
-    text_extraction (input_ordner, text_passages_ordner)
+    text_extraction (input_ordner, text_passages_ordner, workers=workers)
 # > Prüfe, ob innerhalb der Stellen, wo die Keywords stehen, auch Maßnahmen oder Metriken bzgl BioDiv genannt werden, oder ob nur das Keyword genannt wird. Wenn ja, gib die Action/Metric +/- 2 Sätze zurück (5 Sätze insg.).
     print(">>>> Starte mit text_validation_gemini <<<<< ")
     text_validation_gemini(gemini_model_version, text_passages_ordner,relevant_text_passages_ordner)
@@ -85,26 +96,22 @@ def main():
 # ========= >>Clustering mit AI << =========
     print(">>>> Starte mit fuehre_top_down_klassifizierung_durch <<<<< ")
     fuehre_top_down_klassifizierung_durch(gemini_model_version, relevant_text_passages_ordner, "matching/sample_summary.xlsx", "text_passages/analyse/AI")
-    final_report_path = "text_passages/analyse/AI/Top_Down_Analyse/top_down_klassifizierungs_report.xlsx"
-    behebe_zuordnungsfehler(report_path=final_report_path, summary_path="matching/sample_summary.xlsx")
 # ========= >> ENDE AI Clustering << ========
 
 
 
 # ========= >> VISUALS & Statistics << =========
-    final_report_path = "text_passages/analyse/AI/Top_Down_Analyse/top_down_klassifizierungs_report.xlsx"
-    global_summary_output_path = "text_passages/analyse/AI/globaler_summary_report.xlsx"
-    generate_global_summary(data_path=final_report_path,output_path=global_summary_output_path)
-
-
-    json_output_folder = "text_passages/analyse/AI/JSON_Reports"
-    print(">>>> Starte mit generate_company_jsons <<<<< ")
-    generate_company_jsons(data_path=final_report_path,output_folder=json_output_folder)
-
-    screenshots_output_folder = "text_passages/analyse/AI/Screenshots"
-    pdf_reports_folder = "input"
-    print(">>>> Starte mit generate_screenshots <<<<< ")
-    generate_screenshots(report_path=final_report_path,pdf_folder=pdf_reports_folder,output_folder=screenshots_output_folder)
+# > Lädt den Report einmal, behebt Zuordnungsfehler im Speicher und erstellt Zusammenfassungen, JSON-Reports und Screenshots.
+    print(">>>> Starte mit fuehre_postprocessing_durch <<<<< ")
+    fuehre_postprocessing_durch(
+        report_path="text_passages/analyse/AI/Top_Down_Analyse/top_down_klassifizierungs_report.xlsx",
+        summary_path="matching/sample_summary.xlsx",
+        global_summary_output_path="text_passages/analyse/AI/globaler_summary_report.xlsx",
+        json_output_folder="text_passages/analyse/AI/JSON_Reports",
+        screenshots_output_folder="text_passages/analyse/AI/Screenshots",
+        pdf_folder="input",
+        parallel=parallel_postprocessing
+    )
 # ====== >> Ende VISUALS << =======
 
 
@@ -120,4 +127,5 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    main(workers=args.workers, parallel_postprocessing=args.parallel_postprocessing)
@@ -0,0 +1,68 @@
+# Vergleicht den Durchsatz der drei Einzel-Prompts mit der kombinierten (1 Aufruf pro Aussage) und der gebündelten Klassifizierung.
+# Aufruf aus dem Projektordner:  python -m benchmarks.bench_classification text_passages/relevant_text_passages/ --stichprobe 50
+# Ohne Kosten gegen den lokalen Fake-Server:  GEMINI_API_ENDPOINT=http://localhost:8765 python -m benchmarks.bench_classification ...
+import argparse
+import random
+import threading
+import time
+from config import gemini_model_version
+from functions.AI_clustering import _analysiere_aussage, _analysiere_aussagen, _extrahiere_alle_eintraege
+from functions.llm_client import get_llm_client
+
+
+# Zieht eine feste (reproduzierbare) Stichprobe von Aussagen.
+def _stichprobe(input_ordner, groesse, seed):
+    aussagen = sorted({eintrag["Aussage"] for eintrag in _extrahiere_alle_eintraege(input_ordner)})
+    random.Random(seed).shuffle(aussagen)
+    return aussagen[:groesse]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark: Einzel-Prompts vs. kombinierte vs. gebündelte Klassifizierung")
+    parser.add_argument("input_ordner", help="Ordner mit *_relevant_passages.json (inkl. actions/metrics)")
+    parser.add_argument("--stichprobe", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-groesse", type=int, default=25)
+    args = parser.parse_args()
+
+    aussagen = _stichprobe(args.input_ordner, args.stichprobe, args.seed)
+    if not aussagen:
+        raise SystemExit("Keine Aussagen gefunden.")
+
+    # Ohne Cache, damit beide Modi tatsächlich Requests senden; die Requests werden gezählt.
+    llm_client = get_llm_client(gemini_model_version)
+    llm_client.cache = None
+    zaehler = {"requests": 0}
+    zaehler_lock = threading.Lock()
+    original_senden = llm_client._sende
+
+    def zaehlendes_senden(*a, **kw):
+        with zaehler_lock:
+            zaehler["requests"] += 1
+        return original_senden(*a, **kw)
+
+    llm_client._sende = zaehlendes_senden
+
+    ergebnisse = {}
+    print(f"{'Modus':12s} {'Aussagen':>9s} {'Requests':>9s} {'Sekunden':>9s} {'Aussagen/s':>11s}")
+    modi = {
+        "einzeln": lambda: llm_client.map(lambda aussage: _analysiere_aussage(gemini_model_version, aussage, kombiniert=False), aussagen),
+        "kombiniert": lambda: llm_client.map(lambda aussage: _analysiere_aussage(gemini_model_version, aussage, kombiniert=True), aussagen),
+        "batch": lambda: _analysiere_aussagen(gemini_model_version, aussagen, batch_groesse=args.batch_groesse),
+    }
+    for modus, klassifiziere in modi.items():
+        zaehler["requests"] = 0
+        start = time.perf_counter()
+        ergebnisse[modus] = list(klassifiziere())
+        dauer = time.perf_counter() - start
+        print(f"{modus:12s} {len(aussagen):9d} {zaehler['requests']:9d} {dauer:9.1f} {len(aussagen) / dauer:11.2f}")
+
+    # Übereinstimmung mit den Einzel-Prompts pro Feld (ohne Beachtung der Groß-/Kleinschreibung).
+    for modus in ["kombiniert", "batch"]:
+        for i, feld in enumerate(["Kategorie", "Status", "Metric"]):
+            gleich = sum(a[i].strip().lower() == b[i].strip().lower() for a, b in zip(ergebnisse["einzeln"], ergebnisse[modus]))
+            print(f"Übereinstimmung {modus} / einzeln, {feld}: {gleich / len(aussagen) * 100:.1f} %")
+
+
+if __name__ == "__main__":
+    main()
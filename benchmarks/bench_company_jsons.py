@@ -0,0 +1,145 @@
+# Vergleicht die bisherige Berechnung der Unternehmens-JSONs (Schleifen pro Unternehmen und Metrik) mit der vektorisierten.
+# Aufruf aus dem Projektordner:  python -m benchmarks.bench_company_jsons --unternehmen 600 10000
+import argparse
+import json
+import random
+import time
+import pandas as pd
+from functions.statistics import berechne_company_reports
+
+KATEGORIEN = ["Research", "Monitoring & Assessment", "Governance & Strategy & Plans", "Creating new Trees & Plants",
+              "Protecting existing Animals & Wildlife", "Water & Coast & Ocean", "Pollution Control", "General statement"]
+KEYWORDS = ["biodiversity", "habitat", "species", "ecosystem", "wetland", "forest", "pollinator", "tnfd", "nature"]
+
+
+# Erzeugt einen synthetischen, gefilterten Report mit 'anzahl' Unternehmen.
+def _synthetischer_report(anzahl, aussagen_pro_unternehmen, seed):
+    rng = random.Random(seed)
+    zeilen = []
+    for i in range(anzahl):
+        metadaten = {
+            "Company": f"Company {i}",
+            "Country": f"Land {rng.randrange(30)}",
+            "Rating": rng.choice(["AAA", "AA", "A", "BBB", "BB", "B", "CCC"]),
+            "Primary Listing": f"Börse {rng.randrange(15)}",
+            "Industry Classification": f"Branche {rng.randrange(60)}",
+        }
+        for _ in range(rng.randint(1, 2 * aussagen_pro_unternehmen)):
+            zeilen.append({
+                **metadaten,
+                "Kategorie": rng.choice(KATEGORIEN),
+                "Status": rng.choice(["done", "planned"]),
+                "Keywords": ", ".join(rng.sample(KEYWORDS, rng.randint(0, 3))),
+            })
+    return pd.DataFrame(zeilen)
+
+
+def _bisherige_berechnung(df_relevant):
+    # Entspricht der alten Implementierung aus statistics.generate_company_jsons (ohne Datei-Ausgabe).
+    irrelevant_categories = ["No Biodiversity Relevance", "API Fehler"]
+    all_possible_categories = sorted([cat for cat in df_relevant['Kategorie'].unique() if cat not in irrelevant_categories])
+    company_metadata = df_relevant.drop_duplicates(subset='Company')[[
+        'Company', 'Country', 'Rating', 'Primary Listing', 'Industry Classification'
+    ]].set_index('Company')
+    df_metrics = company_metadata.copy()
+    df_metrics['total_relevant_statements'] = df_relevant.groupby('Company').size()
+    df_metrics['total_done'] = df_relevant[df_relevant['Status'] == 'done'].groupby('Company').size()
+    df_metrics['total_planned'] = df_relevant[df_relevant['Status'] == 'planned'].groupby('Company').size()
+    df_metrics.fillna(0, inplace=True)
+    df_metrics['total_done_percent'] = (df_metrics['total_done'] / df_metrics['total_relevant_statements']).fillna(0)
+    df_metrics['total_planned_percent'] = (df_metrics['total_planned'] / df_metrics['total_relevant_statements']).fillna(0)
+    category_counts_abs = df_relevant.groupby(['Company', 'Kategorie']).size().unstack(fill_value=0)
+    df_metrics = df_metrics.join(category_counts_abs.add_suffix('_abs'))
+    category_counts_done = df_relevant[df_relevant['Status'] == 'done'].groupby(['Company', 'Kategorie']).size().unstack(fill_value=0)
+    df_metrics = df_metrics.join(category_counts_done.add_suffix('_done_abs'))
+    for cat in all_possible_categories:
+        abs_col = f'{cat}_abs'
+        done_col = f'{cat}_done_abs'
+        pct_col = f'{cat}_done_percent'
+        if abs_col in df_metrics and done_col in df_metrics:
+            df_metrics[pct_col] = (df_metrics[done_col] / df_metrics[abs_col]).fillna(0)
+    df_metrics.fillna(0, inplace=True)
+    metrics_to_rank = [col for col in df_metrics.columns if col not in ['Country', 'Rating', 'Primary Listing', 'Industry Classification']]
+    rank_dimensions = {'by_country': 'Country', 'by_industry': 'Industry Classification', 'by_rating': 'Rating', 'by_listing': 'Primary Listing'}
+    df_rankings = df_metrics.copy()
+    for metric in metrics_to_rank:
+        df_rankings[f"percentile_{metric}_global"] = df_rankings[metric].rank(pct=True)
+        for rank_name, group_col in rank_dimensions.items():
+            df_rankings[f"percentile_{metric}_{rank_name}"] = df_rankings.groupby(group_col)[metric].rank(pct=True)
+
+    ergebnisse = {}
+    for company in df_relevant['Company'].unique():
+        if company not in df_metrics.index: continue
+        company_metrics = df_metrics.loc[company]
+        company_ranks = df_rankings.loc[company]
+        df_company = df_relevant[df_relevant['Company'] == company].copy()
+        df_company['Keywords'] = df_company['Keywords'].fillna('')
+        all_keywords_set = set(kw.strip() for keywords_str in df_company['Keywords'] for kw in keywords_str.split(',') if kw.strip())
+        company_data = {
+            "company_name": company,
+            "country": company_metrics.get('Country', 'N/A'),
+            "rating": company_metrics.get('Rating', 'N/A'),
+            "primary_listing": company_metrics.get('Primary Listing', 'N/A'),
+            "industry_classification": company_metrics.get('Industry Classification', 'N/A'),
+            "rankings": {},
+            "metrics": {
+                "total_relevant_statements": int(company_metrics.get('total_relevant_statements', 0)),
+                "total_done": int(company_metrics.get('total_done', 0)),
+                "total_planned": int(company_metrics.get('total_planned', 0)),
+                "total_done_percent": round(company_metrics.get('total_done_percent', 0.0), 4),
+                "total_planned_percent": round(company_metrics.get('total_planned_percent', 0.0), 4),
+                "by_category": {}
+            },
+            "all_found_keywords": sorted(list(all_keywords_set))
+        }
+        for metric in metrics_to_rank:
+            grouped_ranks = {
+                f"{rank_name}_percentile": round(company_ranks.get(f"percentile_{metric}_{rank_name}", 0.0), 4)
+                for rank_name in rank_dimensions.keys()
+            }
+            grouped_ranks['global_percentile'] = round(company_ranks.get(f"percentile_{metric}_global", 0.0), 4)
+            company_data["rankings"][metric] = grouped_ranks
+        for cat in all_possible_categories:
+            absolute_count = int(company_metrics.get(f'{cat}_abs', 0))
+            total_statements = int(company_metrics.get('total_relevant_statements', 0))
+            percent_of_total = round((absolute_count / total_statements), 4) if total_statements > 0 else 0.0
+            company_data["metrics"]["by_category"][cat] = {
+                "absolute": absolute_count,
+                "percent_of_total": percent_of_total,
+                "done_absolute": int(company_metrics.get(f'{cat}_done_abs', 0)),
+                "done_percent": round(company_metrics.get(f'{cat}_done_percent', 0.0), 4)
+            }
+        ergebnisse[company] = company_data
+    return ergebnisse
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark: Unternehmens-JSONs bisher vs. vektorisiert")
+    parser.add_argument("--unternehmen", type=int, nargs="+", default=[600, 10000])
+    parser.add_argument("--aussagen", type=int, default=20, help="Durchschnittliche Aussagen pro Unternehmen")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--ohne-bisherige", action="store_true", help="Nur die vektorisierte Variante messen")
+    args = parser.parse_args()
+
+    print(f"{'Unternehmen':>11s} {'Zeilen':>8s} {'bisher [s]':>11s} {'neu [s]':>9s} {'Faktor':>7s} {'identisch':>10s}")
+    for anzahl in args.unternehmen:
+        df_relevant = _synthetischer_report(anzahl, args.aussagen, args.seed)
+
+        start = time.perf_counter()
+        neu = berechne_company_reports(df_relevant)
+        dauer_neu = time.perf_counter() - start
+
+        if args.ohne_bisherige:
+            print(f"{anzahl:11d} {len(df_relevant):8d} {'-':>11s} {dauer_neu:9.2f} {'-':>7s} {'-':>10s}")
+            continue
+
+        start = time.perf_counter()
+        bisher = _bisherige_berechnung(df_relevant)
+        dauer_bisher = time.perf_counter() - start
+
+        identisch = json.dumps(bisher, ensure_ascii=False, indent=4) == json.dumps(neu, ensure_ascii=False, indent=4)
+        print(f"{anzahl:11d} {len(df_relevant):8d} {dauer_bisher:11.2f} {dauer_neu:9.2f} {dauer_bisher / dauer_neu:7.1f} {str(identisch):>10s}")
+
+
+if __name__ == "__main__":
+    main()
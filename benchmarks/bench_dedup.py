@@ -0,0 +1,76 @@
+# Vergleicht die bisherige Deduplizierung (SequenceMatcher, paarweise in Python) mit der blockweisen rapidfuzz-Variante.
+# Aufruf aus dem Projektordner:  python -m benchmarks.bench_dedup --aussagen 500 2000 5000
+import argparse
+import random
+import time
+from difflib import SequenceMatcher
+from functions.deduplicate_statements import _remove_near_duplicates
+
+SUBJEKTE = ["We", "The Group", "Our company", "The site team", "Our suppliers"]
+VERBEN = ["planted", "restored", "monitored", "protected", "assessed", "reduced", "mapped", "funded"]
+OBJEKTE = ["hectares of wetland", "native tree species", "pollinator habitats", "river banks", "bird populations",
+           "water abstraction", "invasive species", "grassland areas", "coral reefs", "forest corridors"]
+ORTE = ["near our main plant", "in Germany", "at 12 quarry sites", "across Europe", "in the Amazon basin", "in 2023"]
+
+
+# Erzeugt Aussagen, von denen ein Teil leicht abgewandelte Wiederholungen früherer Aussagen sind.
+def _synthetische_aussagen(anzahl, anteil_varianten, seed):
+    rng = random.Random(seed)
+    aussagen = []
+    for _ in range(anzahl):
+        if aussagen and rng.random() < anteil_varianten:
+            basis = rng.choice(aussagen)
+            varianten = [basis + ".", basis.replace(" ", "  ", 1), basis.replace("our", "the", 1), basis.upper(), basis[:-3]]
+            aussagen.append(rng.choice(varianten))
+        else:
+            aussagen.append(f"{rng.choice(SUBJEKTE)} {rng.choice(VERBEN)} {rng.randint(1, 5000)} {rng.choice(OBJEKTE)} "
+                            f"{rng.choice(ORTE)} as part of programme {rng.randint(1, 999)}")
+    return aussagen
+
+
+def _bisherige_deduplizierung(statements, similarity_threshold=0.9):
+    # Entspricht der alten Implementierung aus deduplicate_statements._remove_near_duplicates.
+    unique_statements = []
+    for statement in statements:
+        is_duplicate = False
+        for unique_statement in unique_statements:
+            if SequenceMatcher(None, statement, unique_statement).ratio() > similarity_threshold:
+                is_duplicate = True
+                break
+        if not is_duplicate:
+            unique_statements.append(statement)
+    return unique_statements
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark: Deduplizierung SequenceMatcher vs. rapidfuzz cdist")
+    parser.add_argument("--aussagen", type=int, nargs="+", default=[500, 2000, 5000])
+    parser.add_argument("--anteil-varianten", type=float, default=0.3, help="Anteil der Aussagen, die Varianten früherer Aussagen sind")
+    parser.add_argument("--schwelle", type=float, default=0.9)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--ohne-bisherige", action="store_true", help="Nur die rapidfuzz-Variante messen")
+    args = parser.parse_args()
+
+    print(f"{'Aussagen':>9s} {'eindeutig':>10s} {'bisher [s]':>11s} {'neu [s]':>9s} {'Faktor':>7s} {'abweichend':>11s}")
+    for anzahl in args.aussagen:
+        aussagen = _synthetische_aussagen(anzahl, args.anteil_varianten, args.seed)
+
+        start = time.perf_counter()
+        neu = _remove_near_duplicates(aussagen, args.schwelle)
+        dauer_neu = time.perf_counter() - start
+
+        if args.ohne_bisherige:
+            print(f"{anzahl:9d} {len(neu):10d} {'-':>11s} {dauer_neu:9.3f} {'-':>7s} {'-':>11s}")
+            continue
+
+        start = time.perf_counter()
+        bisher = _bisherige_deduplizierung(aussagen, args.schwelle)
+        dauer_bisher = time.perf_counter() - start
+
+        # Aussagen, die nur eine der beiden Varianten behält (fuzz.ratio nutzt die exakte LCS, SequenceMatcher eine Heuristik).
+        abweichend = len(set(bisher) ^ set(neu))
+        print(f"{anzahl:9d} {len(neu):10d} {dauer_bisher:11.2f} {dauer_neu:9.3f} {dauer_bisher / dauer_neu:7.1f} {abweichend:11d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# Vergleicht die bisherige Doppel-Lemmatisierung (Seite + jeder Satz) mit dem einzelnen nlp.pipe-Durchlauf.
+# Aufruf aus dem Projektordner:  python -m benchmarks.bench_lemmatization input/GROSSER_BERICHT.pdf
+import argparse
+import re
+import time
+import fitz
+import nltk
+from functions.keyword_matcher import KeywordMatcher
+from functions.nlp_models import SUPPORTED_LANGUAGES, lade_spacy_modell
+from functions.text_extraction import (
+    _analysiere_dokument, _kleinschreibung_laengentreu, _normalisiere_seitentext,
+    clean_text, detect_language, lade_suchbegriffe, lemmatize_text
+)
+
+
+def _bisheriger_ablauf(doc, nlp, nltk_lang, keyword_regex):
+    # Entspricht der alten Implementierung: jede Seite lemmatisieren, danach jeden Satz der Treffer-Seiten erneut.
+    saetze = []
+    for page in doc:
+        page_text_original = page.get_text("text")
+        if not page_text_original or not page_text_original.strip():
+            continue
+        if keyword_regex.search(lemmatize_text(clean_text(page_text_original), nlp)):
+            for s in nltk.sent_tokenize(page_text_original.replace('\n', ' '), language=nltk_lang):
+                if s.strip():
+                    saetze.append(s.strip())
+    return [i for i, s in enumerate(saetze) if keyword_regex.search(lemmatize_text(clean_text(s), nlp))]
+
+
+def _neuer_ablauf(doc, nlp, nltk_lang, lemma_matcher, satztrennung):
+    indices = []
+    n = 0
+    for seite in _analysiere_dokument(doc, nlp, nltk_lang, satztrennung):
+        if not lemma_matcher.search(" ".join(seite["lemmata"])):
+            continue
+        for satz_lemmata in seite["lemmata"]:
+            if lemma_matcher.search(satz_lemmata):
+                indices.append(n)
+            n += 1
+    return indices
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark: Lemmatisierung bisher vs. ein Durchlauf")
+    parser.add_argument("pdf")
+    parser.add_argument("--suchbegriffe", default="./functions/suchbegriffe.json")
+    parser.add_argument("--satztrennung", choices=["nltk", "spacy"], default="nltk")
+    parser.add_argument("--wiederholungen", type=int, default=3)
+    args = parser.parse_args()
+
+    doc = fitz.open(args.pdf)
+    sample_text = "".join(doc.load_page(i).get_text("text") for i in range(min(3, doc.page_count)))
+    lang_code = detect_language(sample_text)
+    if lang_code not in SUPPORTED_LANGUAGES:
+        raise SystemExit(f"Sprache '{lang_code}' wird nicht unterstützt.")
+    nlp = lade_spacy_modell(lang_code)
+    nltk_lang = SUPPORTED_LANGUAGES[lang_code]['nltk']
+
+    suchbegriffe = lade_suchbegriffe(args.suchbegriffe).get(lang_code, [])
+    lemmatized_keywords = [lemmatize_text(clean_text(kw), nlp) for kw in suchbegriffe]
+    keyword_regex = re.compile(r"\b(" + "|".join(re.escape(kw) for kw in lemmatized_keywords) + r")\b", re.IGNORECASE)
+    lemma_matcher = KeywordMatcher(lemmatized_keywords)
+
+    # Gemeinsamer Nenner für beide Varianten: Anzahl Tokens des Dokuments.
+    anzahl_tokens = sum(
+        len(nlp.tokenizer(_kleinschreibung_laengentreu(_normalisiere_seitentext(page.get_text("text")))))
+        for page in doc
+    )
+    print(f"Dokument: {args.pdf} ({doc.page_count} Seiten, {anzahl_tokens} Tokens, Sprache {lang_code})")
+
+    for name, ablauf in [
+        ("bisher (Seite + Satz)", lambda: _bisheriger_ablauf(doc, nlp, nltk_lang, keyword_regex)),
+        (f"neu (ein Durchlauf, {args.satztrennung})", lambda: _neuer_ablauf(doc, nlp, nltk_lang, lemma_matcher, args.satztrennung)),
+    ]:
+        dauer = float("inf")
+        for _ in range(args.wiederholungen):
+            start = time.perf_counter()
+            treffer = ablauf()
+            dauer = min(dauer, time.perf_counter() - start)
+        print(f"{name:32s} {dauer:8.2f}s  {anzahl_tokens / dauer:10.0f} Tokens/s  {len(treffer)} Keyword-Sätze")
+
+    doc.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# Misst Seiten/s pro Sprachmodell für verschiedene nlp.pipe-Einstellungen (batch_size, n_process).
+# Aufruf aus dem Projektordner:  python -m benchmarks.bench_spacy_pipe input/ --batch-sizes 8 32 128 --n-process 1 4
+import argparse
+import os
+import time
+from collections import defaultdict
+import fitz
+from functions.nlp_models import SUPPORTED_LANGUAGES, lade_spacy_modell
+from functions.text_extraction import _kleinschreibung_laengentreu, _normalisiere_seitentext, detect_language
+
+
+# Sammelt die Seitentexte aller PDFs, gruppiert nach erkannter Sprache.
+def _sammle_seiten(pdf_ordner, max_seiten):
+    seiten_pro_sprache = defaultdict(list)
+    for dateiname in sorted(os.listdir(pdf_ordner)):
+        if not dateiname.lower().endswith(".pdf"):
+            continue
+        with fitz.open(os.path.join(pdf_ordner, dateiname)) as doc:
+            sample_text = "".join(doc.load_page(i).get_text("text") for i in range(min(3, doc.page_count)))
+            lang_code = detect_language(sample_text)
+            if lang_code not in SUPPORTED_LANGUAGES or len(seiten_pro_sprache[lang_code]) >= max_seiten:
+                continue
+            for page in doc:
+                text = page.get_text("text")
+                if text and text.strip():
+                    seiten_pro_sprache[lang_code].append(_kleinschreibung_laengentreu(_normalisiere_seitentext(text)))
+    return {lang: seiten[:max_seiten] for lang, seiten in seiten_pro_sprache.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark: nlp.pipe Seiten/s pro Sprachmodell")
+    parser.add_argument("pdf_ordner")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--n-process", type=int, nargs="+", default=[1])
+    parser.add_argument("--max-seiten", type=int, default=500, help="Maximale Seitenzahl pro Sprache")
+    args = parser.parse_args()
+
+    seiten_pro_sprache = _sammle_seiten(args.pdf_ordner, args.max_seiten)
+    if not seiten_pro_sprache:
+        raise SystemExit("Keine auswertbaren PDFs gefunden.")
+
+    print(f"{'Sprache':8s} {'Modell':18s} {'batch':>6s} {'proc':>5s} {'Seiten':>7s} {'Seiten/s':>10s}")
+    for lang_code, seiten in sorted(seiten_pro_sprache.items()):
+        nlp = lade_spacy_modell(lang_code)
+        for n_process in args.n_process:
+            for batch_size in args.batch_sizes:
+                start = time.perf_counter()
+                for _ in nlp.pipe(seiten, batch_size=batch_size, n_process=n_process):
+                    pass
+                dauer = time.perf_counter() - start
+                print(f"{lang_code:8s} {SUPPORTED_LANGUAGES[lang_code]['spacy']:18s} {batch_size:6d} {n_process:5d} {len(seiten):7d} {len(seiten) / dauer:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
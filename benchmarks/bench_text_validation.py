@@ -0,0 +1,122 @@
+# Misst den Aufwand pro Passage in text_validation_gemini ohne Netzwerk: die API-Antwort ist fest vorgegeben, der LLM-Cache ausgeschaltet.
+# Verglichen werden der ursprüngliche Ablauf (Modell je Passage neu erstellt, Text zweimal in Sätze zerlegt),
+# der geteilte Client mit doppelter Zerlegung und der aktuelle Ablauf (eine Zerlegung, ein Client).
+# Zusätzlich wird geprüft, dass die Antwort "keine relevanten Sätze" (leere Liste) im LLM-Cache landet und wiederverwendet wird.
+# Aufruf aus dem Projektordner:  python -m benchmarks.bench_text_validation --passagen 2000 --saetze 12
+#                          oder:  python -m benchmarks.bench_text_validation --ordner text_passages/biodiv_text_passages
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import google.generativeai as genai
+import nltk
+from config import gemini_model_version
+from functions.llm_cache import LLMCache
+from functions.llm_client import get_llm_client
+from functions.text_validation_gemini import (
+    _kontext_fenster, _parse_key_sentence_indices, get_key_sentence_indices_from_api, prompt_extraction
+)
+
+SAETZE = [
+    "In 2023 we restored {n} hectares of wetland near our main production site.",
+    "Biodiversity is essential for the long-term resilience of our business.",
+    "We will monitor the return of {n} native bird species as a key success metric.",
+    "The Kunming-Montreal Global Biodiversity Framework sets ambitious goals.",
+    "Our suppliers must comply with the no-deforestation policy by 2025.",
+    "We funded {n} research projects on pollinator habitats.",
+]
+
+
+# Erzeugt reproduzierbare Passagen mit jeweils 'saetze' Sätzen.
+def _synthetische_passagen(anzahl, saetze, seed):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(SAETZE).format(n=rng.randint(1, 5000)) for _ in range(saetze)) for _ in range(anzahl)]
+
+def _passagen_aus_ordner(ordner):
+    passagen = []
+    for fname in sorted(os.listdir(ordner)):
+        if fname.lower().endswith(".json"):
+            with open(os.path.join(ordner, fname), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            passagen.extend(p["passage_text"] for p in data.get("extracted_passages", []) if p.get("passage_text", ""))
+    return passagen
+
+
+# Entspricht dem ursprünglichen Ablauf: Zerlegung und Modell-Erstellung in der API-Hilfsfunktion, danach erneute Zerlegung.
+def _bisheriger_ablauf(llm_client, passage_text, neues_modell):
+    all_sentences = nltk.sent_tokenize(passage_text)
+    if not all_sentences:
+        return []
+    if neues_modell:
+        genai.configure(api_key=os.getenv("GOOGLE_API_KEY") or "benchmark")
+        genai.GenerativeModel(gemini_model_version)
+    numbered_sentences_str = "\n".join(f"{i+1}. {s}" for i, s in enumerate(all_sentences))
+    raw = llm_client.generate(
+        prompt_extraction.format(numbered_sentences=numbered_sentences_str),
+        generation_config={"response_mime_type": "application/json"},
+        template_id="key_sentence_indices",
+        validate=_parse_key_sentence_indices
+    ).strip()
+    key_indices = _parse_key_sentence_indices(raw)
+    all_sentences = nltk.sent_tokenize(passage_text)
+    return _kontext_fenster(len(all_sentences), key_indices, window_size=2)
+
+def _neuer_ablauf(passage_text):
+    all_sentences = nltk.sent_tokenize(passage_text)
+    key_indices = get_key_sentence_indices_from_api(gemini_model_version, all_sentences)
+    return _kontext_fenster(len(all_sentences), key_indices, window_size=2)
+
+
+# Zwei Aufrufe mit derselben Passage und leerer Antwort in einem temporären Cache: der zweite darf keine Anfrage senden.
+def _pruefe_leere_antwort_im_cache(llm_client, passage_text) -> bool:
+    anfragen = []
+    sende, cache = llm_client._sende, llm_client.cache
+    with tempfile.TemporaryDirectory() as ordner:
+        llm_client.cache = LLMCache(os.path.join(ordner, "cache.sqlite"), 1024 * 1024)
+        llm_client._sende = lambda prompt, generation_config=None, request_options=None: anfragen.append(prompt) or '{"key_sentence_indices": []}'
+        try:
+            ergebnisse = [_neuer_ablauf(passage_text) for _ in range(2)]
+        finally:
+            llm_client.cache.close()
+            llm_client._sende, llm_client.cache = sende, cache
+    return ergebnisse == [[], []] and len(anfragen) == 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark: Aufwand pro Passage in text_validation_gemini (ohne Netzwerk)")
+    parser.add_argument("--ordner", help="Ordner mit den JSON-Dateien der Keyword-Passagen (statt synthetischer Passagen)")
+    parser.add_argument("--passagen", type=int, default=2000)
+    parser.add_argument("--saetze", type=int, default=12, help="Sätze pro synthetischer Passage")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    passagen = _passagen_aus_ordner(args.ordner) if args.ordner else _synthetische_passagen(args.passagen, args.saetze, args.seed)
+    if not passagen:
+        raise SystemExit("Keine Passagen gefunden.")
+
+    # Netzwerk und Cache ausschalten: jede Anfrage liefert sofort dieselbe gültige Antwort.
+    llm_client = get_llm_client(gemini_model_version)
+    llm_client.cache = None
+    llm_client._sende = lambda prompt, generation_config=None, request_options=None: '{"key_sentence_indices": [2, 4]}'
+
+    modi = {
+        "bisher": lambda text: _bisheriger_ablauf(llm_client, text, neues_modell=True),
+        "geteilt": lambda text: _bisheriger_ablauf(llm_client, text, neues_modell=False),
+        "neu": _neuer_ablauf,
+    }
+    ergebnisse = {}
+    print(f"{'Modus':8s} {'Passagen':>9s} {'Sekunden':>9s} {'µs/Passage':>11s}")
+    for modus, ablauf in modi.items():
+        start = time.perf_counter()
+        ergebnisse[modus] = [ablauf(text) for text in passagen]
+        dauer = time.perf_counter() - start
+        print(f"{modus:8s} {len(passagen):9d} {dauer:9.3f} {dauer / len(passagen) * 1e6:11.1f}")
+
+    print(f"\nKontextfenster identisch: {ergebnisse['bisher'] == ergebnisse['geteilt'] == ergebnisse['neu']}")
+    print(f"Leere Antwort aus dem Cache wiederverwendet: {_pruefe_leere_antwort_im_cache(llm_client, passagen[0])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Lokaler Ersatz für die Gemini-REST-API, um den LLM-Client ohne Kosten und Netzwerk zu testen.
+# Start:   python -m benchmarks.fake_gemini_server --port 8765 --latenz 0.5 --fehlerquote 0.1
+# Nutzung: GEMINI_API_ENDPOINT=http://localhost:8765 python app.py
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    latenz = 0.5
+    fehlerquote = 0.0
+    antwort = "done"
+    _zaehler_lock = threading.Lock()
+    anfragen = 0
+    gleichzeitig = 0
+    max_gleichzeitig = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _sende_json(self, status_code: int, daten: dict):
+        body = json.dumps(daten).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        laenge = int(self.headers.get("Content-Length", 0))
+        anfrage = json.loads(self.rfile.read(laenge) or b"{}")
+        cls = type(self)
+        with cls._zaehler_lock:
+            cls.anfragen += 1
+            cls.gleichzeitig += 1
+            cls.max_gleichzeitig = max(cls.max_gleichzeitig, cls.gleichzeitig)
+        try:
+            if not self.path.endswith(":generateContent"):
+                self._sende_json(404, {"error": {"code": 404, "message": "Nicht unterstützt", "status": "NOT_FOUND"}})
+                return
+            time.sleep(cls.latenz)
+            if random.random() < cls.fehlerquote:
+                self._sende_json(429, {"error": {"code": 429, "message": "Resource has been exhausted", "status": "RESOURCE_EXHAUSTED"}})
+                return
+
+            prompt = "".join(part.get("text", "") for content in anfrage.get("contents", []) for part in content.get("parts", []))
+            prompt_tokens = max(1, len(prompt) // 4)
+            self._sende_json(200, {
+                "candidates": [{
+                    "content": {"parts": [{"text": cls.antwort}], "role": "model"},
+                    "finishReason": "STOP",
+                    "index": 0
+                }],
+                "usageMetadata": {
+                    "promptTokenCount": prompt_tokens,
+                    "candidatesTokenCount": 1,
+                    "totalTokenCount": prompt_tokens + 1
+                }
+            })
+        finally:
+            with cls._zaehler_lock:
+                cls.gleichzeitig -= 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lokaler Fake-Server für die Gemini-API (generateContent).")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latenz", type=float, default=0.5, help="Antwortzeit pro Request in Sekunden.")
+    parser.add_argument("--fehlerquote", type=float, default=0.0, help="Anteil der Requests, die mit 429 beantwortet werden.")
+    parser.add_argument("--antwort", default="done", help="Text, den jede erfolgreiche Antwort enthält.")
+    args = parser.parse_args()
+
+    FakeGeminiHandler.latenz = args.latenz
+    FakeGeminiHandler.fehlerquote = args.fehlerquote
+    FakeGeminiHandler.antwort = args.antwort
+
+    server = ThreadingHTTPServer(("localhost", args.port), FakeGeminiHandler)
+    print(f"Fake-Gemini-Server läuft auf http://localhost:{args.port} (Latenz {args.latenz}s, Fehlerquote {args.fehlerquote}).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Anfragen gesamt: {FakeGeminiHandler.anfragen}, maximal gleichzeitig: {FakeGeminiHandler.max_gleichzeitig}")
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
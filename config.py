@@ -5,3 +5,29 @@ relevant_text_passages_ordner =  "text_passages/relevant_text_passages/"
 analyse_ordner = "text_passages/analyse/"
 aussagen_alle_jahre_ornder = "matching/aussagen"
 gemini_model_version = "gemini-2.5-flash"
+max_geladene_spacy_modelle = 3
+text_extraction_workers = 1
+satztrennung = "nltk"
+spacy_batch_size = 32
+spacy_n_process = 1
+analyse_cache_ordner = "text_passages/_analyse_cache/"
+gemini_max_concurrency = 8
+gemini_requests_per_minute = 1000
+gemini_tokens_per_minute = 1000000
+gemini_max_retries = 5
+llm_cache_pfad = "text_passages/_llm_cache.sqlite"
+llm_cache_max_mb = 1024
+kombinierte_klassifizierung = True
+klassifizierung_batch_groesse = 25
+klassifizierung_batch_token_budget = 3000
+postprocessing_parallel = False
+screenshot_workers = 4
+dedup_aehnlichkeit_schwelle = 0.9
+dedup_chunk_groesse = 512
+aussagen_index_pfad = "matching/aussagen_index.sqlite"
+aussagen_index_schwelle = 0.97
+smart_speicher_pfad = "matching/smart_bewertungen.sqlite"
+smart_batch_groesse = 20
+smart_batch_token_budget = 3000
+aussagen_index_version = 1
+smart_max_versuche = 3
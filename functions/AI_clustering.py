@@ -1,11 +1,17 @@
 import os
 import json
+import hashlib
 import pandas as pd
-import time
 from dotenv import load_dotenv
-import google.generativeai as genai
-import re
+from itertools import chain
 from tqdm import tqdm
+from config import kombinierte_klassifizierung, klassifizierung_batch_groesse, klassifizierung_batch_token_budget, aussagen_index_pfad, aussagen_index_schwelle, aussagen_index_version
+from functions.company_index import create_robust_merge_key, lade_unternehmens_index
+from functions.deduplicate_statements import finde_repraesentanten
+from functions.llm_client import get_llm_client, schaetze_tokens
+from functions.provenienz import als_json, aus_seitenangabe, seiten_angabe
+from functions.report_io import speichere_report
+from functions.statement_index import AussagenIndex, normalisiere_aussage, zahlen_signatur
 
 
 load_dotenv()
@@ -61,12 +67,12 @@ You are a balanced but precise classification engine. Your task is to classify c
 - **If no direct and explicit link to a biodiversity outcome is described, your final and only answer is "No Biodiversity Relevance". Stop here.**
 
 **Step 3: Provisional Classification**
-- **If the statement passes the gate, its category is now provisionally "General Statement".**
+- **If the statement passes the gate, its category is now provisionally "General statement".**
 
 **Step 4: Specific Category Refinement**
 - Now, review the other categories.
-- To move the statement from "General Statement" to a more specific category, there must be a **clear and concrete description of a specific action**. A vague intention is not sufficient.
-- If you are unsure, or if the statement remains a high-level commitment, the classification defaults to **"General Statement"**.
+- To move the statement from "General statement" to a more specific category, there must be a **clear and concrete description of a specific action**. A vague intention is not sufficient.
+- If you are unsure, or if the statement remains a high-level commitment, the classification defaults to **"General statement"**.
 
 **Crucially, respond *only* with the category name itself.** Do not add any explanation, introduction, or quotation marks.
 
@@ -117,7 +123,60 @@ Respond *only* with one of the exact following values: **CSRD / ESRS**, **GRI**,
 **Framework Metric:**
 """
 
+# Gemeinsame Kriterien für die kombinierte Klassifizierung einzelner Aussagen und ganzer Batches.
+KLASSIFIZIERUNGS_KRITERIEN = """
+**1. "category"** – Follow this hierarchical logic:
+- Your default assumption is **"No Biodiversity Relevance"**.
+- The statement is only relevant if it establishes a **direct and explicit link** between its core action and a tangible biodiversity outcome (ecosystems, habitats or species). The action must be the *cause*, the biodiversity outcome the *direct effect*. A simple mention of "environment" or "sustainability" is not enough.
+- Statements focused primarily on general CO2/GHG reduction or climate action, energy efficiency or renewables, general water usage reduction, or general waste reduction/recycling/circular economy are **NOT** relevant, UNLESS they explicitly describe a specific habitat or species outcome.
+- If the statement passes this gate, its category is provisionally **"General statement"**. Only move it to a more specific category if there is a **clear and concrete description of a specific action**. If unsure, keep "General statement".
+- The value must be exactly one of the predefined categories:
+{category_list}
+
+**2. "status"** – **"planned"** if the statement describes a future goal, plan or intention (e.g., "we will," "we aim to," "our goal is"); **"done"** if it describes a completed or ongoing action (e.g., "we have," "we did," "we are").
+
+**3. "metric"** – Does the statement explicitly mention a metric or standard from a sustainability reporting framework?
+- If "CSRD" or "ESRS" is mentioned: **"CSRD / ESRS"**. If "GRI" is mentioned: **"GRI"**. If "TNFD" is mentioned: **"TNFD"**. If "SBTN" is mentioned: **"SBTN"**.
+- Otherwise, if a specific, quantifiable metric characteristic of these frameworks is described (e.g., hectares of restored habitat, number of IUCN Red List species affected, financial value of nature-related risks): **"other"**.
+- Otherwise: **"no"**.
+"""
+
+COMBINED_PROMPT = """
+You are a balanced but precise classification engine for corporate sustainability statements. For the statement below, determine three values in one pass and return them as a JSON object.
+""" + KLASSIFIZIERUNGS_KRITERIEN + """
+**Your Final Output:**
+Respond *only* with a JSON object of the form {{"category": "<category>", "status": "planned" | "done", "metric": "CSRD / ESRS" | "GRI" | "TNFD" | "SBTN" | "other" | "no"}}.
+
+**Statement to analyze:**
+"{statement}"
+"""
+
+BATCH_PROMPT = """
+You are a balanced but precise classification engine for corporate sustainability statements. You will receive a numbered list of independent statements. Judge every statement on its own and determine three values for each.
+""" + KLASSIFIZIERUNGS_KRITERIEN + """
+**Your Final Output:**
+Respond *only* with a JSON array containing exactly one object per statement, in the form
+[{{"index": <number of the statement>, "category": "<category>", "status": "planned" | "done", "metric": "CSRD / ESRS" | "GRI" | "TNFD" | "SBTN" | "other" | "no"}}, ...]
+
+**Numbered statements to analyze:**
+{numbered_statements}
+"""
+
+STATUS_WERTE = ["planned", "done"]
+METRIC_WERTE = ["CSRD / ESRS", "GRI", "TNFD", "SBTN", "other", "no"]
+
 # --- Hilfsfunktionen ---
+# Füllt fehlende 'Seiten'/'Provenienz' über (Unternehmen, Aussage) aus den frisch extrahierten Einträgen auf.
+def _ergaenze_provenienz(df_results: pd.DataFrame, df_full: pd.DataFrame) -> pd.DataFrame:
+    df_results = df_results.copy()
+    quelle = df_full.drop_duplicates(subset=['Unternehmen', 'Aussage']).set_index(['Unternehmen', 'Aussage'])
+    schluessel = pd.MultiIndex.from_frame(df_results[['Unternehmen', 'Aussage']])
+    for col in ['Seiten', 'Provenienz']:
+        nachgeschlagen = pd.Series(quelle[col].reindex(schluessel).to_numpy(), index=df_results.index)
+        df_results[col] = df_results[col].where(df_results[col].notna(), nachgeschlagen) if col in df_results else nachgeschlagen
+        df_results[col] = df_results[col].fillna('')
+    return df_results
+
 # Funktion zum Extrahieren aller Einträge aus den JSON-Dateien
 def _extrahiere_alle_eintraege(input_ordner: str) -> list[dict]:
     alle_eintraege = []
@@ -145,18 +204,19 @@ def _extrahiere_alle_eintraege(input_ordner: str) -> list[dict]:
             # Schleife über alle gefundenen Passagen in einer Datei
             for passage_block in data.get("biodiversity_passages", []):
                 keywords_str = ", ".join(passage_block.get("found_keywords", []))
+                aussagen_provenienz = passage_block.get("aussagen_provenienz", {})
+                seiten_der_passage = aus_seitenangabe(passage_block.get("page_range"))
                 
                 actions_in_passage = passage_block.get(actions_key, [])
                 metrics_in_passage = passage_block.get(metrics_key, [])
                 eintraege_pro_datei += len(actions_in_passage) + len(metrics_in_passage)
                 
-                # Schleife über alle "actions" in einer Passage
-                for action_string in actions_in_passage:
-                    alle_eintraege.append({"Unternehmen": unternehmen, "Typ": "Action", "Aussage": action_string.strip("'\""), "Keywords": keywords_str})
-                
-                # Schleife über alle "metrics" in einer Passage
-                for metric_string in metrics_in_passage:
-                    alle_eintraege.append({"Unternehmen": unternehmen, "Typ": "Metric", "Aussage": metric_string.strip("'\""), "Keywords": keywords_str})
+                # Schleife über alle "actions" und "metrics" in einer Passage; die Provenienz wird als Seitenangabe und JSON mitgeführt
+                for typ, aussagen in [("Action", actions_in_passage), ("Metric", metrics_in_passage)]:
+                    for aussage_string in aussagen:
+                        provenienz = aussagen_provenienz.get(aussage_string, seiten_der_passage)
+                        alle_eintraege.append({"Unternehmen": unternehmen, "Typ": typ, "Aussage": aussage_string.strip("'\""), "Keywords": keywords_str,
+                                               "Seiten": seiten_angabe(provenienz), "Provenienz": als_json(provenienz)})
             
             print(f"    - {eintraege_pro_datei} Einträge aus dieser Datei extrahiert.")
 
@@ -166,63 +226,238 @@ def _extrahiere_alle_eintraege(input_ordner: str) -> list[dict]:
     print(f"Extraktion abgeschlossen. Insgesamt {len(alle_eintraege)} Einträge gefunden.")
     return alle_eintraege
 
-# Generalisierte Funktion für API-Aufrufe mit Wiederholungslogik
-def _get_api_response(gemini_model_version, prompt_template: str, statement: str, fallback: str, retries: int = 3, delay: int = 5) -> str:
-    for attempt in range(retries):
-        try:
-            if '{category_list}' in prompt_template:
-                prompt = prompt_template.format(category_list="\n".join(f"- {c}" for c in PREDEFINED_CATEGORIES), statement=statement)
-            else:
-                prompt = prompt_template.format(statement=statement)
-
-            model = genai.GenerativeModel(gemini_model_version) 
-            response = model.generate_content(prompt)
-            return response.text.strip() 
+# Ordnet einen Wert ohne Beachtung von Groß-/Kleinschreibung einem der erlaubten Werte zu.
+def _kanonischer_wert(wert, erlaubte_werte: list[str]) -> str:
+    if isinstance(wert, str):
+        for erlaubt in erlaubte_werte:
+            if wert.strip().lower() == erlaubt.lower():
+                return erlaubt
+    raise ValueError(f"Ungültiger Wert '{wert}'.")
+
+# Liest die Freitext-Antwort eines Einzel-Prompts; umschließende Anführungszeichen, Sternchen und ein Schlusspunkt werden ignoriert.
+def _kanonische_antwort(antwort: str, erlaubte_werte: list[str]) -> str:
+    return _kanonischer_wert(antwort.strip().strip('"\'*').rstrip('.').strip(), erlaubte_werte)
+
+# Generalisierte Funktion für API-Aufrufe. Wiederholungen bei Rate-Limits und Serverfehlern übernimmt der LLM-Client.
+# Die Antwort wird auf einen der erlaubten Werte abgebildet; nur solche Antworten landen pro Prompt-Vorlage ('template_id')
+# im persistenten LLM-Cache, alle übrigen ergeben den 'fallback'.
+def _get_api_response(gemini_model_version, template_id: str, prompt_template: str, statement: str, erlaubte_werte: list[str], fallback: str) -> str:
+    if '{category_list}' in prompt_template:
+        prompt = prompt_template.format(category_list="\n".join(f"- {c}" for c in PREDEFINED_CATEGORIES), statement=statement)
+    else:
+        prompt = prompt_template.format(statement=statement)
 
+    try:
+        antwort = get_llm_client(gemini_model_version).generate(
+            prompt, template_id=template_id, validate=lambda text: _kanonische_antwort(text, erlaubte_werte)
+        )
+        return _kanonische_antwort(antwort, erlaubte_werte)
+    except Exception as e:
+        print(f"    Finaler Fehler bei API-Aufruf: {e}")
+        return fallback
+
+# Prüft Kategorie, Status und Metrik eines JSON-Objekts gegen die erlaubten Werte. Ungültige Einträge lösen einen ValueError aus.
+def _parse_klassifizierung(eintrag) -> tuple[str, str, str]:
+    if not isinstance(eintrag, dict):
+        raise ValueError("Eintrag ist kein JSON-Objekt.")
+    kategorie = _kanonischer_wert(eintrag.get("category"), PREDEFINED_CATEGORIES)
+    status = _kanonischer_wert(eintrag.get("status"), STATUS_WERTE)
+    metrik = _kanonischer_wert(eintrag.get("metric"), METRIC_WERTE)
+    return kategorie, status, metrik
+
+# Liest die kombinierte JSON-Antwort für eine einzelne Aussage.
+def _parse_kombinierte_antwort(raw: str) -> tuple[str, str, str]:
+    return _parse_klassifizierung(json.loads(raw))
+
+# Liest die Batch-Antwort und gibt pro Aussage das Ergebnis zurück; fehlende oder ungültige Einträge sind None.
+def _parse_batch_antwort(raw: str, anzahl: int) -> list:
+    parsed = json.loads(raw)
+    if not isinstance(parsed, list):
+        raise ValueError("Antwort ist kein JSON-Array.")
+    ergebnisse = [None] * anzahl
+    for eintrag in parsed:
+        try:
+            index = int(eintrag.get("index")) - 1
+            if 0 <= index < anzahl and ergebnisse[index] is None:
+                ergebnisse[index] = _parse_klassifizierung(eintrag)
+        except (AttributeError, TypeError, ValueError):
+            continue
+    return ergebnisse
+
+# Teilt Aussagen in Batches auf, deren geschätzte Token-Summe das Budget nicht überschreitet (höchstens 'max_groesse' Aussagen).
+def _bilde_batches(aussagen: list[str], token_budget: int, max_groesse: int) -> list[list[str]]:
+    batches = []
+    aktuell, tokens = [], 0
+    for aussage in aussagen:
+        aussage_tokens = schaetze_tokens(aussage) + 5
+        if aktuell and (len(aktuell) >= max_groesse or tokens + aussage_tokens > token_budget):
+            batches.append(aktuell)
+            aktuell, tokens = [], 0
+        aktuell.append(aussage)
+        tokens += aussage_tokens
+    if aktuell:
+        batches.append(aktuell)
+    return batches
+
+# Klassifiziert mehrere Aussagen mit einem einzigen API-Aufruf. Nicht klassifizierte Aussagen sind im Ergebnis None.
+def _klassifiziere_batch(gemini_model_version, aussagen: list[str]) -> list:
+    numbered_statements = "\n".join(f"{i + 1}. {aussage}" for i, aussage in enumerate(aussagen))
+    prompt = BATCH_PROMPT.format(category_list="\n".join(f"- {c}" for c in PREDEFINED_CATEGORIES), numbered_statements=numbered_statements)
+    try:
+        raw = get_llm_client(gemini_model_version).generate(
+            prompt,
+            generation_config={"response_mime_type": "application/json"},
+            template_id="batch",
+            validate=lambda text: all(e is not None for e in _parse_batch_antwort(text, len(aussagen)))
+        )
+        return _parse_batch_antwort(raw, len(aussagen))
+    except Exception as e:
+        print(f"    Batch mit {len(aussagen)} Aussagen fehlgeschlagen: {e}")
+        return [None] * len(aussagen)
+
+# Klassifiziert einen Batch; fehlgeschlagene Aussagen werden halbiert erneut angefragt, einzelne Aussagen laufen über den Einzelpfad.
+def _klassifiziere_batch_mit_teilung(gemini_model_version, aussagen: list[str]) -> list[tuple[str, str, str]]:
+    if len(aussagen) == 1:
+        return [_analysiere_aussage(gemini_model_version, aussagen[0])]
+
+    ergebnisse = _klassifiziere_batch(gemini_model_version, aussagen)
+    fehlend = [i for i, ergebnis in enumerate(ergebnisse) if ergebnis is None]
+    if fehlend:
+        mitte = (len(fehlend) + 1) // 2
+        for teil in (fehlend[:mitte], fehlend[mitte:]):
+            if not teil:
+                continue
+            for i, ergebnis in zip(teil, _klassifiziere_batch_mit_teilung(gemini_model_version, [aussagen[i] for i in teil])):
+                ergebnisse[i] = ergebnis
+    return ergebnisse
+
+# Klassifiziert eine Aussage mit einem einzigen API-Aufruf (Kategorie, Status und Metrik als JSON).
+def _analysiere_aussage_kombiniert(gemini_model_version, aussage: str) -> tuple[str, str, str]:
+    prompt = COMBINED_PROMPT.format(category_list="\n".join(f"- {c}" for c in PREDEFINED_CATEGORIES), statement=aussage)
+    raw = get_llm_client(gemini_model_version).generate(
+        prompt,
+        generation_config={"response_mime_type": "application/json"},
+        template_id="kombiniert",
+        validate=_parse_kombinierte_antwort
+    )
+    return _parse_kombinierte_antwort(raw)
+
+# Führt die drei Analysen (Kategorie, Status, Metrik) für eine einzelne Aussage durch.
+# Im kombinierten Modus genügt ein Aufruf; nur wenn dessen Antwort ungültig ist, werden die drei Einzel-Prompts genutzt.
+def _analysiere_aussage(gemini_model_version, aussage: str, kombiniert: bool = kombinierte_klassifizierung) -> tuple[str, str, str]:
+    if kombiniert:
+        try:
+            return _analysiere_aussage_kombiniert(gemini_model_version, aussage)
         except Exception as e:
-            # Prüft, ob es der letzte Versuch war
-            if attempt < retries - 1:
-                wait_time = delay * (2 ** attempt)  # Exponential backoff: 5s, 10s, 20s
-                print(f"    Fehler bei API-Aufruf (Versuch {attempt + 1}/{retries}): {e}. Warte {wait_time}s...")
-                time.sleep(wait_time)
-            else:
-                error_message = f"Finaler Fehler nach {retries} Versuchen: {e}"
-                print(f"    {error_message}")
-               
-                return fallback 
-            
-    return fallback # Sollte nie erreicht werden, aber als Absicherung
-
-def create_robust_merge_key(name: str) -> str:
-    if not isinstance(name, str): return ""
-    name = name.lower()
-    
-    # Ersetzt Unterstriche und Bindestriche durch Leerzeichen
-    name = name.replace('_', ' ').replace('-', ' ')
-    
-    # Erweiterte Liste von Suffixen und generischen Begriffen
-    words_to_remove = [
-        # Skandinavien
-        'ab', 'asa', 
-        # UK / USA / International
-        'plc', 'limited', 'ltd', 'inc', 'incorporated', 'corp', 'corporation', 'group',
-        # Deutschland / Österreich
-        'ag', 'gmbh', 'se',
-        # Frankreich / Spanien / Italien / Lateinamerika
-        'sa', 'srl', 'spa',
-        # Niederlande / Belgien
-        'nv', 'bv',
-        # Allgemein
-        'the', 'holding', 'holdings', 
-        # Report-spezifisch
-        'sustainability', 'report', 'relevant', 'passages', 'annual', 'integrated'
-    ]
-    
-    pattern = r'\b(' + '|'.join(words_to_remove) + r')\b'
-    name = re.sub(pattern, '', name)
-    name = re.sub(r'(_)?\d{4}', '', name)
-    name = re.sub(r'[^a-z0-9]', '', name)
-    return name.strip()
+            print(f"    Kombinierte Klassifizierung ungültig ({e}). Nutze Einzel-Prompts für: '{aussage[:30]}...'")
+    kategorie = _get_api_response(gemini_model_version, "kategorie", CLASSIFICATION_PROMPT, aussage, PREDEFINED_CATEGORIES, fallback="API Fehler")
+    status = _get_api_response(gemini_model_version, "status", STATUS_PROMPT, aussage, STATUS_WERTE, fallback="API Fehler")
+    metrik = _get_api_response(gemini_model_version, "metrik", METRIC_PROMPT, aussage, METRIC_WERTE, fallback="API Fehler")
+    return kategorie, status, metrik
+
+# Klassifiziert alle Aussagen nebenläufig und liefert die Ergebnisse in Eingabe-Reihenfolge.
+# Mit klassifizierung_batch_groesse > 1 werden mehrere Aussagen pro Request gebündelt.
+def _analysiere_aussagen(gemini_model_version, aussagen: list[str], batch_groesse: int = klassifizierung_batch_groesse,
+                         token_budget: int = klassifizierung_batch_token_budget):
+    llm_client = get_llm_client(gemini_model_version)
+    if batch_groesse <= 1:
+        return llm_client.map(lambda aussage: _analysiere_aussage(gemini_model_version, aussage), aussagen)
+
+    batches = _bilde_batches(aussagen, token_budget, batch_groesse)
+    print(f"Bündele {len(aussagen)} Aussagen in {len(batches)} Batches (max. {batch_groesse} Aussagen / ~{token_budget} Tokens).")
+    ergebnisse_pro_batch = llm_client.map(lambda batch: _klassifiziere_batch_mit_teilung(gemini_model_version, batch), batches)
+    return chain.from_iterable(ergebnisse_pro_batch)
+
+# Version der Klassifizierung für den Aussagen-Index. Sie ändert sich mit Prompts, Kategorien, Klassifizierungs-Modus
+# und 'aussagen_index_version' (in config.py erhöhen, um alle gespeicherten Klassifizierungen zu verwerfen).
+def _klassifizierungs_version(kombiniert: bool = kombinierte_klassifizierung, batch_groesse: int = klassifizierung_batch_groesse) -> str:
+    modus = ("batch" if batch_groesse > 1 else "einzeln") + ("-kombiniert" if kombiniert else "-drei_prompts")
+    inhalt = json.dumps([PREDEFINED_CATEGORIES, STATUS_WERTE, METRIC_WERTE, CLASSIFICATION_PROMPT, STATUS_PROMPT, METRIC_PROMPT,
+                         COMBINED_PROMPT, BATCH_PROMPT], ensure_ascii=False)
+    return f"{aussagen_index_version}-{modus}-{hashlib.sha256(inhalt.encode('utf-8')).hexdigest()[:12]}"
+
+# Gibt eine Klassifizierung in kanonischer Schreibweise zurück, wenn alle drei Werte erlaubt sind, sonst None.
+def _gueltige_klassifizierung(ergebnis) -> tuple[str, str, str] | None:
+    try:
+        kategorie, status, metrik = ergebnis
+        return _parse_klassifizierung({"category": kategorie, "status": status, "metric": metrik})
+    except (TypeError, ValueError):
+        return None
+
+# Liefert (schluessel, (kategorie, status, metric)) für alle normalisierten Aussagen, sobald die Ergebnisse vorliegen.
+# Bekannte Schlüssel kommen direkt aus dem Index; die übrigen werden zu Fast-Duplikat-Gruppen mit gleichen Zahlen
+# zusammengefasst und pro Gruppe nur einmal klassifiziert. Neue Ergebnisse mit gültigen Werten werden sofort im Index gespeichert
+# (Schlüssel: Aussage, Modell und Klassifizierungs-Version).
+def _klassifiziere_ueber_index(gemini_model_version, texte_pro_schluessel: dict, aussagen_index: AussagenIndex,
+                               schwelle: float = aussagen_index_schwelle, version: str | None = None):
+    version = version or _klassifizierungs_version()
+    bekannt = aussagen_index.lade(texte_pro_schluessel, gemini_model_version, version)
+    offen = [schluessel for schluessel in texte_pro_schluessel if schluessel not in bekannt]
+    offen_pro_signatur = {}
+    for schluessel in offen:
+        offen_pro_signatur.setdefault(zahlen_signatur(schluessel), []).append(schluessel)
+    gruppen = {}
+    for kandidaten in offen_pro_signatur.values():
+        for schluessel, repraesentant in zip(kandidaten, finde_repraesentanten(kandidaten, schwelle)):
+            gruppen.setdefault(kandidaten[repraesentant], []).append(schluessel)
+    print(f"Aussagen-Index: {len(bekannt)} von {len(texte_pro_schluessel)} normalisierten Aussagen bereits klassifiziert, "
+          f"{len(gruppen)} werden neu klassifiziert.")
+
+    yield from bekannt.items()
+
+    repraesentanten = list(gruppen)
+    analysen = _analysiere_aussagen(gemini_model_version, [texte_pro_schluessel[r] for r in repraesentanten])
+    for repraesentant, ergebnis in zip(repraesentanten, analysen):
+        ergebnis = tuple(ergebnis)
+        gueltig = _gueltige_klassifizierung(ergebnis)
+        if gueltig is not None:
+            aussagen_index.speichere([(s, texte_pro_schluessel[s], gueltig) for s in gruppen[repraesentant]], gemini_model_version, version)
+        for schluessel in gruppen[repraesentant]:
+            yield schluessel, gueltig or ergebnis
+
+# Übernimmt gültige Klassifizierungen aus dem Checkpoint des laufenden Reports in den Index (bestehende Einträge bleiben unverändert).
+def _uebernehme_checkpoint_in_index(aussagen_index: AussagenIndex, df_results: pd.DataFrame, gemini_model_version, version: str | None = None):
+    df_ok = df_results.dropna(subset=['Aussage', 'Kategorie', 'Status', 'Metric'])
+    eintraege = []
+    for a, k, s, m in zip(df_ok['Aussage'], df_ok['Kategorie'], df_ok['Status'], df_ok['Metric']):
+        gueltig = _gueltige_klassifizierung((k, s, m))
+        if gueltig is not None:
+            eintraege.append((normalisiere_aussage(a), a, gueltig))
+    aussagen_index.speichere(eintraege, gemini_model_version, version or _klassifizierungs_version(), ueberschreiben=False)
+
+# Liest das Checkpoint-Log in einem Durchlauf. Eine abgeschnittene letzte Zeile (Abbruch beim Schreiben) wird ignoriert.
+def _lade_checkpoint(checkpoint_path: str) -> list[dict]:
+    eintraege = []
+    zeile = "\n"
+    with open(checkpoint_path, 'r', encoding='utf-8') as f:
+        for zeilennummer, zeile in enumerate(f, start=1):
+            if not zeile.strip():
+                continue
+            try:
+                eintraege.append(json.loads(zeile))
+            except json.JSONDecodeError:
+                print(f"Warnung: Zeile {zeilennummer} im Checkpoint '{checkpoint_path}' ist unvollständig und wird ignoriert.")
+    # Damit neue Einträge nicht an eine abgeschnittene Zeile angehängt werden
+    if not zeile.endswith("\n"):
+        with open(checkpoint_path, 'a', encoding='utf-8') as f:
+            f.write("\n")
+    return eintraege
+
+# Hängt ein Ergebnis als eigene Zeile an das Checkpoint-Log an und schreibt es sofort auf die Platte.
+def _schreibe_checkpoint_eintrag(checkpoint_log, eintrag: dict):
+    checkpoint_log.write(json.dumps(eintrag, ensure_ascii=False, default=str) + "\n")
+    checkpoint_log.flush()
+    os.fsync(checkpoint_log.fileno())
+
+# Übernimmt einen alten XLSX-Checkpoint einmalig in das JSONL-Log und benennt die XLSX-Datei um.
+def _migriere_xlsx_checkpoint(xlsx_path: str, checkpoint_path: str):
+    print(f"Übernehme alten Checkpoint '{xlsx_path}' in '{checkpoint_path}'...")
+    df_alt = pd.read_excel(xlsx_path)
+    df_alt = df_alt.astype(object).where(df_alt.notna(), None)
+    with open(checkpoint_path, 'a', encoding='utf-8') as checkpoint_log:
+        for eintrag in df_alt.to_dict('records'):
+            _schreibe_checkpoint_eintrag(checkpoint_log, eintrag)
+    os.replace(xlsx_path, xlsx_path + ".migriert")
 
 # Führt die vollständige KI-Analyse mit Checkpoint- und Resume-Funktion durch
 def fuehre_top_down_klassifizierung_durch(gemini_model_version, input_ordner: str, summary_excel_path: str, output_ordner: str):
@@ -231,8 +466,9 @@ def fuehre_top_down_klassifizierung_durch(gemini_model_version, input_ordner: st
     classification_output_ordner = os.path.join(output_ordner, "Top_Down_Analyse")
     os.makedirs(classification_output_ordner, exist_ok=True)
     
-    # Pfad für die Zwischenspeicherung 
-    checkpoint_path = os.path.join(classification_output_ordner, "checkpoint_report.xlsx")
+    # Pfad für die Zwischenspeicherung: ein Append-only-Log mit einer JSON-Zeile pro klassifizierter Aussage
+    checkpoint_path = os.path.join(classification_output_ordner, "checkpoint_report.jsonl")
+    alter_checkpoint_path = os.path.join(classification_output_ordner, "checkpoint_report.xlsx")
     
     # Alle zu verarbeitenden Einträge laden
     alle_eintraege = _extrahiere_alle_eintraege(input_ordner)
@@ -246,17 +482,24 @@ def fuehre_top_down_klassifizierung_durch(gemini_model_version, input_ordner: st
 
 
     # DataFrame für Ergebnisse initialisieren: Entweder aus Checkpoint laden oder neu erstellen
+    if os.path.exists(alter_checkpoint_path) and not os.path.exists(checkpoint_path):
+        _migriere_xlsx_checkpoint(alter_checkpoint_path, checkpoint_path)
+
     if os.path.exists(checkpoint_path):
         print(f"Lade Fortschritt aus Checkpoint-Datei: {checkpoint_path}")
-        df_results = pd.read_excel(checkpoint_path)
+        df_results = pd.DataFrame(_lade_checkpoint(checkpoint_path))
     else:
         print("Keine Checkpoint-Datei gefunden. Starte eine neue Analyse.")
         df_results = pd.DataFrame()
 
-    # Bestimmen, welche Aussagen noch verarbeitet werden müssen
+    # Bestimmen, welche Aussagen noch verarbeitet werden müssen. Gleiche Aussagen anderer Unternehmen erhalten eigene Zeilen,
+    # ihre Klassifizierung kommt aber aus dem Aussagen-Index.
+    aussagen_index = AussagenIndex(aussagen_index_pfad)
     if not df_results.empty:
-        processed_statements = set(df_results['Aussage'])
-        df_todo = df_full[~df_full['Aussage'].isin(processed_statements)].copy()
+        _uebernehme_checkpoint_in_index(aussagen_index, df_results, gemini_model_version)
+        processed_statements = set(zip(df_results['Unternehmen'], df_results['Aussage']))
+        ist_offen = [(u, a) not in processed_statements for u, a in zip(df_full['Unternehmen'], df_full['Aussage'])]
+        df_todo = df_full[ist_offen].copy()
     else:
         df_todo = df_full.copy()
 
@@ -267,40 +510,46 @@ def fuehre_top_down_klassifizierung_durch(gemini_model_version, input_ordner: st
         
         neue_ergebnisse = []
 
-        # Schleife über die noch zu verarbeitenden Aussagen
-        for index, row in tqdm(df_todo.iterrows(), total=df_todo.shape[0], desc="Verarbeite Aussagen"):
-            aussage = row['Aussage']
-            
-            # API-Aufrufe
-            kategorie = _get_api_response(gemini_model_version, CLASSIFICATION_PROMPT, aussage, fallback="API Fehler")
-            time.sleep(1)
-            status = _get_api_response(gemini_model_version, STATUS_PROMPT, aussage, fallback="API Fehler")
-            time.sleep(1)
-            metrik = _get_api_response(gemini_model_version, METRIC_PROMPT, aussage, fallback="API Fehler")
-            time.sleep(1)
-
-            # Neue Zeile für das Ergebnis-DataFrame erstellen
-            new_row = row.to_dict()
-            new_row['Kategorie'] = kategorie
-            new_row['Status'] = status
-            new_row['Metric'] = metrik
-            neue_ergebnisse.append(new_row)
-
-            # Nach jedem Eintrag den Fortschritt speichern
-            temp_df_to_save = pd.DataFrame(neue_ergebnisse)
-            df_to_save = pd.concat([df_results, temp_df_to_save], ignore_index=True)
-            df_to_save.to_excel(checkpoint_path, index=False)
-        
+        # Zeilen nach normalisierter Aussage gruppieren; jede Gruppe wird höchstens einmal klassifiziert.
+        zeilen_pro_schluessel = {}
+        texte_pro_schluessel = {}
+        for zeile in df_todo.to_dict('records'):
+            schluessel = normalisiere_aussage(zeile['Aussage'])
+            zeilen_pro_schluessel.setdefault(schluessel, []).append(zeile)
+            texte_pro_schluessel.setdefault(schluessel, zeile['Aussage'])
+
+        with open(checkpoint_path, 'a', encoding='utf-8') as checkpoint_log, tqdm(total=df_todo.shape[0], desc="Verarbeite Aussagen") as fortschritt:
+            # Schleife über die Ergebnisse pro normalisierter Aussage, sobald sie vorliegen
+            for schluessel, (kategorie, status, metrik) in _klassifiziere_ueber_index(gemini_model_version, texte_pro_schluessel, aussagen_index):
+
+                # Das Ergebnis auf alle Vorkommen der Aussage übertragen
+                for zeile in zeilen_pro_schluessel[schluessel]:
+                    new_row = dict(zeile)
+                    new_row['Kategorie'] = kategorie
+                    new_row['Status'] = status
+                    new_row['Metric'] = metrik
+                    neue_ergebnisse.append(new_row)
+
+                    # Nach jedem Eintrag den Fortschritt als neue Zeile anhängen
+                    _schreibe_checkpoint_eintrag(checkpoint_log, new_row)
+                fortschritt.update(len(zeilen_pro_schluessel[schluessel]))
+
         # Das finale Ergebnis-DataFrame nach der Schleife aktualisieren
         df_results = pd.concat([df_results, pd.DataFrame(neue_ergebnisse)], ignore_index=True)
 
     print("Alle Aussagen erfolgreich verarbeitet.")
+    print(f"Aussagen-Index: {aussagen_index.anzahl()} klassifizierte Aussagen gespeichert.")
+    aussagen_index.close()
+    print(get_llm_client(gemini_model_version).cache.statistik())
+
+    # Checkpoint-Zeilen aus Läufen ohne Provenienz erhalten Seiten und Provenienz aus den aktuellen Passagen-Dateien.
+    df_results = _ergaenze_provenienz(df_results, df_full)
 
     # Anreicherung mit Metadaten
     print("\nReichere Report mit Metadaten an...")
     df_enriched = df_results.copy()
     try:
-        df_summary = pd.read_excel(summary_excel_path)
+        df_summary = lade_unternehmens_index(summary_excel_path).df
         columns_to_merge = ['Filename', 'Company', 'Country', 'Rating', 'Primary Listing', 'Industry Classification']
         df_summary_subset = df_summary[columns_to_merge].copy()
         
@@ -344,8 +593,8 @@ def fuehre_top_down_klassifizierung_durch(gemini_model_version, input_ordner: st
 
     # Speichern des finalen Reports
     final_path = os.path.join(classification_output_ordner, "top_down_klassifizierungs_report.xlsx")
-    output_columns = ['Unternehmen', 'Typ', 'Aussage', 'Status', 'Kategorie', 'Metric', 'Keywords', 'Company', 'Country', 'Rating', 'Primary Listing', 'Industry Classification']
-    df_final.to_excel(final_path, index=False, columns=output_columns)
+    output_columns = ['Unternehmen', 'Typ', 'Aussage', 'Status', 'Kategorie', 'Metric', 'Keywords', 'Seiten', 'Provenienz', 'Company', 'Country', 'Rating', 'Primary Listing', 'Industry Classification']
+    speichere_report(df_final, final_path, columns=output_columns)
     
     print(f"\n--- Analyse vollständig abgeschlossen. ---\nFinaler Report gespeichert unter: '{final_path}'")
    
\ No newline at end of file
@@ -1,81 +1,169 @@
 import os
+import numpy as np
 import pandas as pd
 import json
 from rapidfuzz import fuzz, process
 from collections import defaultdict
-import google.generativeai as genai
-from google.api_core import exceptions as google_exceptions
 from tqdm import tqdm
-import time
-
-
-smart_prompt_template = """
-You are an expert analyst specializing in corporate sustainability and biodiversity reporting.
-Your task is to evaluate a given statement from a company's report regarding biodiversity and determine if it constitutes a SMART objective.
-
-**SMART Criteria Definition:**
-- **Specific:** The objective must be clear, unambiguous, and state precisely what needs to be accomplished. Quote ONLY the specific part of the text.
-- **Measurable:** The objective must be quantifiable or at least allow for measurable progress. Quote ONLY the specific metrics or targets mentioned.
-- **Achievable:** The objective must be realistic and attainable. Based on the statement, assess if it's a concrete action or a vague ambition. Quote ONLY the part that indicates achievability.
-- **Relevant:** The objective must be relevant to broader biodiversity goals. Quote ONLY the part of the statement that links the action to a biodiversity outcome.
-- **Time-bound:** The objective must have a defined timeline or target date. Quote ONLY the timeframe mentioned.
-
-**Input Statement:**
-"{statement}"
-
-**Instructions:**
-Analyze the statement above based on the SMART criteria.
-If a criterion is met, extract ONLY the most relevant and concise quote from the statement that demonstrates this. Do not return the entire statement.
-If a criterion is NOT met, the value for that key must be the boolean value `false`.
-The overall "smart" key should be `true` ONLY if ALL 5 criteria are met, otherwise it must be `false`.
-
-Provide your analysis ONLY in a valid JSON format, with no additional text or explanations before or after the JSON object.
-
-**Required JSON Output Format:**
-{{
-  "smart": <true_or_false>,
-  "specific": "<concise_quote>" or false,
-  "measurable": "<concise_quote>" or false,
-  "achievable": "<concise_quote>" or false,
-  "relevant": "<concise_quote>" or false,
-  "time": "<concise_quote>" or false
-}}
-"""
-
-def clean_json_response(text):
-    
-    # Bereinigt die Textantwort der API, um nur den JSON-Teil zu extrahieren.
-    match = text.strip()
-    if match.startswith("```json"):
-        match = match[7:]
-    if match.endswith("```"):
-        match = match[:-3]
-    return match.strip()
+from functions.llm_client import get_llm_client
+from functions.report_io import lade_report
+from functions.smart_evaluation import SmartSpeicher, bewerte_smart
+from config import smart_speicher_pfad
+
+# Unterordner des Ergebnis-Ordners für die kompakten Aussagen-Indizes pro Jahr.
+AUSSAGEN_INDEX_ORDNER = "_aussagen_index"
+
+def baue_aussagen_index(df: pd.DataFrame) -> dict:
+    """
+    Gruppiert die Aussagen eines Jahres nach (Unternehmen, Status in Kleinschreibung).
+    Pro Gruppe: alle Aussagen mit Kategorie (für die Auswertung) sowie die vorhandenen (nicht fehlenden)
+    Aussagen als Vergleichsmenge für spätere Jahre.
+    """
+    index = {}
+    kategorien = df["Kategorie"] if "Kategorie" in df.columns else pd.Series("", index=df.index)
+    gruppiert = pd.DataFrame({"Aussage": df["Aussage"], "Kategorie": kategorien}).groupby(
+        [df["Company"], df["Status"].str.lower()], sort=False
+    )
+    # Schleife über alle (Unternehmen, Status)-Gruppen
+    for schluessel, gruppe in gruppiert:
+        aussagen = gruppe["Aussage"].tolist()
+        gueltig = [not pd.isna(aussage) for aussage in aussagen]
+        index[schluessel] = {
+            "aussagen": aussagen,
+            "kategorien": gruppe["Kategorie"].tolist(),
+            "gueltig": np.array(gueltig, dtype=bool),
+            "anfragen": [a if g else "" for a, g in zip(aussagen, gueltig)],
+            "vergleich_aussagen": [a for a, g in zip(aussagen, gueltig) if g],
+        }
+    return index
+
+def _finde_wiederholungen(gruppe: dict, vorjahre: list, similarity_threshold) -> list[list[dict]]:
+    # Gleicht alle Aussagen einer Gruppe mit je einem cdist-Aufruf pro Vorjahr ab.
+    # argmax liefert bei gleichen Scores den ersten Treffer, wie process.extractOne.
+    treffer = [[] for _ in gruppe["aussagen"]]
+    for prev_year, prev_gruppe in vorjahre:
+        if not prev_gruppe["vergleich_aussagen"]:
+            continue
+        scores = process.cdist(gruppe["anfragen"], prev_gruppe["vergleich_aussagen"], scorer=fuzz.token_sort_ratio,
+                               dtype=np.float64, workers=-1)
+        beste = scores.argmax(axis=1)
+        beste_scores = scores[np.arange(len(beste)), beste]
+        for i in np.flatnonzero(gruppe["gueltig"] & (beste_scores >= similarity_threshold)):
+            treffer[i].append({
+                "year": prev_year,
+                "text": prev_gruppe["vergleich_aussagen"][beste[i]],
+                "score": float(beste_scores[i])
+            })
+    return treffer
+
+# Pfad des persistierten Aussagen-Index eines Jahres (im Ergebnis-Ordner, getrennt von den JAHR-Dateien).
+def _index_pfad(output_folder, year):
+    return os.path.join(output_folder, AUSSAGEN_INDEX_ORDNER, f"{year}.parquet")
+
+# Letzte Änderung der Quelle eines Jahres (JAHR.parquet bzw. JAHR.xlsx); 0, wenn keine vorhanden ist.
+def _quell_mtime(input_folder, year):
+    pfade = [os.path.join(input_folder, f"{year}{endung}") for endung in (".parquet", ".xlsx")]
+    return max((os.path.getmtime(pfad) for pfad in pfade if os.path.exists(pfad)), default=0)
+
+def _speichere_jahres_index(df: pd.DataFrame, pfad: str):
+    # Speichert nur, was spätere Jahre zum Abgleich brauchen: Unternehmen, Status und Aussage der done/planned-Zeilen.
+    kompakt = pd.DataFrame({"Company": df["Company"], "Status": df["Status"].str.lower(), "Aussage": df["Aussage"]}).dropna()
+    kompakt = kompakt[kompakt["Status"].isin(["done", "planned"])]
+    os.makedirs(os.path.dirname(pfad), exist_ok=True)
+    tmp_pfad = pfad + ".tmp"
+    try:
+        kompakt.to_parquet(tmp_pfad, index=False)
+        os.replace(tmp_pfad, pfad)
+    except Exception as e:
+        print(f"Warnung: Aussagen-Index '{pfad}' konnte nicht gespeichert werden: {e}")
+        if os.path.exists(tmp_pfad):
+            os.remove(tmp_pfad)
+
+def _lade_jahres_index(input_folder, output_folder, year) -> dict:
+    # Lädt den Aussagen-Index eines früheren Jahres; fehlt er oder ist die Quelle neuer, wird er aus dem Report neu erstellt.
+    pfad = _index_pfad(output_folder, year)
+    if os.path.exists(pfad) and os.path.getmtime(pfad) >= _quell_mtime(input_folder, year):
+        return baue_aussagen_index(pd.read_parquet(pfad))
+    print(f"Erstelle Aussagen-Index für {year}...")
+    df = lade_report(os.path.join(input_folder, f"{year}.xlsx"))
+    _speichere_jahres_index(df, pfad)
+    return baue_aussagen_index(df)
+
+# Anteil der SMART-Aussagen an allen geplanten Aussagen eines Unternehmens.
+def _smart_anteil(planned: dict) -> float:
+    total_planned = planned["new"] + planned["repeated"]
+    return round(planned["smart_count"] / total_planned * 100, 2) if total_planned > 0 else 0.0
+
+# Wiederholt nur die fehlgeschlagenen SMART-Bewertungen eines gespeicherten Jahresergebnisses und aktualisiert die Datei.
+# Gibt False zurück, wenn das Ergebnis die fehlgeschlagenen Aussagen nicht auflistet (ältere Läufe) und das Jahr neu analysiert werden muss.
+def _wiederhole_smart_fehler(gemini_model_version, output_path, smart_speicher) -> bool:
+    try:
+        with open(output_path, "r", encoding="utf-8") as f:
+            results = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return False
+    offen = {company: stats["planned"].get("smart_failed_statements")
+             for company, stats in results.items() if stats.get("planned", {}).get("smart_failed", 0) > 0}
+    if not offen:
+        print(f"\nAnalyse existiert bereits in '{output_path}'. Überspringe...")
+        return True
+    if any(aussagen is None or len(aussagen) != results[company]["planned"]["smart_failed"] for company, aussagen in offen.items()):
+        return False
+
+    print(f"\nAnalyse in '{output_path}' enthält fehlgeschlagene SMART-Bewertungen. Wiederhole nur diese...")
+    bewertungen, fehlgeschlagen = bewerte_smart(gemini_model_version, [a for aussagen in offen.values() for a in aussagen], smart_speicher)
+    geaendert = False
+    for company, aussagen in offen.items():
+        planned = results[company]["planned"]
+        planned["smart_failed_statements"] = [statement for statement in aussagen if statement in fehlgeschlagen]
+        planned["smart_failed"] = len(planned["smart_failed_statements"])
+        geaendert = geaendert or planned["smart_failed"] < len(aussagen)
+        for statement in aussagen:
+            json_response = bewertungen.get(statement)
+            if statement not in fehlgeschlagen and json_response is not None and json_response.get('smart'):
+                planned["smart_count"] += 1
+                planned["smart_statements_details"].append({
+                    "statement": statement,
+                    "analysis": json_response
+                })
+        planned["smart_percent"] = _smart_anteil(planned)
+
+    if geaendert:
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
+        print(f"Ergebnisse in '{output_path}' aktualisiert.")
+    return True
 
 def analyze_measures_and_smartness(gemini_model_version, input_folder, output_folder, similarity_threshold=80):
     # Führt eine Ähnlichkeits- und SMART-Kriterien-Analyse für Unternehmensmaßnahmen durch.
     print("Starte kombinierte Analyse...")
     
-    model = genai.GenerativeModel(gemini_model_version)
+    llm_client = get_llm_client(gemini_model_version)
+    smart_speicher = SmartSpeicher(smart_speicher_pfad)
 
-    files = [f for f in os.listdir(input_folder) if f.endswith(".xlsx")]
-    data_by_year = {}
+    # Jahre aus JAHR.xlsx bzw. JAHR.parquet; gelesen wird bevorzugt die Parquet-Kopie.
+    years = sorted({int(os.path.splitext(f)[0]) for f in os.listdir(input_folder)
+                    if f.endswith((".xlsx", ".parquet")) and os.path.splitext(f)[0].isdigit()})
 
-    # Schleife zum Einlesen der Daten aller Jahre
-    for file in sorted(files):
-        year = int(os.path.splitext(file)[0])
-        df = pd.read_excel(os.path.join(input_folder, file))
-        data_by_year[year] = df
+    # Nur Jahre ohne Ergebnis werden analysiert; frühere Jahre kommen als kompakter Aussagen-Index dazu.
+    index_by_year = {}
 
     # Schleife zur Verarbeitung der Daten pro Jahr
-    for year, df in data_by_year.items():
+    for year in years:
 
         output_path = os.path.join(output_folder, f"{year}_analysis.json")
-        if os.path.exists(output_path):
-            print(f"\nAnalyse für {year} existiert bereits in '{output_path}'. Überspringe...")
-            continue 
+        # Vorhandene Ergebnisse werden nicht neu berechnet; nur ihre fehlgeschlagenen SMART-Bewertungen werden wiederholt.
+        if os.path.exists(output_path) and _wiederhole_smart_fehler(gemini_model_version, output_path, smart_speicher):
+            continue
+
+        # Vollständiger Report nur für das zu analysierende Jahr; sein Index wird für spätere Jahre gespeichert.
+        df = lade_report(os.path.join(input_folder, f"{year}.xlsx"))
+        _speichere_jahres_index(df, _index_pfad(output_folder, year))
+        index_by_year[year] = baue_aussagen_index(df)
+        for prev_year in years:
+            if prev_year < year and prev_year not in index_by_year:
+                index_by_year[prev_year] = _lade_jahres_index(input_folder, output_folder, prev_year)
         
-
         print(f"\nAnalysiere Daten für das Jahr {year}...")
         results = defaultdict(lambda: {
             "done": {"new": 0, "repeated": 0, "repeated_details": []},
@@ -84,101 +172,59 @@ def analyze_measures_and_smartness(gemini_model_version, input_folder, output_fo
                 "repeated": 0, 
                 "repeated_details": [],
                 "smart_count": 0,
+                "smart_failed": 0,
+                "smart_failed_statements": [],
                 "smart_statements_details": []
             }
         })
+        # Geplante Aussagen für die SMART-Analyse, die nach der Ähnlichkeitsanalyse gesammelt an die API gehen.
+        smart_auftraege = []
         
         # Schleife zur Verarbeitung der Daten pro Unternehmen
         for company in tqdm(df["Company"].unique(), desc=f"Verarbeite Unternehmen für {year}"):
-            company_data = df[df["Company"] == company]
 
             # Schleife für die Status "done" und "planned"
             for status in ["done", "planned"]:
-                current_rows = company_data[company_data["Status"].str.lower() == status]
-
-                # Schleife über jede einzelne Aussage (Zeile)
-                for index, row in current_rows.iterrows():
-                    statement = row["Aussage"]
-                    category = row.get("Kategorie", "")
-                    repeated = False
-                    repeated_years = []
-                    matched_statements = []
-
-                    # --- Ähnlichkeitsanalyse ---
-                    for prev_year, prev_df in data_by_year.items():
-                        if prev_year >= year:
-                            continue
-
-                        prev_statements = prev_df[
-                            (prev_df["Company"] == company) &
-                            (prev_df["Status"].str.lower() == status)
-                        ]["Aussage"].tolist()
-
-                        if not prev_statements:
-                            continue
-
-                        best_match = process.extractOne(
-                            statement, prev_statements, scorer=fuzz.token_sort_ratio
-                        )
-                        if best_match and best_match[1] >= similarity_threshold:
-                            repeated = True
-                            repeated_years.append(prev_year)
-                            matched_statements.append({
-                                "year": prev_year,
-                                "text": best_match[0],
-                                "score": best_match[1]
-                            })
-                    
-
-                    if repeated:
+                gruppe = index_by_year[year].get((company, status))
+                if gruppe is None:
+                    continue
+
+                # --- Ähnlichkeitsanalyse: ein vektorisierter Abgleich pro Vorjahr für die ganze Gruppe ---
+                vorjahre = [(prev_year, index_by_year[prev_year][(company, status)]) for prev_year in years
+                            if prev_year < year and (company, status) in index_by_year[prev_year]]
+                matches_pro_aussage = _finde_wiederholungen(gruppe, vorjahre, similarity_threshold)
+
+                # Schleife über jede einzelne Aussage der Gruppe
+                for statement, category, matched_statements in zip(gruppe["aussagen"], gruppe["kategorien"], matches_pro_aussage):
+                    if matched_statements:
                         results[company][status]["repeated"] += 1
                         results[company][status]["repeated_details"].append({
                             "statement": statement,
-                            "years": sorted(list(set(repeated_years))),
+                            "years": sorted({match["year"] for match in matched_statements}),
                             "matched_statements": matched_statements
                         })
                     else:
                         results[company][status]["new"] += 1
 
 
-                    # --- START: Integrierte SMART-Analyse ---
+                    # --- SMART-Analyse vormerken ---
                     if status == "planned" and category != 'No Biodiversity Relevance':
-                        prompt = smart_prompt_template.format(statement=statement)
-                        try:
-                            request_options = {"timeout": 60} 
-                            response = model.generate_content(
-                                prompt,
-                                request_options=request_options
-                            )
-                            
-                            cleaned_text = clean_json_response(response.text)
-                            json_response = json.loads(cleaned_text)
-
-                            is_truly_smart = json_response.get('smart', False)
-                            if is_truly_smart:
-                                for key in ['specific', 'measurable', 'achievable', 'relevant', 'time']:
-                                    if not json_response.get(key) or json_response.get(key) is False:
-                                        is_truly_smart = False
-                                        json_response['smart'] = False
-                                        break
-                            
-                            if is_truly_smart:
-                                results[company][status]["smart_count"] += 1
-                                results[company][status]["smart_statements_details"].append({
-                                    "statement": statement,
-                                    "analysis": json_response
-                                })
-                        
-                        except google_exceptions.GoogleAPICallError as e:
-                            print(f"\nAPI Call Error bei '{statement[:30]}...': {e}")
-                        except google_exceptions.DeadlineExceeded as e:
-                            print(f"\nTimeout (Deadline Exceeded) bei '{statement[:30]}...': Die API hat nicht rechtzeitig geantwortet.")
-                        except json.JSONDecodeError as e:
-                            print(f"\nJSON Decode Error bei '{statement[:30]}...': Die API-Antwort war kein valides JSON. Antwort: {response.text}")
-                        except Exception as e:
-                            print(f"\nEin unerwarteter Fehler ist aufgetreten bei '{statement[:30]}...': {type(e).__name__} - {e}")
-                        
-                        time.sleep(1) 
+                        smart_auftraege.append((company, statement))
+
+        # --- Integrierte SMART-Analyse: identische Aussagen einmal, gebündelt und persistent gespeichert; Auswertung in Original-Reihenfolge ---
+        bewertungen, fehlgeschlagen = bewerte_smart(gemini_model_version, [statement for _, statement in smart_auftraege], smart_speicher)
+        for company, statement in smart_auftraege:
+            if statement in fehlgeschlagen:
+                results[company]["planned"]["smart_failed"] += 1
+                results[company]["planned"]["smart_failed_statements"].append(statement)
+                continue
+            json_response = bewertungen.get(statement)
+            if json_response is not None and json_response.get('smart'):
+                results[company]["planned"]["smart_count"] += 1
+                results[company]["planned"]["smart_statements_details"].append({
+                    "statement": statement,
+                    "analysis": json_response
+                })
 
         # Schleife zur Berechnung der Prozentwerte
         for company, stats in results.items():
@@ -192,11 +238,7 @@ def analyze_measures_and_smartness(gemini_model_version, input_folder, output_fo
                     stats[status]["repeated_percent"] = 0.0
                 
                 if status == "planned":
-                    total_planned = total
-                    if total_planned > 0:
-                        stats[status]["smart_percent"] = round(stats[status]["smart_count"] / total_planned * 100, 2)
-                    else:
-                        stats[status]["smart_percent"] = 0.0
+                    stats[status]["smart_percent"] = _smart_anteil(stats[status])
 
         # Speichert Ergebnisse als JSON
         output_path = os.path.join(output_folder, f"{year}_analysis.json")
@@ -205,6 +247,8 @@ def analyze_measures_and_smartness(gemini_model_version, input_folder, output_fo
         
         print(f"Ergebnisse für {year} in '{output_path}' gespeichert.")
 
+    smart_speicher.close()
+    print(llm_client.cache.statistik())
     print(f"\nAnalyse vollständig abgeschlossen. Alle Ergebnisse gespeichert in: {output_folder}")
 
 
@@ -0,0 +1,126 @@
+import os
+import re
+from bisect import bisect_left
+from functools import lru_cache
+import pandas as pd
+
+# Suffixe und generische Begriffe, die für den Merge-Schlüssel entfernt werden.
+_MERGE_WOERTER = [
+    # Skandinavien
+    'ab', 'asa',
+    # UK / USA / International
+    'plc', 'limited', 'ltd', 'inc', 'incorporated', 'corp', 'corporation', 'group',
+    # Deutschland / Österreich
+    'ag', 'gmbh', 'se',
+    # Frankreich / Spanien / Italien / Lateinamerika
+    'sa', 'srl', 'spa',
+    # Niederlande / Belgien
+    'nv', 'bv',
+    # Allgemein
+    'the', 'holding', 'holdings',
+    # Report-spezifisch
+    'sustainability', 'report', 'relevant', 'passages', 'annual', 'integrated'
+]
+_MERGE_MUSTER = re.compile(r'\b(' + '|'.join(_MERGE_WOERTER) + r')\b')
+_JAHR_MUSTER = re.compile(r'(_)?\d{4}')
+_NICHT_ALPHANUMERISCH = re.compile(r'[^a-z0-9]')
+# Trennt den Firmennamen im Dateinamen von Jahr bzw. Report-Suffixen.
+_DATEINAME_SUFFIX = re.compile(r'_\d{4}|_relevant_passages|_sustainability_report')
+
+# Obergrenze für Präfix-Suchen: größer als jedes Zeichen eines normalisierten Namens ([a-z0-9]).
+_PRAEFIX_ENDE = '{'
+
+
+# Bereinigt Unternehmensnamen: nur Kleinbuchstaben und Ziffern, ohne sonstige Zeichen.
+def normalisiere_name(name) -> str:
+    if not isinstance(name, str):
+        return ""
+    return _NICHT_ALPHANUMERISCH.sub('', name.lower())
+
+# Robuster Schlüssel für den Abgleich von Dateinamen mit der Unternehmensliste (ohne Rechtsformen, Report-Begriffe und Jahre).
+@lru_cache(maxsize=None)
+def create_robust_merge_key(name: str) -> str:
+    if not isinstance(name, str): return ""
+    name = name.lower()
+
+    # Ersetzt Unterstriche und Bindestriche durch Leerzeichen
+    name = name.replace('_', ' ').replace('-', ' ')
+    name = _MERGE_MUSTER.sub('', name)
+    name = _JAHR_MUSTER.sub('', name)
+    name = _NICHT_ALPHANUMERISCH.sub('', name)
+    return name.strip()
+
+# Extrahiert den reinen Firmennamen vor Suffixen wie dem Jahr oder "_relevant_passages".
+def firmenname_aus_dateiname(unternehmen) -> str:
+    return _DATEINAME_SUFFIX.split(str(unternehmen), 1)[0]
+
+
+class UnternehmensIndex:
+    """
+    Index über die Unternehmensliste (sample_summary.xlsx), einmal aufgebaut und danach für alle Abfragen genutzt.
+    - Hash-Map normalisierter Name -> erste Zeile für exakte Treffer in O(1).
+    - Suffix-Array über alle normalisierten Namen für Teilstring-Suchen per Binärsuche in O(log n);
+      eine Sparse-Table liefert im Trefferbereich die kleinste Zeilennummer in O(1), also wie bisher
+      das erste passende Unternehmen in der Reihenfolge der Tabelle.
+    """
+
+    def __init__(self, df_summary: pd.DataFrame):
+        self.df = df_summary.reset_index(drop=True)
+        self.namen = [normalisiere_name(name) for name in self.df['Company']]
+
+        self._exakt = {}
+        for zeile, name in enumerate(self.namen):
+            self._exakt.setdefault(name, zeile)
+
+        # Jeder Suffix erscheint nur einmal, mit der kleinsten Zeile, in der er vorkommt.
+        erste_zeile = {}
+        for zeile, name in enumerate(self.namen):
+            for start in range(len(name)):
+                erste_zeile.setdefault(name[start:], zeile)
+        self._suffixe = sorted(erste_zeile)
+        zeilen = [erste_zeile[suffix] for suffix in self._suffixe]
+
+        # Sparse-Table für Bereichs-Minima: Stufe k enthält das Minimum über 2**k aufeinanderfolgende Suffixe.
+        self._minima = [zeilen]
+        breite = 1
+        while 2 * breite <= len(zeilen):
+            vorher = self._minima[-1]
+            self._minima.append([min(vorher[i], vorher[i + breite]) for i in range(len(vorher) - breite)])
+            breite *= 2
+
+    def __len__(self):
+        return len(self.namen)
+
+    def exakt(self, name) -> int | None:
+        """Zeile des ersten Unternehmens mit genau diesem (normalisierten) Namen."""
+        return self._exakt.get(normalisiere_name(name))
+
+    def finde(self, name) -> int | None:
+        """Zeile des ersten Unternehmens, dessen normalisierter Name den normalisierten 'name' enthält."""
+        teil = normalisiere_name(name)
+        if not teil:
+            # Der leere String ist in jedem Namen enthalten.
+            return 0 if self.namen else None
+        von = bisect_left(self._suffixe, teil)
+        bis = bisect_left(self._suffixe, teil + _PRAEFIX_ENDE, von)
+        if von == bis:
+            return None
+        stufe = (bis - von).bit_length() - 1
+        minima = self._minima[stufe]
+        return min(minima[von], minima[bis - (1 << stufe)])
+
+    def enthaelt(self, name) -> bool:
+        """True, wenn der normalisierte 'name' in mindestens einem Unternehmensnamen vorkommt."""
+        return self.exakt(name) is not None or self.finde(name) is not None
+
+    def zeile(self, zeile: int) -> dict:
+        return self.df.iloc[zeile].to_dict()
+
+
+@lru_cache(maxsize=4)
+def _lade_index(pfad: str, mtime: float) -> UnternehmensIndex:
+    return UnternehmensIndex(pd.read_excel(pfad))
+
+# Lädt den Index für eine Unternehmensliste; innerhalb eines Prozesses wird die Datei nur bei Änderungen neu gelesen.
+def lade_unternehmens_index(pfad: str) -> UnternehmensIndex:
+    return _lade_index(os.path.abspath(pfad), os.path.getmtime(pfad))
@@ -1,47 +1,78 @@
 import os
 import json
-from difflib import SequenceMatcher
-from functions.status import load_status, save_status
+import numpy as np
+from rapidfuzz import fuzz, process
+from config import dedup_aehnlichkeit_schwelle, dedup_chunk_groesse
+from functions.provenienz import aus_seitenangabe, seiten_angabe, vereinige
+from functions.status import pending_files, save_status
 
 CURRENT_STAGE_KEY_DEDUPE = "deduplicate_statements"
 
-# Funktion zur Berechnung der Ähnlichkeit zwischen zwei Texten
-def _calculate_similarity(a, b):
-    """Calculates a similarity ratio between two strings."""
-    return SequenceMatcher(None, a, b).ratio()
+# Ordnet jeder Aussage den Index der ersten einzigartigen Aussage zu, deren Ähnlichkeit über der Schwelle liegt
+# (sich selbst, wenn es keine gibt). Identische Texte werden vorab zusammengefasst, die übrigen blockweise mit
+# rapidfuzz.process.cdist gegen alle früheren Aussagen bewertet. Die Reihenfolge-Semantik bleibt erhalten.
+def finde_repraesentanten(statements: list[str], similarity_threshold: float = dedup_aehnlichkeit_schwelle,
+                           chunk_groesse: int = dedup_chunk_groesse) -> list[int]:
+    # Bei einer Schwelle unter 1 ist ein identischer Text immer ein Duplikat seines ersten Vorkommens.
+    texte = []
+    position_pro_text = {}
+    positionen = []
+    for i, statement in enumerate(statements):
+        if similarity_threshold >= 1 or statement not in position_pro_text:
+            position_pro_text.setdefault(statement, len(texte))
+            positionen.append(len(texte))
+            texte.append((i, statement))
+        else:
+            positionen.append(position_pro_text[statement])
+
+    cutoff = similarity_threshold * 100
+    nur_texte = [statement for _, statement in texte]
+    ist_einzigartig = np.zeros(len(texte), dtype=bool)
+    repraesentant = list(range(len(texte)))
+    # Schleife über Blöcke von Aussagen; jeder Block wird gegen sich selbst und alle früheren Aussagen bewertet.
+    for start in range(0, len(texte), chunk_groesse):
+        ende = min(start + chunk_groesse, len(texte))
+        scores = process.cdist(nur_texte[start:ende], nur_texte[:ende], scorer=fuzz.ratio,
+                               score_cutoff=cutoff, dtype=np.float32, workers=-1)
+        # Schleife über die Aussagen des Blocks in Eingabe-Reihenfolge; Treffer zählen nur bei früheren einzigartigen Aussagen.
+        for zeile, i in enumerate(range(start, ende)):
+            kandidaten = np.flatnonzero(scores[zeile, :i] > cutoff)
+            treffer = kandidaten[ist_einzigartig[kandidaten]]
+            if len(treffer):
+                repraesentant[i] = int(treffer[0])
+            else:
+                ist_einzigartig[i] = True
+
+    return [texte[repraesentant[position]][0] for position in positionen]
 
 # Funktion zum Entfernen von Duplikaten und Fast-Duplikaten
-def _remove_near_duplicates(statements: list[str], similarity_threshold: float = 0.9) -> list[str]:
+def _remove_near_duplicates(statements: list[str], similarity_threshold: float = dedup_aehnlichkeit_schwelle) -> list[str]:
     """
     Filters a list of strings, removing entries that are too similar.
     """
+    repraesentanten = finde_repraesentanten(statements, similarity_threshold)
+    return [statement for i, statement in enumerate(statements) if repraesentanten[i] == i]
+
+# Dedupliziert Aussagen und vereinigt die Provenienz entfernter Duplikate mit der ihres Repräsentanten.
+def _dedupliziere_mit_provenienz(statements: list[str], provenienzen: list[list[dict]]) -> tuple[list[str], dict]:
+    repraesentanten = finde_repraesentanten(statements)
     unique_statements = []
-    # Schleife über jede Aussage
-    for statement in statements:
-        is_duplicate = False
-        # Schleife über die bereits als einzigartig identifizierten Aussagen
-        for unique_statement in unique_statements:
-            if _calculate_similarity(statement, unique_statement) > similarity_threshold:
-                is_duplicate = True
-                break
-        
-        if not is_duplicate:
-            unique_statements.append(statement)
-            
-    return unique_statements
+    aussagen_provenienz = {}
+    for i, statement in enumerate(statements):
+        kept = statements[repraesentanten[i]]
+        if repraesentanten[i] == i:
+            unique_statements.append(kept)
+        aussagen_provenienz[kept] = vereinige(aussagen_provenienz.get(kept), provenienzen[i])
+    return unique_statements, aussagen_provenienz
 
 def deduplicate_globally_per_file(input_ordner: str):
     # Hauptfunktion
     print("--- Starte globale Deduplizierung von Actions und Metrics pro Datei ---")
 
-    # Schleife über alle Dateien im angegebenen Ordner
-    for dateiname in os.listdir(input_ordner):
-        if not dateiname.lower().endswith(".json"):
-            continue
-
-        if load_status(dateiname, CURRENT_STAGE_KEY_DEDUPE):
-            continue
+    json_dateien = [d for d in os.listdir(input_ordner) if d.lower().endswith(".json")]
 
+    # Schleife über alle noch offenen Dateien im angegebenen Ordner
+    for dateiname in pending_files(json_dateien, CURRENT_STAGE_KEY_DEDUPE):
         print(f"\nVerarbeite Datei zur globalen Deduplizierung: {dateiname}")
         voller_pfad = os.path.join(input_ordner, dateiname)
 
@@ -51,24 +82,31 @@ def deduplicate_globally_per_file(input_ordner: str):
 
             all_actions_in_file = []
             all_metrics_in_file = []
+            action_provenienzen = []
+            metric_provenienzen = []
             all_keywords_in_file = set()
 
-            # Schleife über jede Passage, um alle Aussagen und Keywords zu sammeln
+            # Schleife über jede Passage, um alle Aussagen, ihre Provenienz und Keywords zu sammeln.
+            # Ohne Provenienz pro Aussage (ältere Läufe) gilt die Seitenangabe der Passage.
             for passage_obj in data.get('biodiversity_passages', []):
+                aussagen_provenienz = passage_obj.get('aussagen_provenienz', {})
+                seiten_der_passage = aus_seitenangabe(passage_obj.get('page_range'))
                 if 'actions' in passage_obj:
                     all_actions_in_file.extend(passage_obj['actions'])
+                    action_provenienzen.extend(aussagen_provenienz.get(a, seiten_der_passage) for a in passage_obj['actions'])
                 if 'metrics' in passage_obj:
                     all_metrics_in_file.extend(passage_obj['metrics'])
+                    metric_provenienzen.extend(aussagen_provenienz.get(m, seiten_der_passage) for m in passage_obj['metrics'])
                 if 'found_keywords' in passage_obj:
                     all_keywords_in_file.update(passage_obj['found_keywords'])
 
             # Führe die Deduplizierung auf den globalen Listen durch
             initial_action_count = len(all_actions_in_file)
-            unique_actions = _remove_near_duplicates(all_actions_in_file)
+            unique_actions, provenienz_actions = _dedupliziere_mit_provenienz(all_actions_in_file, action_provenienzen)
             final_action_count = len(unique_actions)
 
             initial_metric_count = len(all_metrics_in_file)
-            unique_metrics = _remove_near_duplicates(all_metrics_in_file)
+            unique_metrics, provenienz_metrics = _dedupliziere_mit_provenienz(all_metrics_in_file, metric_provenienzen)
             final_metric_count = len(unique_metrics)
 
             # Prüfe, ob Änderungen vorgenommen wurden
@@ -76,13 +114,18 @@ def deduplicate_globally_per_file(input_ordner: str):
                 print(f"  -> Actions von {initial_action_count} auf {final_action_count} reduziert.")
                 print(f"  -> Metrics von {initial_metric_count} auf {final_metric_count} reduziert.")
 
-                # Erstelle ein neues, konsolidiertes Passage-Objekt
+                # Erstelle ein neues, konsolidiertes Passage-Objekt. Die Seiten bleiben pro Aussage in
+                # "aussagen_provenienz" erhalten, inklusive der Fundstellen entfernter Duplikate.
+                aussagen_provenienz = {aussage: vereinige(provenienz_actions.get(aussage), provenienz_metrics.get(aussage))
+                                       for aussage in {**provenienz_actions, **provenienz_metrics}}
+                alle_seiten = seiten_angabe(vereinige(*aussagen_provenienz.values()))
                 consolidated_passage = {
-                    "page_range": "Gesamtes Dokument",
+                    "page_range": alle_seiten or "Gesamtes Dokument",
                     "passage_text": ["Konsolidierte Aussagen nach globaler Deduplizierung."],
                     "actions": unique_actions,
                     "metrics": unique_metrics,
-                    "found_keywords": sorted(list(all_keywords_in_file))
+                    "found_keywords": sorted(list(all_keywords_in_file)),
+                    "aussagen_provenienz": aussagen_provenienz
                 }
 
                 # Ersetze die alte Liste von Passagen durch die neue
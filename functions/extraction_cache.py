@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+import tempfile
+import srsly
+
+# Wird erhöht, sobald sich der Aufbau der gespeicherten Analyse ändert; alte Einträge werden dann ignoriert.
+CACHE_FORMAT_VERSION = 1
+
+
+# Berechnet den SHA-256 einer Datei, ohne sie komplett in den Speicher zu laden.
+def pdf_hash(pfad: str) -> str:
+    sha = hashlib.sha256()
+    with open(pfad, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+# Schreibt Bytes atomar (Temp-Datei + Rename), damit parallele Worker nie halbe Dateien lesen.
+def _schreibe_atomar(pfad: str, daten: bytes):
+    directory = os.path.dirname(pfad) or "."
+    fd, tmp_path = tempfile.mkstemp(prefix=".cache_", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(daten)
+        os.replace(tmp_path, pfad)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class AnalyseCache:
+    """
+    Inhaltsadressierter Cache für die Text-Extraktion.
+    Pro PDF (SHA-256) werden die erkannte Sprache und pro Modellversion die Seiten mit Sätzen,
+    Satz-Offsets und Lemmata als msgpack abgelegt. Zusätzlich werden lemmatisierte Suchbegriffe
+    pro Modellversion vorgehalten, sodass eine neue Suchbegriff-Liste kein spaCy-Modell laden muss.
+    """
+
+    def __init__(self, ordner: str):
+        self.ordner = ordner
+        os.makedirs(ordner, exist_ok=True)
+
+    def _pfad(self, name: str) -> str:
+        return os.path.join(self.ordner, name)
+
+    def lade_sprache(self, sha: str):
+        try:
+            with open(self._pfad(f"{sha}.lang"), 'r', encoding='utf-8') as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def speichere_sprache(self, sha: str, lang_code: str):
+        _schreibe_atomar(self._pfad(f"{sha}.lang"), lang_code.encode('utf-8'))
+
+    def lade_analyse(self, sha: str, modell_kennung: str):
+        pfad = self._pfad(f"{sha}.{modell_kennung}.msgpack")
+        if not os.path.exists(pfad):
+            return None
+        try:
+            with open(pfad, 'rb') as f:
+                eintrag = srsly.msgpack_loads(f.read())
+        except Exception as e:
+            print(f"  Warnung: Cache-Eintrag '{pfad}' ist unlesbar ({e}). Analysiere neu.")
+            return None
+        if eintrag.get("version") != CACHE_FORMAT_VERSION:
+            return None
+        return eintrag["seiten"]
+
+    def speichere_analyse(self, sha: str, modell_kennung: str, seiten_analyse):
+        eintrag = {"version": CACHE_FORMAT_VERSION, "seiten": seiten_analyse}
+        _schreibe_atomar(self._pfad(f"{sha}.{modell_kennung}.msgpack"), srsly.msgpack_dumps(eintrag))
+
+    def lade_keyword_lemmata(self, modell_kennung: str) -> dict:
+        try:
+            with open(self._pfad(f"keyword_lemmata.{modell_kennung}.json"), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def speichere_keyword_lemmata(self, modell_kennung: str, keyword_lemmata: dict):
+        daten = json.dumps(keyword_lemmata, ensure_ascii=False, indent=4).encode('utf-8')
+        _schreibe_atomar(self._pfad(f"keyword_lemmata.{modell_kennung}.json"), daten)
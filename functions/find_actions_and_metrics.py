@@ -1,12 +1,11 @@
 import os
-import time
 from dotenv import load_dotenv
-import google.generativeai as genai
 import json
-from functions.status import load_status, save_status
+from functions.llm_client import get_llm_client
+from functions.provenienz import vereinige, verorte_aussage
+from functions.status import pending_files, save_status
 
 load_dotenv()
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
 # --- KONSTANTEN UND PROMPT ---
 CURRENT_STAGE_KEY_DETAILS = "extract_actions_and_metrics"
@@ -32,56 +31,49 @@ Text Passage:
 \"\"\"
 """
 
-# API-Cache, um wiederholte Anfragen für denselben Text zu vermeiden
-api_cache = {}
+# Prüft, ob die API-Antwort ein JSON-Objekt ist. Nur solche Antworten werden im LLM-Cache gespeichert.
+def _ist_json_objekt(response_text: str) -> bool:
+    clean_response = response_text.strip()
+    return clean_response.startswith('{') and clean_response.endswith('}') and isinstance(json.loads(clean_response), dict)
 
 def gemini_find_actions_and_metrics(gemini_model_version, text: str) -> dict:
     if not text or not isinstance(text, str):
         return {"actions": [], "metrics": []}
-    
-    if text in api_cache:
-        return api_cache[text]
 
-    model = genai.GenerativeModel(gemini_model_version)
+    llm_client = get_llm_client(gemini_model_version)
     generation_config = {"response_mime_type": "application/json"}
     
     max_retries = 3
-    # Schleife für die API-Aufrufe mit Wiederholungslogik
+    # Schleife für die API-Aufrufe mit Wiederholungslogik. Rate-Limits und Serverfehler wiederholt bereits der LLM-Client,
+    # bereits beantwortete Passagen kommen direkt aus dem persistenten LLM-Cache.
     for attempt in range(max_retries):
-        response = None
+        response_text = None
         try:
             # API-Aufruf
-            response = model.generate_content(
+            response_text = llm_client.generate(
                 PROMPT_FIND_ACTIONS_AND_METRICS.format(text_passage=text),
-                generation_config=generation_config
+                generation_config=generation_config,
+                template_id="actions_and_metrics",
+                validate=_ist_json_objekt
             )
         except Exception as e:
             # Fängt den Fehler ab, falls schon der API-Aufruf selbst scheitert.
             print(f"  Warnung: API-Aufruf selbst ist fehlgeschlagen (Versuch {attempt + 1}). Fehler: {e}")
-            if attempt < max_retries - 1:
-                time.sleep(2)
-                continue # Nächsten Versuch starten
-            else:
-                break # Maximale Versuche erreicht
+            continue
 
         # Wenn die Antwort erfolgreich war, wird sie verarbeitet
-        if response and response.text:
-            clean_response = response.text.strip()
+        if response_text:
+            clean_response = response_text.strip()
             if clean_response.startswith('{') and clean_response.endswith('}'):
                 try:
                     result = json.loads(clean_response)
                     result.setdefault("actions", [])
                     result.setdefault("metrics", [])
-                    api_cache[text] = result
                     return result
                 except json.JSONDecodeError:
                     # Dieser Fall ist nur zur Sicherheit, falls das JSON trotzdem fehlerhaft ist.
                     print(f"  Warnung: JSON-Antwort war fehlerhaft (Versuch {attempt + 1}).")
 
-        # Wenn nach einem erfolgreichen Aufruf die Antwort leer/ungültig ist, wird der nächste Versuch gestartet.
-        if attempt < max_retries - 1:
-            time.sleep(2)
-
     # Wenn die Schleife ohne erfolgreiches "return" durchläuft, wird die Passage übersprungen.
     print(f"  Info: Passage konnte nach {max_retries} Versuchen nicht verarbeitet werden und wird übersprungen.")
     return {"actions": [], "metrics": []}
@@ -90,15 +82,12 @@ def gemini_find_actions_and_metrics(gemini_model_version, text: str) -> dict:
 def extract_details_from_passages(gemini_model_version, ordner_pfad: str):
     # Durchläuft JSON-Dateien, extrahiert Aktionen/Metriken aus Textpassagen und speichert die angereicherten Daten zurück in die Datei.
     print("--- Starte Extraktion von Aktionen & Metriken ---")
+    llm_client = get_llm_client(gemini_model_version)
     
-    # Iteriert über alle Dateien im angegebenen Ordner
-    for dateiname in os.listdir(ordner_pfad):
-        if not dateiname.lower().endswith(".json"):
-            continue
-
-        if load_status(dateiname, CURRENT_STAGE_KEY_DETAILS):
-            continue
+    json_dateien = [d for d in os.listdir(ordner_pfad) if d.lower().endswith(".json")]
 
+    # Iteriert über alle noch offenen Dateien im angegebenen Ordner
+    for dateiname in pending_files(json_dateien, CURRENT_STAGE_KEY_DETAILS):
         print(f"\nVerarbeite Datei: {dateiname}")
         voller_pfad = os.path.join(ordner_pfad, dateiname)
         datei_geaendert = False
@@ -107,31 +96,51 @@ def extract_details_from_passages(gemini_model_version, ordner_pfad: str):
             with open(voller_pfad, 'r', encoding='utf-8') as f:
                 data = json.load(f)
 
-            # Iteriert über jede Textpassage in der JSON-Datei
+            # Sammelt alle Text-Snippets der Datei, damit die API-Aufrufe nebenläufig laufen können.
+            # Zu jedem Snippet gehört seine Seiten-Provenienz (leer bei Dateien aus älteren Läufen).
+            snippets_pro_passage = []
             for passage_obj in data.get('biodiversity_passages', []):
                 texte_zum_pruefen = passage_obj.get('passage_text', [])
-                
+                provenienz_pro_text = passage_obj.get('provenienz', [])
                 if isinstance(texte_zum_pruefen, str):
                     texte_zum_pruefen = [texte_zum_pruefen]
+                    provenienz_pro_text = [provenienz_pro_text]
+                snippets_pro_passage.append([
+                    (t, provenienz_pro_text[i] if i < len(provenienz_pro_text) else [])
+                    for i, t in enumerate(texte_zum_pruefen) if t.strip()
+                ])
+
+            alle_snippets = [snippet for snippets in snippets_pro_passage for snippet, _ in snippets]
+            details_pro_snippet = iter(list(llm_client.map(
+                lambda snippet: gemini_find_actions_and_metrics(gemini_model_version, snippet),
+                alle_snippets
+            )))
 
-                if not texte_zum_pruefen:
+            # Iteriert über jede Textpassage in der JSON-Datei
+            for passage_obj, snippets in zip(data.get('biodiversity_passages', []), snippets_pro_passage):
+                if not snippets:
                     continue
 
                 alle_gefundenen_actions = []
                 alle_gefundenen_metrics = []
+                aussagen_provenienz = {}
 
-                # Iteriert über jeden Text-Snippet in der Passage
-                for text_snippet in texte_zum_pruefen:
-                    if not text_snippet.strip():
-                        continue
-                    
-                    details = gemini_find_actions_and_metrics(gemini_model_version, text_snippet)
+                # Iteriert über die Ergebnisse jedes Text-Snippets der Passage
+                for snippet, segmente in snippets:
+                    details = next(details_pro_snippet)
                     
                     if details.get("actions"):
                         alle_gefundenen_actions.extend(details["actions"])
                     if details.get("metrics"):
                         alle_gefundenen_metrics.extend(details["metrics"])
 
+                    # Verortet jede gefundene Aussage auf Seite und Offsets innerhalb ihres Snippets.
+                    for aussage in (details.get("actions") or []) + (details.get("metrics") or []):
+                        aussagen_provenienz[aussage] = vereinige(aussagen_provenienz.get(aussage), verorte_aussage(snippet, segmente, aussage))
+
+                if aussagen_provenienz:
+                    passage_obj["aussagen_provenienz"] = aussagen_provenienz
+
                 if alle_gefundenen_actions:
                     passage_obj["actions"] = sorted(list(set(alle_gefundenen_actions)))
                     datei_geaendert = True
@@ -150,4 +159,6 @@ def extract_details_from_passages(gemini_model_version, ordner_pfad: str):
             save_status(dateiname, CURRENT_STAGE_KEY_DETAILS)
 
         except Exception as e:
-            print(f"  Fehler bei der Verarbeitung von '{dateiname}': {e}")
\ No newline at end of file
+            print(f"  Fehler bei der Verarbeitung von '{dateiname}': {e}")
+
+    print(llm_client.cache.statistik())
@@ -0,0 +1,92 @@
+from collections import deque
+
+
+# Prüft, ob ein Zeichen für Pythons \b als Wortzeichen gilt.
+def _ist_wortzeichen(zeichen) -> bool:
+    return zeichen is not None and (zeichen.isalnum() or zeichen == '_')
+
+# Kleinschreibung, die die Textlänge nicht verändert, damit Treffer-Spans auf den Originaltext passen.
+def _falte(text: str) -> str:
+    lower = text.lower()
+    if len(lower) == len(text):
+        return lower
+    return "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick-Automat für eine feste Liste von Suchbegriffen.
+    Findet alle Begriffe in einem einzigen Durchlauf über den Text, ohne Beachtung der Groß-/Kleinschreibung
+    und mit derselben Wortgrenzen-Logik wie r'\\b' + re.escape(keyword) + r'\\b'.
+    """
+
+    def __init__(self, keywords):
+        # Reihenfolge der Liste bleibt erhalten, Duplikate und leere Begriffe werden ignoriert.
+        self.keywords = [kw for kw in dict.fromkeys(keywords) if kw]
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[int]] = [[]]
+
+        for kw_id, keyword in enumerate(self.keywords):
+            knoten = 0
+            for zeichen in _falte(keyword):
+                naechster = self._goto[knoten].get(zeichen)
+                if naechster is None:
+                    naechster = len(self._goto)
+                    self._goto[knoten][zeichen] = naechster
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                knoten = naechster
+            self._out[knoten].append(kw_id)
+
+        # Breitensuche zum Setzen der Fehler-Links; Ausgaben der Suffix-Knoten werden übernommen.
+        warteschlange = deque(self._goto[0].values())
+        while warteschlange:
+            knoten = warteschlange.popleft()
+            for zeichen, kind in self._goto[knoten].items():
+                warteschlange.append(kind)
+                fallback = self._fail[knoten]
+                while fallback and zeichen not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                ziel = self._goto[fallback].get(zeichen, 0)
+                self._fail[kind] = ziel if ziel != kind else 0
+                self._out[kind] = self._out[kind] + self._out[self._fail[kind]]
+
+        self._laengen = [len(kw) for kw in self.keywords]
+
+    def __bool__(self):
+        return bool(self.keywords)
+
+    def _an_wortgrenze(self, text: str, start: int, ende: int) -> bool:
+        vorher = text[start - 1] if start > 0 else None
+        nachher = text[ende] if ende < len(text) else None
+        return (_ist_wortzeichen(vorher) != _ist_wortzeichen(text[start])
+                and _ist_wortzeichen(text[ende - 1]) != _ist_wortzeichen(nachher))
+
+    def finditer(self, text: str):
+        """Liefert (keyword, start, ende) für jeden Treffer, auch überlappende."""
+        if not text or not self.keywords:
+            return
+        goto, fail, out, laengen = self._goto, self._fail, self._out, self._laengen
+        knoten = 0
+        for i, zeichen in enumerate(_falte(text)):
+            while knoten and zeichen not in goto[knoten]:
+                knoten = fail[knoten]
+            knoten = goto[knoten].get(zeichen, 0)
+            for kw_id in out[knoten]:
+                ende = i + 1
+                start = ende - laengen[kw_id]
+                if self._an_wortgrenze(text, start, ende):
+                    yield self.keywords[kw_id], start, ende
+
+    def search(self, text: str) -> bool:
+        """True, sobald irgendein Suchbegriff im Text vorkommt."""
+        for _ in self.finditer(text):
+            return True
+        return False
+
+    def found_keywords(self, text: str) -> list[str]:
+        """Alle im Text enthaltenen Suchbegriffe, in der Reihenfolge der Suchbegriff-Liste."""
+        gefunden = {keyword for keyword, _, _ in self.finditer(text)}
+        return [kw for kw in self.keywords if kw in gefunden]
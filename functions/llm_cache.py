@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+# Bildet den Cache-Schlüssel aus Modell, Prompt-Vorlage, fertigem Prompt und Generierungs-Konfiguration.
+def cache_schluessel(gemini_model_version: str, template_id, prompt: str, generation_config=None) -> str:
+    inhalt = json.dumps([gemini_model_version, template_id, prompt, generation_config], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(inhalt.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """
+    Persistenter, inhaltsadressierter Cache für LLM-Antworten in einer SQLite-Datei.
+    Wird die Größenobergrenze überschritten, werden die am längsten nicht genutzten Einträge entfernt.
+    Treffer und Fehlschläge werden pro Prozess gezählt.
+    """
+
+    def __init__(self, pfad: str, max_bytes: int):
+        self.pfad = pfad
+        self.max_bytes = max_bytes
+        self.treffer = 0
+        self.fehlschlaege = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(pfad)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(pfad, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS antworten ("
+            " schluessel TEXT PRIMARY KEY,"
+            " antwort TEXT NOT NULL,"
+            " groesse INTEGER NOT NULL,"
+            " zuletzt_genutzt REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_zuletzt_genutzt ON antworten (zuletzt_genutzt)")
+        self._groesse = self._conn.execute("SELECT COALESCE(SUM(groesse), 0) FROM antworten").fetchone()[0]
+
+    def get(self, schluessel: str):
+        """Gibt die gespeicherte Antwort zurück (oder None) und markiert den Eintrag als zuletzt genutzt."""
+        with self._lock:
+            zeile = self._conn.execute("SELECT antwort FROM antworten WHERE schluessel = ?", (schluessel,)).fetchone()
+            if zeile is None:
+                self.fehlschlaege += 1
+                return None
+            self.treffer += 1
+            self._conn.execute("UPDATE antworten SET zuletzt_genutzt = ? WHERE schluessel = ?", (time.time(), schluessel))
+            return zeile[0]
+
+    def set(self, schluessel: str, antwort: str):
+        groesse = len(antwort.encode('utf-8'))
+        with self._lock:
+            alt = self._conn.execute("SELECT groesse FROM antworten WHERE schluessel = ?", (schluessel,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO antworten (schluessel, antwort, groesse, zuletzt_genutzt) VALUES (?, ?, ?, ?)",
+                (schluessel, antwort, groesse, time.time())
+            )
+            self._groesse += groesse - (alt[0] if alt else 0)
+            if self.max_bytes and self._groesse > self.max_bytes:
+                self._raeume_auf()
+
+    def entferne(self, schluessel: str):
+        with self._lock:
+            alt = self._conn.execute("SELECT groesse FROM antworten WHERE schluessel = ?", (schluessel,)).fetchone()
+            if alt is None:
+                return
+            self._conn.execute("DELETE FROM antworten WHERE schluessel = ?", (schluessel,))
+            self._groesse -= alt[0]
+
+    def _raeume_auf(self):
+        # Entfernt die ältesten Einträge, bis der Cache wieder auf 90 % der Obergrenze geschrumpft ist.
+        ziel = self.max_bytes * 0.9
+        entfernt = []
+        for schluessel, groesse in self._conn.execute("SELECT schluessel, groesse FROM antworten ORDER BY zuletzt_genutzt"):
+            if self._groesse <= ziel:
+                break
+            entfernt.append((schluessel,))
+            self._groesse -= groesse
+        self._conn.executemany("DELETE FROM antworten WHERE schluessel = ?", entfernt)
+
+    def statistik(self) -> str:
+        anfragen = self.treffer + self.fehlschlaege
+        quote = (self.treffer / anfragen * 100) if anfragen else 0.0
+        return f"LLM-Cache: {self.treffer} Treffer, {self.fehlschlaege} Fehlschläge ({quote:.1f} % Trefferquote), {self._groesse / 1024 / 1024:.1f} MB"
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
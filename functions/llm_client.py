@@ -0,0 +1,188 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from config import gemini_max_concurrency, gemini_max_retries, gemini_requests_per_minute, gemini_tokens_per_minute, llm_cache_pfad, llm_cache_max_mb
+from functions.llm_cache import LLMCache, cache_schluessel
+
+load_dotenv()
+
+# Fehler, bei denen sich ein erneuter Versuch lohnt: Rate-Limits (429) und Serverfehler (5xx).
+RETRYABLE_EXCEPTIONS = (
+    google_exceptions.TooManyRequests,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServerError,
+    google_exceptions.DeadlineExceeded,
+)
+
+
+class TokenBucket:
+    """
+    Einfacher Token-Bucket: füllt sich mit 'rate_per_minute' pro Minute bis zur Kapazität einer Minute auf.
+    Der Stand darf durch nachträgliche Korrekturen (tatsächlicher Token-Verbrauch) negativ werden.
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.rate_per_minute = rate_per_minute
+        self.kapazitaet = float(rate_per_minute)
+        self._stand = self.kapazitaet
+        self._letzte_auffuellung = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _auffuellen(self):
+        jetzt = time.monotonic()
+        self._stand = min(self.kapazitaet, self._stand + (jetzt - self._letzte_auffuellung) * self.rate_per_minute / 60.0)
+        self._letzte_auffuellung = jetzt
+
+    def acquire(self, menge: float = 1.0):
+        """Blockiert, bis 'menge' verfügbar ist, und bucht sie ab."""
+        if not self.rate_per_minute:
+            return
+        menge = min(menge, self.kapazitaet)
+        while True:
+            with self._lock:
+                self._auffuellen()
+                if self._stand >= menge:
+                    self._stand -= menge
+                    return
+                wartezeit = (menge - self._stand) * 60.0 / self.rate_per_minute
+            time.sleep(wartezeit)
+
+    def korrigiere(self, differenz: float):
+        """Bucht nachträglich zusätzlichen (positiv) oder zu viel gebuchten (negativ) Verbrauch."""
+        if not self.rate_per_minute:
+            return
+        with self._lock:
+            self._auffuellen()
+            self._stand = min(self.kapazitaet, self._stand - differenz)
+
+
+# Grobe Schätzung der Token-Anzahl eines Prompts (ca. 4 Zeichen pro Token).
+def schaetze_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class GeminiClient:
+    """
+    Gemeinsamer Zugang zur Gemini-API für alle LLM-Stages.
+    Begrenzt Requests/min und Tokens/min über Token-Buckets, hält höchstens 'max_concurrency' Requests
+    gleichzeitig offen und wiederholt 429/5xx-Fehler mit exponentiellem Backoff und Jitter.
+    Mit 'cache' werden Antworten persistent über Läufe und Stages hinweg wiederverwendet.
+    """
+
+    def __init__(self, gemini_model_version: str, cache: LLMCache | None = None, max_concurrency: int = gemini_max_concurrency,
+                 requests_per_minute: int = gemini_requests_per_minute, tokens_per_minute: int = gemini_tokens_per_minute,
+                 max_retries: int = gemini_max_retries, basis_wartezeit: float = 2.0, max_wartezeit: float = 60.0):
+        self.gemini_model_version = gemini_model_version
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max(1, max_retries)
+        self.basis_wartezeit = basis_wartezeit
+        self.max_wartezeit = max_wartezeit
+        self.cache = cache
+        self._model = genai.GenerativeModel(gemini_model_version)
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="gemini")
+
+    def _wartezeit(self, versuch: int) -> float:
+        return min(self.max_wartezeit, self.basis_wartezeit * (2 ** versuch)) * random.uniform(0.5, 1.5)
+
+    def generate(self, prompt: str, generation_config=None, request_options=None, template_id=None, validate=None) -> str:
+        """
+        Sendet einen Prompt und gibt den Antworttext zurück. Nicht wiederholbare Fehler werden weitergereicht.
+        'template_id' benennt die Prompt-Vorlage für den Cache-Schlüssel; 'validate' prüft eine Antwort,
+        bevor sie gecacht wird, sodass unbrauchbare Antworten beim nächsten Lauf erneut angefragt werden.
+        'validate' lehnt eine Antwort ab, indem es eine Ausnahme auslöst oder False zurückgibt; jeder andere
+        Rückgabewert (auch eine leere Liste) gilt als gültig.
+        """
+        schluessel = None
+        if self.cache is not None:
+            schluessel = cache_schluessel(self.gemini_model_version, template_id, prompt, generation_config)
+            gecacht = self.cache.get(schluessel)
+            if gecacht is not None:
+                if validate is None or _ist_gueltig(validate, gecacht):
+                    return gecacht
+                self.cache.entferne(schluessel)
+
+        antwort = self._sende(prompt, generation_config, request_options)
+        if schluessel is not None and antwort and (validate is None or _ist_gueltig(validate, antwort)):
+            self.cache.set(schluessel, antwort)
+        return antwort
+
+    def _sende(self, prompt: str, generation_config=None, request_options=None) -> str:
+        geschaetzt = schaetze_tokens(prompt)
+        for versuch in range(self.max_retries):
+            self._requests.acquire(1)
+            self._tokens.acquire(geschaetzt)
+            try:
+                with self._slots:
+                    response = self._model.generate_content(
+                        prompt,
+                        generation_config=generation_config,
+                        request_options=request_options
+                    )
+                usage = getattr(response, "usage_metadata", None)
+                if usage is not None and getattr(usage, "total_token_count", 0):
+                    self._tokens.korrigiere(usage.total_token_count - geschaetzt)
+                return response.text
+            except RETRYABLE_EXCEPTIONS as e:
+                if versuch == self.max_retries - 1:
+                    raise
+                wartezeit = self._wartezeit(versuch)
+                print(f"    API-Limit/Serverfehler (Versuch {versuch + 1}/{self.max_retries}): {e}. Warte {wartezeit:.1f}s...")
+                time.sleep(wartezeit)
+
+    def map(self, funktion, elemente):
+        """Wendet 'funktion' nebenläufig auf alle Elemente an; die Ergebnisse kommen in Eingabe-Reihenfolge."""
+        return self._executor.map(funktion, elemente)
+
+
+# Führt eine Validierungsfunktion aus; nur Ausnahmen und ein explizites False zählen als ungültige Antwort.
+# Parser dürfen so ihr Ergebnis zurückgeben, auch wenn es leer ist (z. B. keine relevanten Sätze).
+def _ist_gueltig(validate, antwort: str) -> bool:
+    try:
+        return validate(antwort) is not False
+    except Exception:
+        return False
+
+
+_clients: dict[str, GeminiClient] = {}
+_cache: LLMCache | None = None
+_clients_lock = threading.Lock()
+_konfiguriert = False
+
+
+# Konfiguriert die API genau einmal pro Prozess. GEMINI_API_ENDPOINT erlaubt einen lokalen Test-Server.
+def _konfiguriere_api():
+    global _konfiguriert
+    if _konfiguriert:
+        return
+    api_endpoint = os.getenv("GEMINI_API_ENDPOINT")
+    if api_endpoint:
+        genai.configure(api_key=os.getenv("GOOGLE_API_KEY", "test"), transport="rest", client_options={"api_endpoint": api_endpoint})
+    else:
+        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+    _konfiguriert = True
+
+
+# Liefert den prozessweiten Antwort-Cache, den alle Clients und Stages teilen.
+def get_llm_cache() -> LLMCache:
+    global _cache
+    with _clients_lock:
+        if _cache is None:
+            _cache = LLMCache(llm_cache_pfad, int(llm_cache_max_mb * 1024 * 1024))
+        return _cache
+
+# Liefert den prozessweiten Client für eine Modellversion.
+def get_llm_client(gemini_model_version: str) -> GeminiClient:
+    cache = get_llm_cache()
+    with _clients_lock:
+        if gemini_model_version not in _clients:
+            _konfiguriere_api()
+            _clients[gemini_model_version] = GeminiClient(gemini_model_version, cache=cache)
+        return _clients[gemini_model_version]
@@ -0,0 +1,118 @@
+import importlib.metadata
+import importlib.util
+import subprocess
+import sys
+from collections import OrderedDict
+from config import max_geladene_spacy_modelle
+
+# Definiert die unterstützten Sprachen und ihre Entsprechungen.
+SUPPORTED_LANGUAGES = {
+    'en': {'spacy': 'en_core_web_sm', 'nltk': 'english'},
+    'de': {'spacy': 'de_core_news_sm', 'nltk': 'german'},
+    'fr': {'spacy': 'fr_core_news_sm', 'nltk': 'french'},
+    'es': {'spacy': 'es_core_news_sm', 'nltk': 'spanish'},
+    'it': {'spacy': 'it_core_news_sm', 'nltk': 'italian'},
+    'pt': {'spacy': 'pt_core_news_sm', 'nltk': 'portuguese'},
+    'nl': {'spacy': 'nl_core_news_sm', 'nltk': 'dutch'},
+    'pl': {'spacy': 'pl_core_news_sm', 'nltk': 'polish'},
+    'da': {'spacy': 'da_core_news_sm', 'nltk': 'danish'},
+    'fi': {'spacy': 'fi_core_news_sm', 'nltk': 'finnish'},
+    'no': {'spacy': 'nb_core_news_sm', 'nltk': 'norwegian'},
+    'sv': {'spacy': 'sv_core_news_sm', 'nltk': 'swedish'}
+}
+
+# Komponenten, die Lemmata erzeugen, und die Komponenten, die regelbasierte Lemmatizer als Eingabe (POS) brauchen.
+LEMMATIZER_FACTORIES = ("lemmatizer", "trainable_lemmatizer")
+POS_KOMPONENTEN = ("tagger", "morphologizer", "attribute_ruler")
+SATZ_KOMPONENTEN = ("senter", "sentencizer")
+
+# Geladene Modelle in Reihenfolge der letzten Nutzung (ältestes zuerst).
+_geladene_modelle: "OrderedDict[str, object]" = OrderedDict()
+
+
+# Prüft ohne Netzwerkzugriff, ob ein spaCy-Modell als Paket installiert ist.
+def ist_modell_installiert(model_name: str) -> bool:
+    """Gibt True zurück, wenn das Modell-Paket importierbar ist."""
+    return importlib.util.find_spec(model_name) is not None
+
+# Lädt ein fehlendes Modell herunter. Bereits installierte Modelle werden nicht angefasst.
+def stelle_modell_bereit(model_name: str) -> None:
+    if ist_modell_installiert(model_name):
+        return
+    print(f"--- Herunterladen des Modells: {model_name} ---")
+    subprocess.run([sys.executable, "-m", "spacy", "download", model_name], check=True)
+    importlib.invalidate_caches()
+
+# Gibt das spaCy-Modell für eine Sprache zurück und lädt es erst beim ersten Bedarf.
+def lade_spacy_modell(lang_code: str):
+    """
+    Liefert das spaCy-Modell für 'lang_code' aus einem begrenzten LRU-Speicher.
+    Wird die Obergrenze überschritten, wird das am längsten nicht genutzte Modell verworfen.
+    """
+    if lang_code in _geladene_modelle:
+        _geladene_modelle.move_to_end(lang_code)
+        return _geladene_modelle[lang_code]
+
+    import spacy
+
+    model_name = SUPPORTED_LANGUAGES[lang_code]['spacy']
+    stelle_modell_bereit(model_name)
+    print(f"  Lade spaCy-Modell '{model_name}'...")
+    nlp = spacy.load(model_name, disable=["parser", "ner"])
+    deaktiviere_unnoetige_komponenten(nlp)
+
+    _geladene_modelle[lang_code] = nlp
+    while len(_geladene_modelle) > max(1, max_geladene_spacy_modelle):
+        verworfen, _ = _geladene_modelle.popitem(last=False)
+        print(f"  spaCy-Modell für '{verworfen}' aus dem Speicher entfernt.")
+    return nlp
+
+# Aktiviert eine Satzerkennung im Modell, damit doc.sents ohne Parser verfügbar ist.
+def aktiviere_satztrennung(nlp) -> None:
+    """Nutzt den trainierten 'senter', falls vorhanden, sonst den regelbasierten 'sentencizer'."""
+    if "senter" in nlp.component_names:
+        if "senter" in nlp.disabled:
+            nlp.enable_pipe("senter")
+    elif "sentencizer" not in nlp.pipe_names:
+        nlp.add_pipe("sentencizer")
+
+# Ermittelt, welche Komponenten für die Lemmatisierung tatsächlich laufen müssen.
+def benoetigte_komponenten(nlp) -> set[str]:
+    """
+    Lookup-Lemmatizer brauchen nur sich selbst, regelbasierte Lemmatizer zusätzlich POS-Tags
+    (tagger/morphologizer/attribute_ruler) und trainierbare Lemmatizer das gemeinsame tok2vec.
+    """
+    benoetigt = set()
+    for name in nlp.component_names:
+        factory = nlp.get_pipe_meta(name).factory
+        if factory in SATZ_KOMPONENTEN:
+            benoetigt.add(name)
+        if factory not in LEMMATIZER_FACTORIES:
+            continue
+        benoetigt.add(name)
+        if factory == "trainable_lemmatizer":
+            benoetigt.add("tok2vec")
+        elif getattr(nlp.get_pipe(name), "mode", "lookup") != "lookup":
+            benoetigt.update(POS_KOMPONENTEN)
+            benoetigt.add("tok2vec")
+    return {name for name in benoetigt if name in nlp.component_names}
+
+# Deaktiviert alles, was nicht für Lemmata (und ggf. Satztrennung) gebraucht wird.
+def deaktiviere_unnoetige_komponenten(nlp) -> list[str]:
+    benoetigt = benoetigte_komponenten(nlp)
+    deaktiviert = [name for name in nlp.pipe_names if name not in benoetigt]
+    for name in deaktiviert:
+        nlp.disable_pipe(name)
+    if deaktiviert:
+        print(f"  Deaktivierte Komponenten: {', '.join(deaktiviert)} (aktiv: {', '.join(nlp.pipe_names)})")
+    return deaktiviert
+
+# Kennung aus Modellname und installierter Paketversion, ohne das Modell zu laden.
+def modell_kennung(lang_code: str) -> str:
+    model_name = SUPPORTED_LANGUAGES[lang_code]['spacy']
+    stelle_modell_bereit(model_name)
+    try:
+        version = importlib.metadata.version(model_name)
+    except importlib.metadata.PackageNotFoundError:
+        version = "unbekannt"
+    return f"{model_name}-{version}"
@@ -0,0 +1,60 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from config import postprocessing_parallel
+from functions.report_io import filtere_relevante_aussagen, lade_report, parquet_pfad, speichere_report
+from functions.company_index import lade_unternehmens_index
+from functions.robust_matching import korrigiere_zuordnungen
+from functions.screenshots import generate_screenshots
+from functions.statistics import generate_company_jsons
+from functions.summary_stats import generate_global_summary
+
+
+def fuehre_postprocessing_durch(report_path: str, summary_path: str, global_summary_output_path: str, json_output_folder: str,
+                                screenshots_output_folder: str, pdf_folder: str, parallel: bool = postprocessing_parallel):
+    """
+    Lädt den Klassifizierungs-Report genau einmal, korrigiert fehlende Unternehmens-Zuordnungen im Speicher
+    und gibt denselben gefilterten DataFrame an Zusammenfassung, JSON-Reports und Screenshots weiter.
+    Mit 'parallel' laufen diese drei voneinander unabhängigen Schritte gleichzeitig.
+    """
+    print("--- Beginne Post-Processing ---")
+    if not os.path.exists(report_path) and not os.path.exists(parquet_pfad(report_path)):
+        print(f"FEHLER: Report-Datei nicht gefunden unter {report_path}")
+        return
+
+    df = lade_report(report_path)
+    print(f"{len(df)} Einträge geladen.")
+
+    # Zuordnungsfehler beheben; der Report wird nur bei tatsächlichen Korrekturen neu geschrieben.
+    if os.path.exists(summary_path):
+        print("\n--- Starte Reparatur der Unternehmens-Zuordnungen ---")
+        df, matches_found = korrigiere_zuordnungen(df, lade_unternehmens_index(summary_path))
+        if matches_found:
+            speichere_report(df, report_path)
+            print(f"\nKorrektur abgeschlossen. {matches_found} Unternehmen wurden erfolgreich zugeordnet.")
+            print(f"Die Datei '{report_path}' wurde aktualisiert.")
+    else:
+        print(f"FEHLER: Summary-Datei nicht gefunden unter {summary_path}")
+
+    df_relevant = filtere_relevante_aussagen(df)
+
+    # Die Schritte lesen den gemeinsamen DataFrame nur und schreiben in getrennte Ausgabeordner.
+    schritte = [
+        ("generate_global_summary", lambda: generate_global_summary(report_path, global_summary_output_path, df_relevant=df_relevant)),
+        ("generate_company_jsons", lambda: generate_company_jsons(report_path, json_output_folder, df_relevant=df_relevant)),
+        ("generate_screenshots", lambda: generate_screenshots(report_path, pdf_folder, screenshots_output_folder, df_relevant=df_relevant)),
+    ]
+
+    if not parallel:
+        for name, schritt in schritte:
+            print(f">>>> Starte mit {name} <<<<< ")
+            schritt()
+        return
+
+    print(f"Führe {len(schritte)} Schritte parallel aus...")
+    with ThreadPoolExecutor(max_workers=len(schritte)) as executor:
+        futures = {name: executor.submit(schritt) for name, schritt in schritte}
+    for name, future in futures.items():
+        try:
+            future.result()
+        except Exception as e:
+            print(f"FEHLER in {name}: {e}")
@@ -0,0 +1,90 @@
+import json
+import re
+
+# Provenienz einer Aussage: Liste von Segmenten {"seite", "start", "ende"}.
+# 'seite' ist 1-basiert, 'start'/'ende' sind Zeichen-Offsets im normalisierten Seitentext der Text-Extraktion
+# (None, wenn der Satz dort nicht verortet werden konnte).
+# Solange ein Segment noch zu einem Text gehört (Passage bzw. Kontext-Snippet), geben 'text_start'/'text_ende'
+# zusätzlich seine Lage in diesem Text an.
+
+
+# Ermittelt die Start-Positionen der (bereits zerlegten) Sätze in ihrem Ursprungstext; None, wenn ein Satz nicht gefunden wird.
+def satz_positionen(text: str, saetze: list[str]) -> list:
+    positionen = []
+    cursor = 0
+    for satz in saetze:
+        start = text.find(satz, cursor)
+        if start == -1:
+            positionen.append(None)
+            continue
+        positionen.append(start)
+        cursor = start + len(satz)
+    return positionen
+
+# Schneidet die Segmente auf den Bereich [start, ende) des Textes zu und verschiebt die Text-Positionen auf 'basis'.
+def verorte_bereich(segmente: list[dict], start: int, ende: int, basis: int = 0) -> list[dict]:
+    ergebnis = []
+    for segment in segmente:
+        von = max(start, segment["text_start"])
+        bis = min(ende, segment["text_ende"])
+        if von >= bis:
+            continue
+        neu = {"seite": segment["seite"], "start": None, "ende": None,
+               "text_start": von - start + basis, "text_ende": bis - start + basis}
+        if segment.get("start") is not None:
+            neu["start"] = segment["start"] + von - segment["text_start"]
+            neu["ende"] = neu["start"] + bis - von
+        ergebnis.append(neu)
+    return ergebnis
+
+# Verortet eine Aussage in einem Text mit Segmenten; wird sie nicht wörtlich gefunden, gilt der ganze Text.
+def verorte_aussage(text: str, segmente: list[dict], aussage: str) -> list[dict]:
+    start = text.find(aussage.strip().strip("'\""))
+    if start == -1:
+        treffer = segmente
+    else:
+        treffer = verorte_bereich(segmente, start, start + len(aussage.strip().strip("'\"")))
+    return [{"seite": s["seite"], "start": s.get("start"), "ende": s.get("ende")} for s in treffer]
+
+# Vereinigt mehrere Provenienz-Listen ohne doppelte Segmente, sortiert nach Seite und Offset.
+def vereinige(*provenienzen) -> list[dict]:
+    segmente = {}
+    for provenienz in provenienzen:
+        for s in provenienz or []:
+            segmente.setdefault((s["seite"], s.get("start"), s.get("ende")), {"seite": s["seite"], "start": s.get("start"), "ende": s.get("ende")})
+    return [segmente[k] for k in sorted(segmente, key=lambda k: (k[0], -1 if k[1] is None else k[1], -1 if k[2] is None else k[2]))]
+
+# Formatiert die Seiten einer Provenienz kompakt, z.B. "3, 7-8" (lesbar für screenshots._parse_seiten).
+def seiten_angabe(provenienz: list[dict]) -> str:
+    seiten = sorted({s["seite"] for s in provenienz or []})
+    bereiche = []
+    for seite in seiten:
+        if bereiche and seite == bereiche[-1][1] + 1:
+            bereiche[-1][1] = seite
+        else:
+            bereiche.append([seite, seite])
+    return ", ".join(str(a) if a == b else f"{a}-{b}" for a, b in bereiche)
+
+# Liest eine Seitenangabe wie "12", "12-14" oder "3, 7-8" (1-basiert) in eine Liste von Seitenzahlen.
+def parse_seiten(wert) -> list[int]:
+    if wert is None or (isinstance(wert, float) and wert != wert):
+        return []
+    if isinstance(wert, (int, float)):
+        return [int(wert)]
+    seiten = []
+    for teil in str(wert).split(','):
+        bereich = re.match(r'^\s*(\d+)\s*(?:-\s*(\d+))?\s*$', teil)
+        if not bereich:
+            continue
+        start = int(bereich.group(1))
+        ende = int(bereich.group(2) or start)
+        seiten.extend(range(start, ende + 1))
+    return list(dict.fromkeys(seiten))
+
+# Provenienz nur aus einer Seitenangabe (für Dateien aus Läufen ohne Offsets).
+def aus_seitenangabe(page_range) -> list[dict]:
+    return [{"seite": seite, "start": None, "ende": None} for seite in parse_seiten(page_range)]
+
+# Kompakte JSON-Darstellung für eine Report-Spalte.
+def als_json(provenienz: list[dict]) -> str:
+    return json.dumps(provenienz or [], separators=(",", ":"))
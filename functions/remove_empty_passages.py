@@ -1,6 +1,6 @@
 import os
 import json
-from functions.status import load_status, save_status
+from functions.status import pending_files, save_status
 
 CURRENT_STAGE_KEY_CLEANUP = "remove_empty_passages"
 
@@ -12,22 +12,16 @@ def bereinige_leere_passagen(ordner_pfad: str) -> None:
 
     print(f"--- Starte Bereinigung im Ordner: {ordner_pfad} ---")
 
-    # Flags zur Nachverfolgung des gesamten Laufs
-    found_files = False
-    processed_this_run = False
-
-    # Iteriert über jede Datei im angegebenen Ordner.
-    for dateiname in os.listdir(ordner_pfad):
-        if not dateiname.lower().endswith('.json'):
-            continue
-        
-        found_files = True
+    # Ermittelt vorab, welche Dateien für diese Stufe noch nicht verarbeitet wurden.
+    json_dateien = [d for d in os.listdir(ordner_pfad) if d.lower().endswith('.json')]
+    offene_dateien = pending_files(json_dateien, CURRENT_STAGE_KEY_CLEANUP)
 
-        # PRÜFT, ob die Datei für diese Stufe bereits verarbeitet wurde.
-        if load_status(dateiname, CURRENT_STAGE_KEY_CLEANUP):
-            continue
+    # Flags zur Nachverfolgung des gesamten Laufs
+    found_files = bool(json_dateien)
+    processed_this_run = bool(offene_dateien)
 
-        processed_this_run = True
+    # Iteriert über jede noch offene Datei im angegebenen Ordner.
+    for dateiname in offene_dateien:
         print(f"\n--- Prüfe Datei zur Bereinigung: {dateiname} ---")
         
         voller_pfad = os.path.join(ordner_pfad, dateiname)
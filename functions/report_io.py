@@ -0,0 +1,131 @@
+import datetime
+import json
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Spalten mit wenigen unterschiedlichen Werten, die in Parquet dictionary-kodiert (kategorisch) abgelegt werden.
+KATEGORISCHE_SPALTEN = ['Unternehmen', 'Typ', 'Status', 'Kategorie', 'Metric', 'Company', 'Country', 'Rating', 'Primary Listing', 'Industry Classification']
+# Kategorien, die in keiner Auswertung berücksichtigt werden.
+IRRELEVANT_CATEGORIES = ["No Biodiversity Relevance", "API Fehler"]
+# Schlüssel in den Parquet-Metadaten für die Liste der JSON-kodierten Spalten mit gemischten Typen.
+GEMISCHTE_SPALTEN_META = b"report_io.gemischte_spalten"
+
+
+# Pfad der kanonischen Parquet-Kopie zu einem Report (gleicher Name, Endung .parquet).
+def parquet_pfad(report_path: str) -> str:
+    return os.path.splitext(report_path)[0] + ".parquet"
+
+def _ist_leer(wert) -> bool:
+    return wert is None or (pd.api.types.is_scalar(wert) and pd.isna(wert))
+
+# Kodiert einen Wert einer gemischten Spalte als JSON-Text; Datums-Werte erhalten eine Typ-Markierung.
+def _kodiere_wert(wert):
+    if _ist_leer(wert):
+        return None
+    if isinstance(wert, np.generic):
+        wert = wert.item()
+    if isinstance(wert, pd.Timestamp):
+        return json.dumps({"__timestamp__": wert.isoformat()})
+    if isinstance(wert, datetime.datetime):
+        return json.dumps({"__datetime__": wert.isoformat()})
+    if isinstance(wert, (bool, int, float, str)):
+        return json.dumps(wert, ensure_ascii=False)
+    # Andere Typen kann Arrow in einer gemeinsamen Spalte nicht ablegen; sie werden als Text gespeichert.
+    return json.dumps(str(wert), ensure_ascii=False)
+
+def _dekodiere_wert(text):
+    if not isinstance(text, str):
+        return np.nan
+    wert = json.loads(text)
+    if isinstance(wert, dict):
+        if "__timestamp__" in wert:
+            return pd.Timestamp(wert["__timestamp__"])
+        if "__datetime__" in wert:
+            return datetime.datetime.fromisoformat(wert["__datetime__"])
+    return wert
+
+# Bereitet einen Report für Arrow vor. Nur Spalten mit gemischten Typen (z.B. Zahlen und Text aus Excel) werden
+# wertweise als JSON-Text kodiert, damit lade_report die ursprünglichen Typen wiederherstellen kann.
+# Gibt den vorbereiteten DataFrame und die Namen der kodierten Spalten zurück.
+def _vereinheitliche_typen(df: pd.DataFrame) -> tuple[pd.DataFrame, list[str]]:
+    df = df.copy()
+    gemischt = []
+    for col in df.columns:
+        if df[col].dtype != object:
+            continue
+        typen = {type(wert) for wert in df[col] if not _ist_leer(wert)}
+        if len(typen) > 1:
+            df[col] = df[col].map(_kodiere_wert)
+            gemischt.append(col)
+    for col in KATEGORISCHE_SPALTEN:
+        if col in df.columns and df[col].dtype == object:
+            df[col] = df[col].astype('category')
+    return df, gemischt
+
+# Schreibt die Parquet-Datei atomar (Temp-Datei + Rename).
+def _schreibe_parquet(df: pd.DataFrame, pfad: str):
+    directory = os.path.dirname(pfad) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".report_", suffix=".parquet", dir=directory)
+    os.close(fd)
+    try:
+        df_arrow, gemischt = _vereinheitliche_typen(df)
+        tabelle = pa.Table.from_pandas(df_arrow, preserve_index=False)
+        metadaten = dict(tabelle.schema.metadata or {})
+        metadaten[GEMISCHTE_SPALTEN_META] = json.dumps(gemischt).encode("utf-8")
+        pq.write_table(tabelle.replace_schema_metadata(metadaten), tmp_path)
+        os.replace(tmp_path, pfad)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def speichere_report(df: pd.DataFrame, report_path: str, columns=None, xlsx_export: bool = True):
+    """
+    Speichert einen Report kanonisch als Parquet neben 'report_path'.
+    Die XLSX-Datei unter 'report_path' ist nur noch ein Export und wird vorher geschrieben,
+    damit die Parquet-Datei immer mindestens so neu ist wie der Export.
+    """
+    if columns is not None:
+        df = df[columns]
+    if xlsx_export:
+        df.to_excel(report_path, index=False)
+    _schreibe_parquet(df, parquet_pfad(report_path))
+
+# Entfernt alle Aussagen mit irrelevanten Kategorien.
+def filtere_relevante_aussagen(df: pd.DataFrame) -> pd.DataFrame:
+    return df[~df['Kategorie'].isin(IRRELEVANT_CATEGORIES)].copy()
+
+def lade_report(report_path: str) -> pd.DataFrame:
+    """
+    Lädt einen Report bevorzugt aus der Parquet-Kopie. Kategorische Spalten werden wieder zu normalen Spalten und
+    Spalten mit gemischten Typen erhalten ihre ursprünglichen Werte zurück, damit sich nachgelagerte Stages wie beim Lesen aus Excel verhalten.
+    Ist nur die XLSX vorhanden oder wurde sie nachträglich verändert, wird sie gelesen und die Parquet-Kopie neu erzeugt.
+    """
+    pfad = parquet_pfad(report_path)
+    xlsx_vorhanden = os.path.exists(report_path)
+    if os.path.exists(pfad) and (not xlsx_vorhanden or os.path.getmtime(pfad) >= os.path.getmtime(report_path)):
+        tabelle = pq.read_table(pfad)
+        gemischt = json.loads((tabelle.schema.metadata or {}).get(GEMISCHTE_SPALTEN_META, b"[]"))
+        df = tabelle.to_pandas()
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype(object)
+        for col in gemischt:
+            df[col] = df[col].map(_dekodiere_wert).astype(object)
+        return df
+
+    if not xlsx_vorhanden:
+        raise FileNotFoundError(report_path)
+    df = pd.read_excel(report_path)
+    try:
+        _schreibe_parquet(df, pfad)
+    except Exception as e:
+        print(f"Warnung: Parquet-Kopie für '{report_path}' konnte nicht geschrieben werden: {e}")
+    return df
@@ -1,32 +1,14 @@
 import pandas as pd
-import re
 import os
+from functions.company_index import UnternehmensIndex, firmenname_aus_dateiname, lade_unternehmens_index
+from functions.report_io import lade_report, parquet_pfad, speichere_report
 
-def _normalize_name_robust(name: str) -> str:
-
-    if not isinstance(name, str):
-        return ""
-    name = name.lower()
-    return re.sub(r'[^a-z0-9]', '', name)
-
-def behebe_zuordnungsfehler(report_path: str, summary_path: str):
+def korrigiere_zuordnungen(df_report: pd.DataFrame, unternehmens_index: UnternehmensIndex) -> tuple[pd.DataFrame, int]:
     """
-    Lädt einen generierten Report, findet Einträge ohne zugeordnetes Unternehmen ('N/A' oder leere Werte)
-    und versucht, diese zu korrigieren.
-    Ursprüngliche Report-Datei wird mit den korrigierten Daten überschrieben.
+    Findet im Report-DataFrame Einträge ohne zugeordnetes Unternehmen ('N/A' oder leere Werte) und versucht,
+    diese im Speicher zu korrigieren. Gibt den (ggf. korrigierten) DataFrame und die Anzahl neuer Zuordnungen zurück.
+    Der Abgleich läuft über den vorab aufgebauten Unternehmens-Index statt über alle Zeilen der Metadaten.
     """
-    # Überprüfen, ob die Eingabedateien existieren
-    if not os.path.exists(report_path):
-        print(f"FEHLER: Report-Datei nicht gefunden unter {report_path}")
-        return
-    if not os.path.exists(summary_path):
-        print(f"FEHLER: Summary-Datei nicht gefunden unter {summary_path}")
-        return
-
-    print("\n--- Starte Reparatur der Unternehmens-Zuordnungen ---")
-    df_report = pd.read_excel(report_path)
-    df_summary = pd.read_excel(summary_path)
-
     # Trennen des DataFrames: Es wird sowohl auf den Text 'N/A' als auch auf von pandas interpretierte leere Werte (NaN) geprüft.
     condition_fix_needed = (df_report['Company'] == 'N/A') | (df_report['Company'].isna())
     df_fix_needed = df_report[condition_fix_needed].copy()
@@ -34,64 +16,63 @@ def behebe_zuordnungsfehler(report_path: str, summary_path: str):
 
     if df_fix_needed.empty:
         print("Keine Unternehmen mit 'N/A' oder leeren Werten gefunden. Keine Korrektur notwendig.")
-        return
+        return df_report, 0
 
     print(f"{len(df_fix_needed['Unternehmen'].unique())} Unternehmen ohne direkten Treffer werden erneut geprüft...")
 
-    # Metadaten für den Abgleich vorbereiten
-    df_summary['normalized_company'] = df_summary['Company'].apply(_normalize_name_robust)
-    
-    # Zu korrigierende Daten für den Abgleich vorbereiten
-    # Extrahiert den reinen Firmennamen vor Suffixen wie dem Jahr oder "_relevant_passages"
-    df_fix_needed['normalized_unternehmen'] = df_fix_needed['Unternehmen'].apply(
-        lambda x: _normalize_name_robust(re.split(r'_\d{4}|_relevant_passages|_sustainability_report', str(x), 1)[0])
-    )
-
     metadata_columns = ['Company', 'Country', 'Rating', 'Primary Listing', 'Industry Classification']
     matches_found = 0
-    
-    # Finde eindeutige Unternehmen, die korrigiert werden müssen, um die Suche zu beschleunigen
-    unique_to_fix = df_fix_needed[['Unternehmen', 'normalized_unternehmen']].drop_duplicates()
     match_map = {}
 
     # Schleife über die einzigartigen Unternehmen, die eine Korrektur benötigen
-    for _, row_to_fix in unique_to_fix.iterrows():
-        # Schleife über die Metadaten, um einen passenden Eintrag zu finden
-        for _, summary_row in df_summary.iterrows():
-            # Prüft, ob der normalisierte Name aus dem Dateipfad im normalisierten Namen aus der Metadaten-Datei enthalten ist.
-            if row_to_fix['normalized_unternehmen'] in summary_row['normalized_company']:
-                match_map[row_to_fix['Unternehmen']] = summary_row.to_dict()
-                matches_found += 1
-                print(f"  -> Treffer gefunden: '{row_to_fix['Unternehmen']}' wird '{summary_row['Company']}' zugeordnet.")
-                break 
+    for unternehmen in df_fix_needed['Unternehmen'].drop_duplicates():
+        # Erstes Unternehmen der Metadaten, dessen normalisierter Name den Firmennamen aus dem Dateipfad enthält.
+        zeile = unternehmens_index.finde(firmenname_aus_dateiname(unternehmen))
+        if zeile is None:
+            continue
+        match_map[unternehmen] = unternehmens_index.zeile(zeile)
+        matches_found += 1
+        print(f"  -> Treffer gefunden: '{unternehmen}' wird '{match_map[unternehmen]['Company']}' zugeordnet.")
 
     if matches_found == 0:
         print("Keine neuen Zuordnungen durch intelligenten Abgleich gefunden.")
-        return
+        return df_report, 0
 
     print("\nWende die Korrekturen auf den Report an...")
     
-    # Funktion, um die Korrekturen auf jede Zeile anzuwenden
-    def apply_fix(row):
-        if row['Unternehmen'] in match_map:
-            # Schleife über die zu aktualisierenden Metadaten-Spalten
-            for col in metadata_columns:
-                row[col] = match_map[row['Unternehmen']][col]
-        return row
-
-    df_fix_needed = df_fix_needed.apply(apply_fix, axis=1)
+    # Korrekturen spaltenweise auf alle betroffenen Zeilen anwenden
+    zugeordnet = df_fix_needed['Unternehmen'].isin(match_map.keys())
+    for col in metadata_columns:
+        df_fix_needed.loc[zugeordnet, col] = df_fix_needed.loc[zugeordnet, 'Unternehmen'].map(lambda u: match_map[u][col])
 
     # Korrigierte und ursprünglich korrekte Daten wieder zusammenführen und sortieren
     df_final_corrected = pd.concat([df_ok, df_fix_needed], ignore_index=True).sort_index()
-    
-    # Temporäre Hilfsspalten entfernen
-    df_final_corrected.drop(columns=['normalized_unternehmen'], errors='ignore', inplace=True)
+    return df_final_corrected, matches_found
+
+def behebe_zuordnungsfehler(report_path: str, summary_path: str):
+    """
+    Lädt einen generierten Report, findet Einträge ohne zugeordnetes Unternehmen ('N/A' oder leere Werte)
+    und versucht, diese zu korrigieren.
+    Ursprüngliche Report-Datei wird mit den korrigierten Daten überschrieben.
+    """
+    # Überprüfen, ob die Eingabedateien existieren
+    if not os.path.exists(report_path) and not os.path.exists(parquet_pfad(report_path)):
+        print(f"FEHLER: Report-Datei nicht gefunden unter {report_path}")
+        return
+    if not os.path.exists(summary_path):
+        print(f"FEHLER: Summary-Datei nicht gefunden unter {summary_path}")
+        return
+
+    print("\n--- Starte Reparatur der Unternehmens-Zuordnungen ---")
+    df_report = lade_report(report_path)
+    df_final_corrected, matches_found = korrigiere_zuordnungen(df_report, lade_unternehmens_index(summary_path))
+    if matches_found == 0:
+        return
 
     try:
         # Die korrigierte Datei unter dem ursprünglichen Pfad speichern
-        df_final_corrected.to_excel(report_path, index=False)
+        speichere_report(df_final_corrected, report_path)
         print(f"\nKorrektur abgeschlossen. {matches_found} Unternehmen wurden erfolgreich zugeordnet.")
         print(f"Die Datei '{report_path}' wurde aktualisiert.")
     except Exception as e:
         print(f"FEHLER beim Speichern der korrigierten Datei: {e}")
-
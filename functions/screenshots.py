@@ -1,8 +1,12 @@
 import pandas as pd
+from functions.provenienz import parse_seiten
+from functions.report_io import filtere_relevante_aussagen, lade_report
 import fitz 
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from tqdm import tqdm
+from config import screenshot_workers
 
 def _sanitize_text_for_filename(text: str, max_length: int = 50) -> str:
     """Bereinigt einen Text für die Verwendung in einem Dateinamen und kürzt ihn."""
@@ -16,20 +20,73 @@ def _sanitize_text_for_filename(text: str, max_length: int = 50) -> str:
         return sanitized[:max_length]
     return sanitized
 
+# Reihenfolge der zu durchsuchenden Seiten: zuerst die bekannten Seiten, danach alle übrigen von vorne.
+def _seiten_reihenfolge(seiten: list[int], page_count: int) -> list[int]:
+    bevorzugt = [s - 1 for s in seiten if 1 <= s <= page_count]
+    bekannt = set(bevorzugt)
+    return bevorzugt + [i for i in range(page_count) if i not in bekannt]
+
+def _screenshots_fuer_pdf(pdf_path: str, auftraege: list) -> tuple[int, list[str]]:
+    # Öffnet eine PDF einmal und erstellt die Screenshots aller zugehörigen Aussagen. Läuft auch in Worker-Prozessen.
+    erstellt = 0
+    meldungen = []
+    pdf_filename_base = os.path.splitext(os.path.basename(pdf_path))[0]
+    try:
+        doc = fitz.open(pdf_path)
+    except Exception as e:
+        return 0, [f"\nFEHLER bei der Verarbeitung von '{pdf_filename_base}.pdf': {e}"]
+
+    with doc:
+        for company_name, statement_text, seiten, output_path in auftraege:
+            try:
+                found_text_in_pdf = False
+
+                # Schleife durchsucht zuerst die bekannten Seiten, dann den Rest des Dokuments.
+                for page_num in _seiten_reihenfolge(seiten, doc.page_count):
+                    page = doc.load_page(page_num)
+                    text_instances = page.search_for(statement_text)
+                    
+                    if text_instances:
+                        highlights = []
+                        for inst in text_instances:
+                            highlight = page.add_highlight_annot(inst)
+                            highlight.update()
+                            highlights.append(highlight)
+                        
+                        pix = page.get_pixmap(dpi=150)
+                        pix.save(output_path)
+                        erstellt += 1
+
+                        # Markierungen wieder entfernen, da das Dokument für weitere Aussagen offen bleibt.
+                        for highlight in highlights:
+                            page.delete_annot(highlight)
+                        
+                        found_text_in_pdf = True
+                        break 
+
+                if not found_text_in_pdf:
+                    meldungen.append(f"\nINFO: Text für '{company_name}' wurde in der PDF '{pdf_filename_base}.pdf' nicht gefunden. Überspringe.")
+
+            except Exception as e:
+                meldungen.append(f"\nFEHLER bei der Verarbeitung von '{pdf_filename_base}.pdf': {e}")
+    return erstellt, meldungen
+
 # Hauotfunktion
-def generate_screenshots(report_path: str, pdf_folder: str, output_folder: str):
+def generate_screenshots(report_path: str, pdf_folder: str, output_folder: str, df_relevant: pd.DataFrame | None = None,
+                         workers: int = screenshot_workers):
     # Erstellt für jede relevante Aussage einen Screenshot aus der originalen PDF-Datei.
+    # Ist 'df_relevant' übergeben (bereits geladen und gefiltert), wird die Datei nicht erneut gelesen.
     print(f"--- Beginne Erstellung der Screenshots ---")
 
     # --- 1. Daten laden und vorbereiten ---
-    try:
-        df = pd.read_excel(report_path)
-    except FileNotFoundError:
-        print(f"FEHLER: Die Report-Datei '{report_path}' wurde nicht gefunden.")
-        return
+    if df_relevant is None:
+        try:
+            df = lade_report(report_path)
+        except FileNotFoundError:
+            print(f"FEHLER: Die Report-Datei '{report_path}' wurde nicht gefunden.")
+            return
 
-    irrelevant_categories = ["No Biodiversity Relevance", "API Fehler"]
-    df_relevant = df[~df['Kategorie'].isin(irrelevant_categories)].copy()
+        df_relevant = filtere_relevante_aussagen(df)
     print(f"{len(df_relevant)} relevante Zeilen gefunden.")
 
     # Entfernt doppelte Aussagen, um sicherzustellen, dass jeder Screenshot einzigartig ist.
@@ -41,10 +98,9 @@ def generate_screenshots(report_path: str, pdf_folder: str, output_folder: str):
     os.makedirs(output_folder, exist_ok=True)
     print(f"Screenshots werden in '{output_folder}' gespeichert.")
 
-    screenshots_created_count = 0
-
-    # --- 2. Schleife über jede EINZIGARTIGE relevante Aussage ---
-    for index, row in tqdm(df_unique_relevant.iterrows(), total=df_unique_relevant.shape[0], desc="Erstelle Screenshots"):
+    # --- 2. Aufträge pro PDF sammeln; vorhandene Screenshots werden übersprungen, bevor eine PDF geöffnet wird ---
+    auftraege_pro_pdf = {}
+    for index, row in df_unique_relevant.iterrows():
         company_name = row.get('Company', 'Unbekannt')
         original_filename_base = row.get('Unternehmen') 
         statement_text = row.get('Aussage')
@@ -57,45 +113,39 @@ def generate_screenshots(report_path: str, pdf_folder: str, output_folder: str):
         sanitized_text = _sanitize_text_for_filename(statement_text, 60)
         output_filename = f"{sanitized_company}_{index}_{sanitized_text}.png"
         output_path = os.path.join(output_folder, output_filename)
-        
         if os.path.exists(output_path):
             continue 
 
         pdf_filename_base = original_filename_base.replace('_relevant_passages', '')
+        seiten = parse_seiten(row.get('Seiten'))
+        auftraege_pro_pdf.setdefault(pdf_filename_base, []).append((company_name, statement_text, seiten, output_path))
+
+    # PDFs, die nicht gefunden werden, einmal melden und überspringen
+    pdf_auftraege = []
+    for pdf_filename_base, auftraege in auftraege_pro_pdf.items():
         pdf_path = os.path.join(pdf_folder, f"{pdf_filename_base}.pdf")
-        
         if not os.path.exists(pdf_path):
-            print(f"\nWARNUNG: PDF für '{pdf_filename_base}' nicht gefunden unter Pfad: {pdf_path}. Überspringe.")
+            print(f"\nWARNUNG: PDF für '{pdf_filename_base}' nicht gefunden unter Pfad: {pdf_path}. Überspringe {len(auftraege)} Aussage(n).")
             continue
+        pdf_auftraege.append((pdf_path, auftraege))
+    print(f"{sum(len(a) for _, a in pdf_auftraege)} neue Screenshots aus {len(pdf_auftraege)} PDFs werden erstellt.")
 
-        try:
-            doc = fitz.open(pdf_path)
-            found_text_in_pdf = False
-            
-            # Schleife durchsucht jede Seite des Dokuments.
-            for page_num, page in enumerate(doc):
-                text_instances = page.search_for(statement_text)
-                
-                if text_instances:
-                    for inst in text_instances:
-                        highlight = page.add_highlight_annot(inst)
-                        highlight.update()
-                    
-                    pix = page.get_pixmap(dpi=150)
-                    
-                    pix.save(output_path)
-                    screenshots_created_count += 1 
-                    
-                    found_text_in_pdf = True
-                    break 
-            
-            doc.close()
-            
-            if not found_text_in_pdf:
-                print(f"\nINFO: Text für '{company_name}' wurde in der PDF '{pdf_filename_base}.pdf' nicht gefunden. Überspringe.")
-
-        except Exception as e:
-            print(f"\nFEHLER bei der Verarbeitung von '{pdf_filename_base}.pdf': {e}")
+    # --- 3. Jede PDF wird genau einmal geöffnet; die PDFs werden auf mehrere Prozesse verteilt ---
+    screenshots_created_count = 0
+    if workers > 1 and len(pdf_auftraege) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_screenshots_fuer_pdf, pdf_path, auftraege) for pdf_path, auftraege in pdf_auftraege]
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Erstelle Screenshots"):
+                erstellt, meldungen = future.result()
+                screenshots_created_count += erstellt
+                for meldung in meldungen:
+                    print(meldung)
+    else:
+        for pdf_path, auftraege in tqdm(pdf_auftraege, desc="Erstelle Screenshots"):
+            erstellt, meldungen = _screenshots_fuer_pdf(pdf_path, auftraege)
+            screenshots_created_count += erstellt
+            for meldung in meldungen:
+                print(meldung)
 
     print(f"\n--- Erstellung der Screenshots abgeschlossen. ---")
     print(f"INFO: {screenshots_created_count} neue Screenshots wurden erstellt.")
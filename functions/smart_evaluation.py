@@ -0,0 +1,291 @@
+import json
+import os
+import sqlite3
+import time
+from google.api_core import exceptions as google_exceptions
+from config import smart_batch_groesse, smart_batch_token_budget, smart_max_versuche
+from functions.llm_client import get_llm_client, schaetze_tokens
+
+SMART_KRITERIEN = """**SMART Criteria Definition:**
+- **Specific:** The objective must be clear, unambiguous, and state precisely what needs to be accomplished. Quote ONLY the specific part of the text.
+- **Measurable:** The objective must be quantifiable or at least allow for measurable progress. Quote ONLY the specific metrics or targets mentioned.
+- **Achievable:** The objective must be realistic and attainable. Based on the statement, assess if it's a concrete action or a vague ambition. Quote ONLY the part that indicates achievability.
+- **Relevant:** The objective must be relevant to broader biodiversity goals. Quote ONLY the part of the statement that links the action to a biodiversity outcome.
+- **Time-bound:** The objective must have a defined timeline or target date. Quote ONLY the timeframe mentioned.
+
+"""
+
+smart_prompt_template = """
+You are an expert analyst specializing in corporate sustainability and biodiversity reporting.
+Your task is to evaluate a given statement from a company's report regarding biodiversity and determine if it constitutes a SMART objective.
+
+""" + SMART_KRITERIEN + """**Input Statement:**
+"{statement}"
+
+**Instructions:**
+Analyze the statement above based on the SMART criteria.
+If a criterion is met, extract ONLY the most relevant and concise quote from the statement that demonstrates this. Do not return the entire statement.
+If a criterion is NOT met, the value for that key must be the boolean value `false`.
+The overall "smart" key should be `true` ONLY if ALL 5 criteria are met, otherwise it must be `false`.
+
+Provide your analysis ONLY in a valid JSON format, with no additional text or explanations before or after the JSON object.
+
+**Required JSON Output Format:**
+{{
+  "smart": <true_or_false>,
+  "specific": "<concise_quote>" or false,
+  "measurable": "<concise_quote>" or false,
+  "achievable": "<concise_quote>" or false,
+  "relevant": "<concise_quote>" or false,
+  "time": "<concise_quote>" or false
+}}
+"""
+
+SMART_BATCH_PROMPT = """
+You are an expert analyst specializing in corporate sustainability and biodiversity reporting.
+You will receive a numbered list of independent statements from company reports regarding biodiversity. Evaluate every statement on its own and determine if it constitutes a SMART objective.
+
+""" + SMART_KRITERIEN + """**Instructions:**
+Analyze each statement based on the SMART criteria.
+If a criterion is met, extract ONLY the most relevant and concise quote from that statement that demonstrates this. Do not return the entire statement.
+If a criterion is NOT met, the value for that key must be the boolean value `false`.
+The overall "smart" key should be `true` ONLY if ALL 5 criteria are met, otherwise it must be `false`.
+
+Provide your analysis ONLY as a valid JSON array with exactly one object per statement, with no additional text or explanations before or after it.
+
+**Required JSON Output Format:**
+[{{"index": <number of the statement>, "smart": <true_or_false>, "specific": "<concise_quote>" or false, "measurable": "<concise_quote>" or false, "achievable": "<concise_quote>" or false, "relevant": "<concise_quote>" or false, "time": "<concise_quote>" or false}}, ...]
+
+**Numbered statements to analyze:**
+{numbered_statements}
+"""
+
+SMART_SCHLUESSEL = ['specific', 'measurable', 'achievable', 'relevant', 'time']
+
+
+def clean_json_response(text):
+
+    # Bereinigt die Textantwort der API, um nur den JSON-Teil zu extrahieren.
+    match = text.strip()
+    if match.startswith("```json"):
+        match = match[7:]
+    if match.endswith("```"):
+        match = match[:-3]
+    return match.strip()
+
+# Vereinheitlicht eine SMART-Analyse: "smart" ist nur dann true, wenn alle fünf Kriterien ein Zitat haben.
+def _normalisiere_analyse(analyse: dict) -> dict:
+    if not isinstance(analyse, dict):
+        raise ValueError("Analyse ist kein JSON-Objekt.")
+    analyse = {k: v for k, v in analyse.items() if k != "index"}
+    if analyse.get('smart', False):
+        for key in SMART_SCHLUESSEL:
+            if not analyse.get(key) or analyse.get(key) is False:
+                analyse['smart'] = False
+                break
+    analyse['smart'] = bool(analyse.get('smart', False))
+    return analyse
+
+# Liest eine gebündelte Antwort; nicht beantwortete Aussagen sind im Ergebnis None.
+def _parse_batch_antwort(raw: str, anzahl: int) -> list:
+    parsed = json.loads(clean_json_response(raw))
+    if not isinstance(parsed, list):
+        raise ValueError("Antwort ist kein JSON-Array.")
+    ergebnisse = [None] * anzahl
+    for eintrag in parsed:
+        try:
+            index = int(eintrag.get("index")) - 1
+            if 0 <= index < anzahl and ergebnisse[index] is None:
+                ergebnisse[index] = _normalisiere_analyse(eintrag)
+        except (AttributeError, TypeError, ValueError):
+            continue
+    return ergebnisse
+
+
+class SmartSpeicher:
+    """
+    Persistente SMART-Bewertungen pro (Aussage, Modell) in einer SQLite-Datei.
+    Fehlgeschlagene Bewertungen werden mit Fehlertext und Anzahl der Versuche vermerkt,
+    bis eine spätere Bewertung gelingt; so können sie gezielt erneut angefragt werden.
+    """
+
+    def __init__(self, pfad: str):
+        self.pfad = pfad
+        directory = os.path.dirname(pfad)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(pfad, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS bewertungen ("
+            " aussage TEXT NOT NULL,"
+            " modell TEXT NOT NULL,"
+            " analyse TEXT NOT NULL,"
+            " erstellt REAL NOT NULL,"
+            " PRIMARY KEY (aussage, modell))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fehler ("
+            " aussage TEXT NOT NULL,"
+            " modell TEXT NOT NULL,"
+            " fehler TEXT NOT NULL,"
+            " versuche INTEGER NOT NULL,"
+            " zuletzt REAL NOT NULL,"
+            " PRIMARY KEY (aussage, modell))"
+        )
+
+    def lade(self, aussagen, modell: str) -> dict:
+        """Gibt {aussage: analyse} für alle bereits bewerteten Aussagen zurück."""
+        aussagen = list(aussagen)
+        ergebnis = {}
+        # Abfrage in Blöcken, damit die Anzahl der SQL-Parameter begrenzt bleibt.
+        for start in range(0, len(aussagen), 500):
+            block = aussagen[start:start + 500]
+            platzhalter = ",".join("?" * len(block))
+            for aussage, analyse in self._conn.execute(
+                f"SELECT aussage, analyse FROM bewertungen WHERE modell = ? AND aussage IN ({platzhalter})", [modell, *block]
+            ):
+                ergebnis[aussage] = json.loads(analyse)
+        return ergebnis
+
+    def speichere(self, aussage: str, modell: str, analyse: dict):
+        self._conn.execute("BEGIN")
+        self._conn.execute(
+            "INSERT OR REPLACE INTO bewertungen (aussage, modell, analyse, erstellt) VALUES (?, ?, ?, ?)",
+            (aussage, modell, json.dumps(analyse, ensure_ascii=False), time.time())
+        )
+        self._conn.execute("DELETE FROM fehler WHERE aussage = ? AND modell = ?", (aussage, modell))
+        self._conn.execute("COMMIT")
+
+    def vermerke_fehler(self, aussage: str, modell: str, fehler: str):
+        self._conn.execute(
+            "INSERT INTO fehler (aussage, modell, fehler, versuche, zuletzt) VALUES (?, ?, ?, 1, ?) "
+            "ON CONFLICT (aussage, modell) DO UPDATE SET fehler = excluded.fehler, versuche = versuche + 1, zuletzt = excluded.zuletzt",
+            (aussage, modell, fehler, time.time())
+        )
+
+    def fehlgeschlagene(self, modell: str) -> list[tuple[str, str, int]]:
+        """Liste der offenen Fehlschläge als (aussage, fehler, versuche)."""
+        return self._conn.execute(
+            "SELECT aussage, fehler, versuche FROM fehler WHERE modell = ? ORDER BY zuletzt", (modell,)
+        ).fetchall()
+
+    def close(self):
+        self._conn.close()
+
+
+# Bewertet eine einzelne Aussage mit dem Einzel-Prompt. Gibt (analyse, None) oder (None, fehlertext) zurück.
+def _bewerte_einzeln(gemini_model_version, statement: str):
+    response_text = None
+    try:
+        response_text = get_llm_client(gemini_model_version).generate(
+            smart_prompt_template.format(statement=statement),
+            request_options={"timeout": 60},
+            template_id="smart",
+            validate=lambda text: isinstance(json.loads(clean_json_response(text)), dict)
+        )
+        return _normalisiere_analyse(json.loads(clean_json_response(response_text))), None
+    except google_exceptions.DeadlineExceeded:
+        return None, "Timeout (Deadline Exceeded): Die API hat nicht rechtzeitig geantwortet."
+    except google_exceptions.GoogleAPICallError as e:
+        return None, f"API Call Error: {e}"
+    except json.JSONDecodeError:
+        return None, f"JSON Decode Error: Die API-Antwort war kein valides JSON. Antwort: {response_text}"
+    except Exception as e:
+        return None, f"{type(e).__name__} - {e}"
+
+# Bewertet mehrere Aussagen mit einem einzigen API-Aufruf. Nicht bewertete Aussagen sind im Ergebnis None.
+def _bewerte_batch(gemini_model_version, aussagen: list[str]) -> list:
+    numbered_statements = "\n".join(f"{i + 1}. {aussage}" for i, aussage in enumerate(aussagen))
+    try:
+        raw = get_llm_client(gemini_model_version).generate(
+            SMART_BATCH_PROMPT.format(numbered_statements=numbered_statements),
+            generation_config={"response_mime_type": "application/json"},
+            request_options={"timeout": 60 + 10 * len(aussagen)},
+            template_id="smart_batch",
+            validate=lambda text: all(e is not None for e in _parse_batch_antwort(text, len(aussagen)))
+        )
+        return _parse_batch_antwort(raw, len(aussagen))
+    except Exception as e:
+        print(f"    SMART-Batch mit {len(aussagen)} Aussagen fehlgeschlagen: {e}")
+        return [None] * len(aussagen)
+
+# Bewertet einen Batch; fehlende Aussagen werden halbiert erneut angefragt, einzelne Aussagen laufen über den Einzel-Prompt.
+def _bewerte_batch_mit_teilung(gemini_model_version, aussagen: list[str]) -> list[tuple]:
+    if len(aussagen) == 1:
+        return [_bewerte_einzeln(gemini_model_version, aussagen[0])]
+
+    ergebnisse = [(analyse, None) if analyse is not None else None for analyse in _bewerte_batch(gemini_model_version, aussagen)]
+    fehlend = [i for i, ergebnis in enumerate(ergebnisse) if ergebnis is None]
+    if fehlend:
+        mitte = (len(fehlend) + 1) // 2
+        for teil in (fehlend[:mitte], fehlend[mitte:]):
+            if not teil:
+                continue
+            for i, ergebnis in zip(teil, _bewerte_batch_mit_teilung(gemini_model_version, [aussagen[i] for i in teil])):
+                ergebnisse[i] = ergebnis
+    return ergebnisse
+
+# Teilt Aussagen in Batches auf, deren geschätzte Token-Summe das Budget nicht überschreitet (höchstens 'max_groesse' Aussagen).
+def _bilde_batches(aussagen: list[str], token_budget: int, max_groesse: int) -> list[list[str]]:
+    batches = []
+    aktuell, tokens = [], 0
+    for aussage in aussagen:
+        aussage_tokens = schaetze_tokens(aussage) + 5
+        if aktuell and (len(aktuell) >= max_groesse or tokens + aussage_tokens > token_budget):
+            batches.append(aktuell)
+            aktuell, tokens = [], 0
+        aktuell.append(aussage)
+        tokens += aussage_tokens
+    if aktuell:
+        batches.append(aktuell)
+    return batches
+
+def bewerte_smart(gemini_model_version, aussagen, speicher: SmartSpeicher, batch_groesse: int = smart_batch_groesse,
+                  token_budget: int = smart_batch_token_budget, max_versuche: int = smart_max_versuche) -> tuple[dict, set]:
+    """
+    Bewertet Aussagen nach den SMART-Kriterien. Identische Aussagen werden nur einmal bewertet, bereits gespeicherte
+    Bewertungen (gleiche Aussage, gleiches Modell) nicht erneut angefragt; die übrigen laufen gebündelt über den LLM-Client.
+    Aussagen, deren Bewertung bereits 'max_versuche'-mal fehlgeschlagen ist, werden nicht mehr angefragt, sondern gemeldet.
+    Gibt ({aussage: analyse}, {fehlgeschlagene Aussagen}) zurück; Fehlschläge werden im Speicher vermerkt.
+    """
+    eindeutig = list(dict.fromkeys(a for a in aussagen if isinstance(a, str) and a.strip()))
+    bewertungen = speicher.lade(eindeutig, gemini_model_version)
+    offen = [aussage for aussage in eindeutig if aussage not in bewertungen]
+
+    # Wiederholt fehlgeschlagene Aussagen werden aufgegeben, bis ihr Eintrag in der Tabelle 'fehler' entfernt wird.
+    fehler_pro_aussage = {aussage: (fehler, versuche) for aussage, fehler, versuche in speicher.fehlgeschlagene(gemini_model_version)}
+    aufgegeben = [aussage for aussage in offen if fehler_pro_aussage.get(aussage, ("", 0))[1] >= max_versuche]
+    if aufgegeben:
+        offen = [aussage for aussage in offen if aussage not in set(aufgegeben)]
+        print(f"SMART-Bewertung: {len(aufgegeben)} Aussagen sind bereits {max_versuche}-mal fehlgeschlagen und werden nicht erneut angefragt:")
+        for aussage in aufgegeben:
+            fehler, versuche = fehler_pro_aussage[aussage]
+            print(f"  - '{aussage[:60]}...' ({versuche} Versuche): {fehler}")
+    print(f"SMART-Bewertung: {len(eindeutig)} eindeutige Aussagen, {len(bewertungen)} aus dem Speicher, {len(offen)} werden angefragt.")
+
+    fehlgeschlagen = set(aufgegeben)
+    if offen:
+        if batch_groesse <= 1:
+            batches = [[aussage] for aussage in offen]
+        else:
+            batches = _bilde_batches(offen, token_budget, batch_groesse)
+        ergebnisse_pro_batch = get_llm_client(gemini_model_version).map(
+            lambda batch: _bewerte_batch_mit_teilung(gemini_model_version, batch), batches
+        )
+        # Die Ergebnisse werden im Hauptthread gespeichert, sobald ein Batch fertig ist.
+        for batch, ergebnisse in zip(batches, ergebnisse_pro_batch):
+            for aussage, (analyse, fehler) in zip(batch, ergebnisse):
+                if analyse is not None:
+                    speicher.speichere(aussage, gemini_model_version, analyse)
+                    bewertungen[aussage] = analyse
+                else:
+                    print(f"\nSMART-Bewertung fehlgeschlagen bei '{aussage[:30]}...': {fehler}")
+                    speicher.vermerke_fehler(aussage, gemini_model_version, fehler)
+                    fehlgeschlagen.add(aussage)
+
+    if len(fehlgeschlagen) > len(aufgegeben):
+        print(f"SMART-Bewertung: {len(fehlgeschlagen) - len(aufgegeben)} Aussagen fehlgeschlagen; sie sind in '{speicher.pfad}' (Tabelle 'fehler') vermerkt "
+              f"und werden bei den nächsten Läufen bis zu {max_versuche}-mal erneut angefragt.")
+    return bewertungen, fehlgeschlagen
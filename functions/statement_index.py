@@ -0,0 +1,92 @@
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+
+
+# Normalisiert eine Aussage für den Index: Unicode-NFKC, Kleinschreibung, Satz- und Anführungszeichen als Leerzeichen,
+# mehrfache Leerzeichen zusammengefasst. Ziffern bleiben Teil des Schlüssels.
+def normalisiere_aussage(aussage) -> str:
+    text = unicodedata.normalize("NFKC", str(aussage)).casefold()
+    text = re.sub(r"[^\w\s%]", " ", text)
+    return " ".join(text.split())
+
+# Zahlen einer normalisierten Aussage in Reihenfolge. Fast-Duplikate werden nur bei gleicher Signatur zusammengefasst,
+# damit z.B. "500 hectares by 2030" und "500 hectares by 2025" getrennt klassifiziert werden.
+def zahlen_signatur(schluessel: str) -> tuple[str, ...]:
+    return tuple(re.findall(r"\d+", schluessel))
+
+
+class AussagenIndex:
+    """
+    Persistenter Index bereits klassifizierter Aussagen in einer SQLite-Datei, Schlüssel ist (normalisierte Aussage, Modell, Version).
+    Der Index überdauert einzelne Läufe und Berichtsjahre, sodass wiederkehrende Formulierungen
+    (auch bei anderen Unternehmen) nicht erneut klassifiziert werden. Die Version beschreibt Prompts und Klassifizierungs-Modus;
+    nach einem Wechsel von Modell oder Version werden die bisherigen Einträge nicht mehr verwendet.
+    """
+
+    def __init__(self, pfad: str):
+        self.pfad = pfad
+        directory = os.path.dirname(pfad)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(pfad, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        spalten = {zeile[1] for zeile in self._conn.execute("PRAGMA table_info(klassifizierungen)")}
+        if spalten and "version" not in spalten:
+            # Index aus einer Version ohne Modell-/Versions-Schlüssel: Einträge sind nicht zuordenbar und werden verworfen.
+            print(f"Aussagen-Index '{pfad}' hat ein veraltetes Format und wird neu aufgebaut.")
+            self._conn.execute("DROP TABLE klassifizierungen")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS klassifizierungen ("
+            " schluessel TEXT NOT NULL,"
+            " modell TEXT NOT NULL,"
+            " version TEXT NOT NULL,"
+            " aussage TEXT NOT NULL,"
+            " kategorie TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " metric TEXT NOT NULL,"
+            " erstellt REAL NOT NULL,"
+            " PRIMARY KEY (schluessel, modell, version))"
+        )
+
+    def lade(self, schluessel_liste, modell: str, version: str) -> dict:
+        """Gibt {schluessel: (kategorie, status, metric)} für alle mit diesem Modell und dieser Version klassifizierten Schlüssel zurück."""
+        schluessel_liste = list(schluessel_liste)
+        ergebnis = {}
+        # Abfrage in Blöcken, damit die Anzahl der SQL-Parameter begrenzt bleibt.
+        for start in range(0, len(schluessel_liste), 500):
+            block = schluessel_liste[start:start + 500]
+            platzhalter = ",".join("?" * len(block))
+            for schluessel, kategorie, status, metric in self._conn.execute(
+                f"SELECT schluessel, kategorie, status, metric FROM klassifizierungen WHERE modell = ? AND version = ? AND schluessel IN ({platzhalter})",
+                [modell, version, *block]
+            ):
+                ergebnis[schluessel] = (kategorie, status, metric)
+        return ergebnis
+
+    def speichere(self, eintraege, modell: str, version: str, ueberschreiben: bool = True):
+        """Speichert (schluessel, aussage, (kategorie, status, metric))-Einträge für Modell und Version in einer Transaktion."""
+        befehl = "INSERT OR REPLACE" if ueberschreiben else "INSERT OR IGNORE"
+        jetzt = time.time()
+        zeilen = [(schluessel, modell, version, aussage, str(k), str(s), str(m), jetzt) for schluessel, aussage, (k, s, m) in eintraege]
+        if not zeilen:
+            return
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany(
+                f"{befehl} INTO klassifizierungen (schluessel, modell, version, aussage, kategorie, status, metric, erstellt) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                zeilen
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def anzahl(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM klassifizierungen").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
@@ -1,4 +1,6 @@
+import numpy as np
 import pandas as pd
+from functions.report_io import filtere_relevante_aussagen, lade_report
 import os
 import re
 import json
@@ -12,42 +14,21 @@ def _sanitize_filename(name: str) -> str:
     name = re.sub(r'[\\/*?:"<>|]', "", name)
     return name.replace(' ', '_').replace('&', 'and')
 
-# Hauptfunktion
-def generate_company_jsons(data_path: str, output_folder: str):
-    # Erstellt für jedes Unternehmen eine JSON-Datei mit einer detaillierten Analyse der relevanten Aussagen.
-    print(f"--- Beginne Erstellung der JSON-Reports pro Unternehmen ---")
-    
-    # --- 1. Daten laden und vorbereiten ---
-    try:
-        df = pd.read_excel(data_path)
-    except FileNotFoundError:
-        print(f"FEHLER: Die Datei '{data_path}' wurde nicht gefunden. Skript wird beendet.")
-        return
-        
-    print(f"{len(df)} Einträge geladen.")
-    
-    irrelevant_categories = ["No Biodiversity Relevance", "API Fehler"]
-    df_relevant = df[~df['Kategorie'].isin(irrelevant_categories)].copy()
-    print(f"{len(df_relevant)} relevante Einträge werden für die Analyse verwendet.")
-
-    os.makedirs(output_folder, exist_ok=True)
-    print(f"JSON-Dateien werden in '{output_folder}' gespeichert.")
+# Spalten mit Metadaten, die nicht gerankt werden, und die Dimensionen für gruppierte Perzentil-Ränge.
+METADATEN_SPALTEN = ['Country', 'Rating', 'Primary Listing', 'Industry Classification']
+RANK_DIMENSIONS = {'by_country': 'Country', 'by_industry': 'Industry Classification', 'by_rating': 'Rating', 'by_listing': 'Primary Listing'}
 
-    # --- 2. Alle möglichen relevanten Kategorien definieren ---
-    all_possible_categories = sorted([cat for cat in df['Kategorie'].unique() if cat not in irrelevant_categories])
 
-    # --- 3.  Metrik- und Ranking-Daten für alle Unternehmen vorberechnen ---
-    print("Berechne unternehmensweite Metriken und Perzentil-Ränge...")
-    
+# Berechnet die Kennzahlen pro Unternehmen (absolute Zahlen, Anteile, pro Kategorie).
+def _berechne_kennzahlen(df_relevant: pd.DataFrame, all_possible_categories: list) -> pd.DataFrame:
     # Metadaten für jedes einzigartige Unternehmen extrahieren
-    company_metadata = df_relevant.drop_duplicates(subset='Company')[[
-        'Company', 'Country', 'Rating', 'Primary Listing', 'Industry Classification'
-    ]].set_index('Company')
+    company_metadata = df_relevant.drop_duplicates(subset='Company')[['Company'] + METADATEN_SPALTEN].set_index('Company')
 
     df_metrics = company_metadata.copy()
 
+    ist_done = df_relevant['Status'] == 'done'
     df_metrics['total_relevant_statements'] = df_relevant.groupby('Company').size()
-    df_metrics['total_done'] = df_relevant[df_relevant['Status'] == 'done'].groupby('Company').size()
+    df_metrics['total_done'] = df_relevant[ist_done].groupby('Company').size()
     df_metrics['total_planned'] = df_relevant[df_relevant['Status'] == 'planned'].groupby('Company').size()
     df_metrics.fillna(0, inplace=True) 
 
@@ -55,97 +36,142 @@ def generate_company_jsons(data_path: str, output_folder: str):
     df_metrics['total_planned_percent'] = (df_metrics['total_planned'] / df_metrics['total_relevant_statements']).fillna(0)
 
     category_counts_abs = df_relevant.groupby(['Company', 'Kategorie']).size().unstack(fill_value=0)
-    df_metrics = df_metrics.join(category_counts_abs.add_suffix('_abs'))
-
-    category_counts_done = df_relevant[df_relevant['Status'] == 'done'].groupby(['Company', 'Kategorie']).size().unstack(fill_value=0)
-    df_metrics = df_metrics.join(category_counts_done.add_suffix('_done_abs'))
-
-    for cat in all_possible_categories:
-        abs_col = f'{cat}_abs'
-        done_col = f'{cat}_done_abs'
-        pct_col = f'{cat}_done_percent'
-        if abs_col in df_metrics and done_col in df_metrics:
-            df_metrics[pct_col] = (df_metrics[done_col] / df_metrics[abs_col]).fillna(0)
+    category_counts_done = df_relevant[ist_done].groupby(['Company', 'Kategorie']).size().unstack(fill_value=0)
+    df_metrics = df_metrics.join(category_counts_abs.add_suffix('_abs')).join(category_counts_done.add_suffix('_done_abs'))
+
+    # Anteil 'done' pro Kategorie in einem Schritt für alle Kategorien
+    kategorien = [cat for cat in all_possible_categories if f'{cat}_abs' in df_metrics and f'{cat}_done_abs' in df_metrics]
+    if kategorien:
+        done_werte = df_metrics[[f'{cat}_done_abs' for cat in kategorien]].to_numpy(dtype=float)
+        abs_werte = df_metrics[[f'{cat}_abs' for cat in kategorien]].to_numpy(dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            anteile = pd.DataFrame(done_werte / abs_werte, index=df_metrics.index, columns=[f'{cat}_done_percent' for cat in kategorien])
+        df_metrics = pd.concat([df_metrics, anteile.fillna(0)], axis=1)
 
     df_metrics.fillna(0, inplace=True) 
+    return df_metrics
+
+# Berechnet alle Perzentil-Ränge: ein Durchlauf global und ein gruppierter Durchlauf pro Dimension über alle Metriken zugleich.
+def _berechne_raenge(df_metrics: pd.DataFrame, metrics_to_rank: list) -> dict[str, pd.DataFrame]:
+    werte = df_metrics[metrics_to_rank]
+    raenge = {}
+    for rank_name, group_col in RANK_DIMENSIONS.items():
+        raenge[rank_name] = werte.groupby(df_metrics[group_col]).rank(pct=True)
+    raenge['global'] = werte.rank(pct=True)
+    return raenge
+
+# Sammelt alle Keywords pro Unternehmen mit einem einzigen split/explode/groupby.
+def _keywords_pro_unternehmen(df_relevant: pd.DataFrame) -> dict:
+    keywords = df_relevant['Keywords'].fillna('').str.split(',').explode().str.strip()
+    keywords = keywords[keywords.notna() & (keywords != '')]
+    df_keywords = pd.DataFrame({'Company': df_relevant.loc[keywords.index, 'Company'].to_numpy(), 'Keyword': keywords.to_numpy()})
+    return {company: sorted(set(gruppe)) for company, gruppe in df_keywords.groupby('Company', sort=False)['Keyword']}
+
+def berechne_company_reports(df_relevant: pd.DataFrame) -> dict[str, dict]:
+    """
+    Baut für jedes Unternehmen die komplette JSON-Struktur (Metadaten, Ränge, Kennzahlen, Keywords).
+    Alle Berechnungen laufen spaltenweise über alle Unternehmen; pro Unternehmen werden nur noch vorberechnete Werte eingesetzt.
+    """
+    # --- 2. Alle möglichen relevanten Kategorien definieren ---
+    all_possible_categories = sorted(df_relevant['Kategorie'].unique())
 
-    # Perzentil-Rang für jede einzelne Metrik berechnen
-    metrics_to_rank = [col for col in df_metrics.columns if col not in ['Country', 'Rating', 'Primary Listing', 'Industry Classification']]
-    rank_dimensions = {'by_country': 'Country', 'by_industry': 'Industry Classification', 'by_rating': 'Rating', 'by_listing': 'Primary Listing'}
-    
-    df_rankings = df_metrics.copy()
-    
-    # Schleife zur Berechnung der Perzentil-Ränge für jede Metrik
-    for metric in metrics_to_rank:
-        df_rankings[f"percentile_{metric}_global"] = df_rankings[metric].rank(pct=True)
-        
-        for rank_name, group_col in rank_dimensions.items():
-            rank_col_name = f"percentile_{metric}_{rank_name}"
-            df_rankings[rank_col_name] = df_rankings.groupby(group_col)[metric].rank(pct=True)
+    # --- 3.  Metrik- und Ranking-Daten für alle Unternehmen vorberechnen ---
+    print("Berechne unternehmensweite Metriken und Perzentil-Ränge...")
+    df_metrics = _berechne_kennzahlen(df_relevant, all_possible_categories)
 
-    # --- 4. Pro Unternehmen eine JSON-Datei erstellen ---
-    unique_companies = df_relevant['Company'].unique()
-    
-    # Schleife über alle einzigartigen Unternehmen mit Fortschrittsanzeige
-    for company in tqdm(unique_companies, desc="Erstelle JSON-Reports"):
-        if company not in df_metrics.index: continue 
-        
-        company_metrics = df_metrics.loc[company]
-        company_ranks = df_rankings.loc[company]
-        df_company = df_relevant[df_relevant['Company'] == company]
+    # Perzentil-Rang für jede einzelne Metrik berechnen
+    metrics_to_rank = [col for col in df_metrics.columns if col not in METADATEN_SPALTEN]
+    raenge = _berechne_raenge(df_metrics, metrics_to_rank)
+    rang_reihenfolge = list(RANK_DIMENSIONS.keys()) + ['global']
+    rang_schluessel = [f"{rank_name}_percentile" for rank_name in rang_reihenfolge]
+    # Gerundet wird spaltenweise mit numpy (wie zuvor bei den einzelnen numpy-Werten).
+    rang_zeilen = {rank_name: raenge[rank_name].round(4).to_numpy().tolist() for rank_name in rang_reihenfolge}
+
+    prozent_spalten = [col for col in df_metrics.columns if col.endswith('_percent')]
+    df_gerundet = df_metrics.copy()
+    df_gerundet[prozent_spalten] = df_gerundet[prozent_spalten].astype(float).round(4)
+    kennzahlen = df_gerundet.to_dict('index')
+    keywords = _keywords_pro_unternehmen(df_relevant)
+    position = {company: i for i, company in enumerate(df_metrics.index)}
+
+    # --- 4. Pro Unternehmen die JSON-Struktur aus den vorberechneten Werten zusammensetzen ---
+    company_reports = {}
+    for company in df_relevant['Company'].unique():
+        if company not in position:
+            continue
+        company_metrics = kennzahlen[company]
+        zeile = position[company]
+        total_statements = int(company_metrics.get('total_relevant_statements', 0))
+
+        # Perzentil-Ränge pro Metrik
+        rang_werte = [rang_zeilen[rank_name][zeile] for rank_name in rang_reihenfolge]
+        rankings = {
+            metric: {schluessel: werte[i] for schluessel, werte in zip(rang_schluessel, rang_werte)}
+            for i, metric in enumerate(metrics_to_rank)
+        }
 
-        df_company['Keywords'] = df_company['Keywords'].fillna('')
-        all_keywords_set = set(kw.strip() for keywords_str in df_company['Keywords'] for kw in keywords_str.split(',') if kw.strip())
-        all_found_keywords = sorted(list(all_keywords_set))
+        # Kategorie-spezifische Metriken
+        by_category = {}
+        for cat in all_possible_categories:
+            absolute_count = int(company_metrics.get(f'{cat}_abs', 0))
+            by_category[cat] = {
+                "absolute": absolute_count,
+                "percent_of_total": round((absolute_count / total_statements), 4) if total_statements > 0 else 0.0,
+                "done_absolute": int(company_metrics.get(f'{cat}_done_abs', 0)),
+                "done_percent": company_metrics.get(f'{cat}_done_percent', 0.0)
+            }
 
         # JSON-Struktur zusammenbauen
-        company_data = {
+        company_reports[company] = {
             "company_name": company,
             "country": company_metrics.get('Country', 'N/A'),
             "rating": company_metrics.get('Rating', 'N/A'),
             "primary_listing": company_metrics.get('Primary Listing', 'N/A'),
             "industry_classification": company_metrics.get('Industry Classification', 'N/A'),
-            "rankings": {},
+            "rankings": rankings,
             "metrics": {
-                "total_relevant_statements": int(company_metrics.get('total_relevant_statements', 0)),
+                "total_relevant_statements": total_statements,
                 "total_done": int(company_metrics.get('total_done', 0)),
                 "total_planned": int(company_metrics.get('total_planned', 0)),
-                "total_done_percent": round(company_metrics.get('total_done_percent', 0.0), 4),
-                "total_planned_percent": round(company_metrics.get('total_planned_percent', 0.0), 4),
-                "by_category": {}
+                "total_done_percent": company_metrics.get('total_done_percent', 0.0),
+                "total_planned_percent": company_metrics.get('total_planned_percent', 0.0),
+                "by_category": by_category
             },
-            "all_found_keywords": all_found_keywords
+            "all_found_keywords": keywords.get(company, [])
         }
+    return company_reports
 
-        # Perzentil-Ränge hinzufügen
-        for metric in metrics_to_rank:
-            grouped_ranks = {
-                f"{rank_name}_percentile": round(company_ranks.get(f"percentile_{metric}_{rank_name}", 0.0), 4)
-                for rank_name in rank_dimensions.keys()
-            }
-            grouped_ranks['global_percentile'] = round(company_ranks.get(f"percentile_{metric}_global", 0.0), 4)
+# Hauptfunktion
+def generate_company_jsons(data_path: str, output_folder: str, df_relevant: pd.DataFrame | None = None):
+    # Erstellt für jedes Unternehmen eine JSON-Datei mit einer detaillierten Analyse der relevanten Aussagen.
+    # Ist 'df_relevant' übergeben (bereits geladen und gefiltert), wird die Datei nicht erneut gelesen.
+    print(f"--- Beginne Erstellung der JSON-Reports pro Unternehmen ---")
+    
+    # --- 1. Daten laden und vorbereiten ---
+    if df_relevant is None:
+        try:
+            df = lade_report(data_path)
+        except FileNotFoundError:
+            print(f"FEHLER: Die Datei '{data_path}' wurde nicht gefunden. Skript wird beendet.")
+            return
             
-            company_data["rankings"][metric] = grouped_ranks
+        print(f"{len(df)} Einträge geladen.")
+        
+        df_relevant = filtere_relevante_aussagen(df)
+    print(f"{len(df_relevant)} relevante Einträge werden für die Analyse verwendet.")
 
-        # Kategorie-spezifische Metriken hinzufügen
-        for cat in all_possible_categories:
-            absolute_count = int(company_metrics.get(f'{cat}_abs', 0))
-            total_statements = int(company_metrics.get('total_relevant_statements', 0))
-            
-            percent_of_total = round((absolute_count / total_statements), 4) if total_statements > 0 else 0.0
+    os.makedirs(output_folder, exist_ok=True)
+    print(f"JSON-Dateien werden in '{output_folder}' gespeichert.")
 
-            company_data["metrics"]["by_category"][cat] = {
-                "absolute": absolute_count,
-                "percent_of_total": percent_of_total,
-                "done_absolute": int(company_metrics.get(f'{cat}_done_abs', 0)),
-                "done_percent": round(company_metrics.get(f'{cat}_done_percent', 0.0), 4)
-            }
+    # --- 2.-4. Kennzahlen, Ränge und JSON-Strukturen für alle Unternehmen vorberechnen ---
+    company_reports = berechne_company_reports(df_relevant)
 
-        # --- JSON-Datei speichern ---
+    # --- 5. Pro Unternehmen eine JSON-Datei speichern ---
+    for company, company_data in tqdm(company_reports.items(), desc="Erstelle JSON-Reports"):
         sanitized_company_name = _sanitize_filename(company)
         json_filename = os.path.join(output_folder, f"{sanitized_company_name}.json")
         
         with open(json_filename, 'w', encoding='utf-8') as f:
             json.dump(company_data, f, ensure_ascii=False, indent=4)
             
-    print(f"--- Erstellung von {len(unique_companies)} JSON-Dateien abgeschlossen. ---")
+    print(f"--- Erstellung von {len(company_reports)} JSON-Dateien abgeschlossen. ---")
@@ -1,16 +1,157 @@
 import os
 import json
-from config import input_ordner 
+import tempfile
+import threading
+from contextlib import contextmanager
+from config import input_ordner
 
 STATUS_FILE_NAME = "_status.json"
 STATUS_FILE_DIRECTORY = input_ordner
+META_KEY = "_meta"
+
+
+class StatusStore:
+    """
+    Hält den Bearbeitungsstatus aller Stages im Speicher.
+    Die Datei wird einmal pro Prozess gelesen; Änderungen werden atomar (Temp-Datei + Rename) geschrieben.
+    """
+
+    def __init__(self, status_file_path: str):
+        self.status_file_path = status_file_path
+        self._stages: dict[str, set[str]] = {}
+        self._meta: dict[str, dict] = {}
+        self._lock = threading.RLock()
+        self._transaktionen = 0
+        self._geaendert = False
+        self._laden()
+
+    def _laden(self):
+        if not os.path.exists(self.status_file_path):
+            return
+        try:
+            with open(self.status_file_path, 'r', encoding='utf-8') as f:
+                status_data = json.load(f)
+        except json.JSONDecodeError:
+            # Korrupte Datei nicht überschreiben, sondern zur Analyse beiseitelegen.
+            backup_path = self.status_file_path + ".korrupt"
+            print(f"Warnung: Statusdatei '{self.status_file_path}' ist korrupt. Sicherung unter '{backup_path}'. Nehme leeren Status an.")
+            try:
+                os.replace(self.status_file_path, backup_path)
+            except OSError:
+                pass
+            return
+        except Exception as e:
+            print(f"Fehler beim Laden der Statusdatei '{self.status_file_path}': {e}. Nehme leeren Status an.")
+            return
+
+        for stage_key, eintraege in status_data.items():
+            if stage_key == META_KEY:
+                if isinstance(eintraege, dict):
+                    self._meta = eintraege
+                continue
+            if not isinstance(eintraege, list):
+                # Falls der stage_key existiert, aber keine Liste ist (Datenfehler). Kam mal vor, aber dann nie wieeder. sicher ist sicher.
+                print(f"Warnung: Daten für stage_key '{stage_key}' in Statusdatei sind keine Liste. Behandle als leer.")
+                eintraege = []
+            self._stages[stage_key] = set(eintraege)
+
+    def _commit(self):
+        # Schreibt den gesamten Status in eine Temp-Datei im selben Ordner und ersetzt die alte Datei atomar.
+        status_data = {stage_key: sorted(eintraege) for stage_key, eintraege in self._stages.items()}
+        if self._meta:
+            status_data[META_KEY] = self._meta
+        directory = os.path.dirname(self.status_file_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".status_", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(status_data, f, ensure_ascii=False, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.status_file_path)
+            self._geaendert = False
+        except Exception as e:
+            print(f"Fehler beim Schreiben der Statusdatei '{self.status_file_path}': {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def _aenderung(self):
+        self._geaendert = True
+        if self._transaktionen == 0:
+            self._commit()
+
+    @contextmanager
+    def transaktion(self):
+        """Fasst mehrere Änderungen zu einem einzigen Schreibvorgang zusammen."""
+        with self._lock:
+            self._transaktionen += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._transaktionen -= 1
+                if self._transaktionen == 0 and self._geaendert:
+                    self._commit()
+
+    def ist_verarbeitet(self, report_filename: str, stage_key: str) -> bool:
+        with self._lock:
+            return report_filename in self._stages.get(stage_key, ())
+
+    def offene_dateien(self, report_filenames, stage_key: str) -> list[str]:
+        with self._lock:
+            erledigt = self._stages.get(stage_key, set())
+            return [name for name in report_filenames if name not in erledigt]
+
+    def markiere(self, report_filename: str, stage_key: str):
+        with self._lock:
+            eintraege = self._stages.setdefault(stage_key, set())
+            if report_filename in eintraege:
+                return
+            eintraege.add(report_filename)
+            self._aenderung()
+
+    def entferne(self, report_filename: str, stage_key: str):
+        with self._lock:
+            eintraege = self._stages.get(stage_key)
+            if not eintraege or report_filename not in eintraege:
+                return
+            eintraege.discard(report_filename)
+            self._aenderung()
+
+    def get_meta(self, stage_key: str, report_filename: str, default=None):
+        with self._lock:
+            return self._meta.get(stage_key, {}).get(report_filename, default)
+
+    def set_meta(self, stage_key: str, report_filename: str, value):
+        with self._lock:
+            stage_meta = self._meta.setdefault(stage_key, {})
+            if stage_meta.get(report_filename) == value:
+                return
+            stage_meta[report_filename] = value
+            self._aenderung()
+
+
+_status_store: StatusStore | None = None
+_status_store_lock = threading.Lock()
+
+
+# Liefert den prozessweiten Status-Store und lädt die Statusdatei beim ersten Zugriff.
+def get_status_store() -> StatusStore:
+    global _status_store
+    with _status_store_lock:
+        status_file_path = os.path.join(STATUS_FILE_DIRECTORY, STATUS_FILE_NAME)
+        if _status_store is None or _status_store.status_file_path != status_file_path:
+            _status_store = StatusStore(status_file_path)
+        return _status_store
 
 # Erstellt die Status-JSON-Datei im  Verzeichnis, falls sie noch nicht existiert.
 def status_setup():
     status_file_path = os.path.join(STATUS_FILE_DIRECTORY, STATUS_FILE_NAME)
     if not os.path.exists(status_file_path):
         try:
-            initial_status = {} 
+            initial_status = {}
             with open(status_file_path, 'w', encoding='utf-8') as f:
                 json.dump(initial_status, f, ensure_ascii=False, indent=4)
             print(f"Statusdatei '{status_file_path}' wurde erfolgreich erstellt.")
@@ -18,60 +159,16 @@ def status_setup():
             print(f"Fehler beim Erstellen der Statusdatei '{status_file_path}': {e}")
     else:
         print(f"Statusdatei '{status_file_path}' existiert bereits.")
+    get_status_store()
 
 # Prüft, ob ein spezifischer Report für einen bestimmten 'stage_key' bereits verarbeitet wurde.
 def load_status(report_filename, stage_key):
-    status_file_path = os.path.join(STATUS_FILE_DIRECTORY, STATUS_FILE_NAME)
-    status_data = {}
-    if os.path.exists(status_file_path):
-        try:
-            with open(status_file_path, 'r', encoding='utf-8') as f:
-                status_data = json.load(f)
-        except json.JSONDecodeError:
-            print(f"Warnung: Statusdatei '{status_file_path}' ist korrupt. Nehme leeren Status an.")
-        except Exception as e:
-            print(f"Fehler beim Laden der Statusdatei '{status_file_path}': {e}. Nehme leeren Status an.")
-    
-    processed_files_for_stage = status_data.get(stage_key, [])
-    if not isinstance(processed_files_for_stage, list):
-        # Falls der stage_key existiert, aber keine Liste ist (Datenfehler). Kam mal vor, aber dann nie wieeder. sicher ist sicher.
-        print(f"Warnung: Daten für stage_key '{stage_key}' in Statusdatei sind keine Liste. Behandle als leer.")
-        processed_files_for_stage = []
-        
-    return report_filename in processed_files_for_stage
+    return get_status_store().ist_verarbeitet(report_filename, stage_key)
 
 # Speichert, dass ein spezifischer Report für einen bestimmten 'stage_key' verarbeitet wurde.
 def save_status(report_filename, stage_key):
-    status_file_path = os.path.join(STATUS_FILE_DIRECTORY, STATUS_FILE_NAME)
-    status_data = {}
-    # Lädt zuerst den aktuellen Gesamtstatus, um andere Stages nicht zu überschreiben
-    if os.path.exists(status_file_path):
-        try:
-            with open(status_file_path, 'r', encoding='utf-8') as f:
-                status_data = json.load(f)
-        except json.JSONDecodeError:
-            print(f"Warnung: Statusdatei '{status_file_path}' beim Speichern korrupt gefunden. Erstelle neu für diesen Eintrag.")
-            status_data = {} # Bei korrupter Datei neu anfangen (oder andere Fehlerbehandlung). Passiert.
-        except Exception as e:
-            print(f"Fehler beim Laden der Statusdatei für Speicherung '{status_file_path}': {e}. Erstelle neu für diesen Eintrag.")
-            status_data = {}
-
-    # Stellt sicher, dass der Stage-Key existiert und eine Liste ist
-    processed_list_for_stage = status_data.get(stage_key, [])
-    if not isinstance(processed_list_for_stage, list):
-        # print(f"Warnung: Stage-Key '{stage_key}' war keine Liste. Initialisiere neu.")
-        processed_list_for_stage = []
-
-    if report_filename not in processed_list_for_stage:
-        processed_list_for_stage.append(report_filename)
-        processed_list_for_stage.sort() 
-        status_data[stage_key] = processed_list_for_stage
-        
-        # Speichert das gesamte (aktualisierte) Status-Dictionary
-        try:
-            with open(status_file_path, 'w', encoding='utf-8') as f:
-                json.dump(status_data, f, ensure_ascii=False, indent=4)
-        except IOError as e:
-            print(f"Fehler beim Schreiben der Statusdatei '{status_file_path}': {e}")
-        except Exception as e:
-            print(f"Ein unerwarteter Fehler beim Speichern der Statusdatei '{status_file_path}': {e}")
+    get_status_store().markiere(report_filename, stage_key)
+
+# Gibt alle Dateien aus 'report_filenames' zurück, die für 'stage_key' noch nicht verarbeitet wurden.
+def pending_files(report_filenames, stage_key):
+    return get_status_store().offene_dateien(report_filenames, stage_key)
@@ -1,4 +1,5 @@
 import pandas as pd
+from functions.report_io import filtere_relevante_aussagen, lade_report
 import os
 
 def _calculate_grouped_summary(df_relevant, group_col):
@@ -29,21 +30,22 @@ def _calculate_grouped_summary(df_relevant, group_col):
     return df_summary
 
 # Hauptfunktion
-def generate_global_summary(data_path: str, output_path: str):
+def generate_global_summary(data_path: str, output_path: str, df_relevant: pd.DataFrame | None = None):
     # Erstellt einen globalen Übersichts-Report sowie gruppierte Reports pro Land, Branche etc.
+    # Ist 'df_relevant' übergeben (bereits geladen und gefiltert), wird die Datei nicht erneut gelesen.
     print(f"--- Beginne Erstellung der globalen und gruppierten Reports ---")
 
     # --- 1. Daten laden und vorbereiten ---
-    try:
-        df = pd.read_excel(data_path)
-    except FileNotFoundError:
-        print(f"FEHLER: Die Datei '{data_path}' wurde nicht gefunden. Skript wird beendet.")
-        return
+    if df_relevant is None:
+        try:
+            df = lade_report(data_path)
+        except FileNotFoundError:
+            print(f"FEHLER: Die Datei '{data_path}' wurde nicht gefunden. Skript wird beendet.")
+            return
+            
+        print(f"{len(df)} Einträge geladen.")
         
-    print(f"{len(df)} Einträge geladen.")
-    
-    irrelevant_categories = ["No Biodiversity Relevance", "API Fehler"]
-    df_relevant = df[~df['Kategorie'].isin(irrelevant_categories)].copy()
+        df_relevant = filtere_relevante_aussagen(df)
     print(f"{len(df_relevant)} relevante Einträge werden für die Analyse verwendet.")
 
     output_dir = os.path.dirname(output_path)
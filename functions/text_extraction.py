@@ -1,46 +1,35 @@
 import os
 import json
+import hashlib
 import fitz
-import subprocess
-import sys
 import nltk
 import re
-import spacy
-from langdetect import detect, LangDetectException
-from functions.status import load_status, save_status
-
-# Definiert die unterstützten Sprachen und ihre Entsprechungen.
-SUPPORTED_LANGUAGES = {
-    'en': {'spacy': 'en_core_web_sm', 'nltk': 'english'},
-    'de': {'spacy': 'de_core_news_sm', 'nltk': 'german'},
-    'fr': {'spacy': 'fr_core_news_sm', 'nltk': 'french'},
-    'es': {'spacy': 'es_core_news_sm', 'nltk': 'spanish'},
-    'it': {'spacy': 'it_core_news_sm', 'nltk': 'italian'},
-    'pt': {'spacy': 'pt_core_news_sm', 'nltk': 'portuguese'},
-    'nl': {'spacy': 'nl_core_news_sm', 'nltk': 'dutch'},
-    'pl': {'spacy': 'pl_core_news_sm', 'nltk': 'polish'},
-    'da': {'spacy': 'da_core_news_sm', 'nltk': 'danish'},
-    'fi': {'spacy': 'fi_core_news_sm', 'nltk': 'finnish'},
-    'no': {'spacy': 'nb_core_news_sm', 'nltk': 'norwegian'},
-    'sv': {'spacy': 'sv_core_news_sm', 'nltk': 'swedish'}
-}
-
-# Lädt alle benötigten spaCy-Modelle beim Start des Skripts, um die Performance zu verbessern.
-print("Lade spaCy-Sprachmodelle...")
-spacy_models = [details['spacy'] for details in SUPPORTED_LANGUAGES.values()]
-for model in spacy_models:
-    print(f"--- Herunterladen des Modells: {model} ---")
-    subprocess.run([sys.executable, "-m", "spacy", "download", model], check=True)
-
-print("\nAlle spaCy-Modelle wurden erfolgreich heruntergeladen!")
-SPACY_MODELS = {
-    lang: spacy.load(details['spacy'], disable=["parser", "ner"]) 
-    for lang, details in SUPPORTED_LANGUAGES.items()
-}
-print("Sprachmodelle geladen.")
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from langdetect import detect, DetectorFactory, LangDetectException
+from functions.extraction_cache import AnalyseCache, pdf_hash
+from functions.keyword_matcher import KeywordMatcher
+from functions.nlp_models import SUPPORTED_LANGUAGES, aktiviere_satztrennung, lade_spacy_modell, modell_kennung
+from functions.status import get_status_store, pending_files, save_status
+from config import analyse_cache_ordner, satztrennung, spacy_batch_size, spacy_n_process, text_extraction_workers
 
 
 CURRENT_STAGE_KEY = "text_extraction"
+SUCHBEGRIFFE_SETS_KEY = "suchbegriffe_sets"
+
+# Folgestufen, die auf einer biodiv_text_passages-Datei aufbauen, mit dem Dateinamen-Suffix, unter dem sie ihren Status führen.
+FOLGESTUFEN = [
+    ("relevant_text_passages_processing", ".json"),
+    ("remove_empty_passages", "_relevant_passages.json"),
+    ("extract_actions_and_metrics", "_relevant_passages.json"),
+    ("deduplicate_statements", "_relevant_passages.json"),
+]
+
+# Keyword-Automaten pro (Sprache, Suchbegriffe); siehe _lade_keyword_matcher.
+_keyword_matcher_cache = {}
+
+# langdetect ist ohne festen Seed nicht deterministisch; sonst könnten Worker-Prozesse andere Sprachen erkennen.
+DetectorFactory.seed = 0
 
 
 # --- HILFSFUNKTIONEN ---
@@ -65,6 +54,11 @@ def lemmatize_text(text, nlp_model):
     doc = nlp_model(text)
     return " ".join([token.lemma_ for token in doc])
 
+# Lemmatisiert mehrere Texte gebündelt über nlp.pipe.
+def lemmatize_texts(texts, nlp_model, batch_size=spacy_batch_size):
+    """Gibt pro Text die mit Leerzeichen verbundenen Lemmata zurück."""
+    return [" ".join(token.lemma_ for token in doc) for doc in nlp_model.pipe(texts, batch_size=batch_size)]
+
 # Bereinigt einen Textstring.
 def clean_text(text):
     """Konvertiert Text in Kleinbuchstaben und entfernt Zeilenumbrüche."""
@@ -84,142 +78,501 @@ def detect_language(text, fallback_lang='unbekannt'):
 
 
 
-# Verarbeitet PDFs, erkennt die Sprache und führt eine sprachspezifische Analyse durch.
-def text_extraction(input_ordner, output_ordner, max_sentence_gap_for_cluster=5):
-    SUCHBEGRIFFE_JSON_PFAD = "./functions/suchbegriffe.json" 
-    alle_suchbegriffe_geladen = lade_suchbegriffe(SUCHBEGRIFFE_JSON_PFAD)
-    alle_suchbegriffe=alle_suchbegriffe_geladen
+# Ersetzt Zeilenumbrüche und Tabs durch Leerzeichen. Die Länge bleibt erhalten, damit Offsets gültig bleiben.
+def _normalisiere_seitentext(text):
+    return re.sub(r'[\n\r\t]', ' ', text)
 
-    target_output_dir = os.path.join(output_ordner, "biodiv_text_passages")
-    os.makedirs(target_output_dir, exist_ok=True)
-    
-    # Schleife über alle Dateien im Input-Ordner.
-    for dateiname in os.listdir(input_ordner):
-        if not dateiname.lower().endswith(".pdf"):
+# Kleinschreibung, die die Textlänge nicht verändert (z.B. bleibt 'İ' erhalten statt zu zwei Zeichen zu werden).
+def _kleinschreibung_laengentreu(text):
+    lower = text.lower()
+    if len(lower) == len(text):
+        return lower
+    return "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+# Zerlegt einen Seitentext mit NLTK in Sätze und ermittelt deren Start-Offset im Seitentext.
+def _nltk_satz_spans(seiten_text, nltk_lang):
+    spans = []
+    cursor = 0
+    for satz in nltk.sent_tokenize(seiten_text, language=nltk_lang):
+        satz = satz.strip()
+        if not satz:
             continue
+        start = seiten_text.find(satz, cursor)
+        if start == -1:
+            # Sollte nicht vorkommen; der Satz wird dann separat lemmatisiert.
+            spans.append((satz, None))
+            continue
+        spans.append((satz, start))
+        cursor = start + len(satz)
+    return spans
 
-        if load_status(dateiname, CURRENT_STAGE_KEY):
+# Zerlegt alle Seiten eines Dokuments in Sätze und lemmatisiert sie in einem einzigen nlp.pipe-Durchlauf.
+def _analysiere_dokument(doc, nlp, nltk_lang, satztrennung="nltk", batch_size=spacy_batch_size, n_process=spacy_n_process):
+    """
+    Gibt pro Seite mit Text ein Dict mit 'seite', 'saetze', 'offsets' und 'lemmata' zurück.
+    'lemmata' enthält pro Satz die kleingeschriebenen Lemmata, mit Leerzeichen verbunden.
+    """
+    seiten = []
+    for page in doc:
+        page_text_original = page.get_text("text")
+        if not page_text_original or not page_text_original.strip():
             continue
+        seiten.append((page.number + 1, _normalisiere_seitentext(page_text_original)))
 
-        voller_pfad_pdf = os.path.join(input_ordner, dateiname)
-        print(f"\n--- Verarbeite Datei: {dateiname} ---")
-        
-        doc = None
-        try:
-            doc = fitz.open(voller_pfad_pdf)
-            sample_text = "".join([doc.load_page(i).get_text("text") for i in range(min(3, doc.page_count))])
-            
-            if not sample_text.strip():
-                 print(f"  Dokument '{dateiname}' enthält keinen extrahierbaren Text. Überspringe.")
-                 save_status(dateiname, CURRENT_STAGE_KEY)
-                 continue
-
-            lang_code = detect_language(sample_text)
-            
-            if lang_code not in SUPPORTED_LANGUAGES:
-                print(f"  Dokument '{dateiname}' als '{lang_code}' erkannt. Sprache nicht unterstützt. Überspringe.")
-                save_status(dateiname, CURRENT_STAGE_KEY)
+    if satztrennung == "spacy":
+        aktiviere_satztrennung(nlp)
+
+    seiten_analyse = []
+    lemma_docs = nlp.pipe(
+        (_kleinschreibung_laengentreu(seiten_text) for _, seiten_text in seiten),
+        batch_size=batch_size,
+        n_process=n_process
+    )
+    # Schleife über alle Seiten zusammen mit ihrem spaCy-Dokument.
+    for (seitenzahl, seiten_text), lemma_doc in zip(seiten, lemma_docs):
+        if satztrennung == "spacy":
+            satz_spans = []
+            for sent in lemma_doc.sents:
+                roh = seiten_text[sent.start_char:sent.end_char]
+                satz = roh.strip()
+                if satz:
+                    satz_spans.append((satz, sent.start_char + len(roh) - len(roh.lstrip())))
+        else:
+            satz_spans = _nltk_satz_spans(seiten_text, nltk_lang)
+
+        verortet = [(start, start + len(satz), i) for i, (satz, start) in enumerate(satz_spans) if start is not None]
+        starts = [start for start, _, _ in verortet]
+        lemmata_pro_satz = [[] for _ in satz_spans]
+        # Ordnet jedes Token über seinen Zeichen-Offset dem passenden Satz zu.
+        for token in lemma_doc:
+            if token.is_space:
                 continue
-            
-            print(f"  Sprache erkannt: {lang_code}")
-            nlp = SPACY_MODELS[lang_code]
-            nltk_lang = SUPPORTED_LANGUAGES[lang_code]['nltk']
-
-            aktuelle_suchbegriffe = alle_suchbegriffe.get(lang_code)
-            if not aktuelle_suchbegriffe:
-                print(f"  Keine Suchbegriffe für die Sprache '{lang_code}' in der JSON-Datei gefunden. Überspringe.")
-                save_status(dateiname, CURRENT_STAGE_KEY)
+            j = bisect_right(starts, token.idx) - 1
+            if j < 0 or token.idx >= verortet[j][1]:
                 continue
+            lemmata_pro_satz[verortet[j][2]].append(token.lemma_)
 
-            lemmatized_keywords = [lemmatize_text(clean_text(kw), nlp) for kw in aktuelle_suchbegriffe]
-            keyword_regex = re.compile(r"\b(" + "|".join(re.escape(kw) for kw in lemmatized_keywords) + r")\b", re.IGNORECASE)
+        saetze, offsets, lemmata = [], [], []
+        for (satz, start), satz_lemmata in zip(satz_spans, lemmata_pro_satz):
+            saetze.append(satz)
+            offsets.append(start)
+            if start is None:
+                lemmata.append(lemmatize_text(clean_text(satz), nlp))
+            else:
+                lemmata.append(" ".join(satz_lemmata))
 
-            alle_saetze_des_dokuments = []
-            
-            # Schleife über alle Seiten des Dokuments.
-            for page in doc:
-                page_text_original = page.get_text("text")
-                if not page_text_original or not page_text_original.strip():
-                    continue
+        seiten_analyse.append({"seite": seitenzahl, "saetze": saetze, "offsets": offsets, "lemmata": lemmata})
+    return seiten_analyse
 
-                lemmatized_page_text = lemmatize_text(clean_text(page_text_original), nlp)
-
-                if keyword_regex.search(lemmatized_page_text):
-                    sentences_on_this_page = nltk.sent_tokenize(page_text_original.replace('\n', ' '), language=nltk_lang)
-                    for s in sentences_on_this_page:
-                        if s.strip():
-                            alle_saetze_des_dokuments.append((s.strip(), page.number + 1))
-            
-            if not alle_saetze_des_dokuments:
-                print(f"Keine relevanten Sätze in '{dateiname}' gefunden.")
-                save_status(dateiname, CURRENT_STAGE_KEY) 
-                continue
 
-            keyword_sentence_indices = []
-            # Schleife über alle gesammelten Sätze zur Index-Findung.
-            for i, (original_sentence, _) in enumerate(alle_saetze_des_dokuments):
-                lemmatized_sentence = lemmatize_text(clean_text(original_sentence), nlp)
-                if keyword_regex.search(lemmatized_sentence):
-                    keyword_sentence_indices.append(i)
-            
-            if not keyword_sentence_indices:
-                save_status(dateiname, CURRENT_STAGE_KEY)
-                continue
+# Durchsucht die Lemmata einer Seite in einem Durchlauf und ordnet die Treffer-Spans den Sätzen zu.
+# Gibt None zurück, wenn die Seite keinen Treffer hat; sonst die Menge der Satz-Indizes mit vollständigem Treffer.
+def _saetze_mit_treffer(satz_lemmata, lemma_matcher):
+    seiten_lemmata = " ".join(satz_lemmata)
+    satz_starts = []
+    position = 0
+    for lemmata in satz_lemmata:
+        satz_starts.append(position)
+        position += len(lemmata) + 1
+
+    treffer_saetze = None
+    for _, start, ende in lemma_matcher.finditer(seiten_lemmata):
+        if treffer_saetze is None:
+            treffer_saetze = set()
+        i = bisect_right(satz_starts, start) - 1
+        # Treffer über eine Satzgrenze hinweg zählen nur für die Seite, nicht für den Satz.
+        if ende <= satz_starts[i] + len(satz_lemmata[i]):
+            treffer_saetze.add(i)
+    return treffer_saetze
+
+
+# Baut die Keyword-Automaten einer Sprache einmal pro Prozess auf und hält sie vor.
+# Der Lemma-Automat durchsucht lemmatisierte Seiten, der Keyword-Automat die Original-Passagen.
+def _lade_keyword_matcher(lang_code, suchbegriffe, kennung, cache):
+    cache_key = (kennung, tuple(suchbegriffe))
+    if cache_key not in _keyword_matcher_cache:
+        # Lemmatisierte Suchbegriffe kommen aus dem Cache; nur neue Begriffe brauchen das spaCy-Modell.
+        keyword_lemmata = cache.lade_keyword_lemmata(kennung)
+        fehlend = [kw for kw in dict.fromkeys(suchbegriffe) if kw not in keyword_lemmata]
+        if fehlend:
+            nlp = lade_spacy_modell(lang_code)
+            keyword_lemmata.update(zip(fehlend, lemmatize_texts([clean_text(kw) for kw in fehlend], nlp)))
+            cache.speichere_keyword_lemmata(kennung, keyword_lemmata)
+        lemmatized_keywords = [keyword_lemmata[kw] for kw in suchbegriffe]
+        _keyword_matcher_cache[cache_key] = (KeywordMatcher(lemmatized_keywords), KeywordMatcher(suchbegriffe))
+    return _keyword_matcher_cache[cache_key]
+
+# Erkennt die Sprache anhand der ersten drei Seiten; "" bei PDFs ohne extrahierbaren Text.
+def _erkenne_sprache(doc):
+    sample_text = "".join([doc.load_page(i).get_text("text") for i in range(min(3, doc.page_count))])
+    return detect_language(sample_text) if sample_text.strip() else ""
+
+# Liefert nur die Sprache einer PDF (aus dem Cache oder über die ersten Seiten), ohne sie zu analysieren.
+def _ermittle_sprache(voller_pfad_pdf, cache):
+    sha = pdf_hash(voller_pfad_pdf)
+    lang_code = cache.lade_sprache(sha)
+    if lang_code is None:
+        with fitz.open(voller_pfad_pdf) as doc:
+            lang_code = _erkenne_sprache(doc)
+        cache.speichere_sprache(sha, lang_code)
+    return lang_code
+
+# Liefert Sprache und Seiten-Analyse einer PDF, bevorzugt aus dem Cache (Schlüssel: SHA-256 + Modellversion).
+# lang_code ist "" für PDFs ohne extrahierbaren Text.
+def _lade_oder_analysiere(voller_pfad_pdf, cache, satztrennung, n_process):
+    sha = pdf_hash(voller_pfad_pdf)
+    doc = None
+    try:
+        lang_code = cache.lade_sprache(sha)
+        if lang_code is None:
+            doc = fitz.open(voller_pfad_pdf)
+            lang_code = _erkenne_sprache(doc)
+            cache.speichere_sprache(sha, lang_code)
+
+        if lang_code not in SUPPORTED_LANGUAGES:
+            return lang_code, None, None
+
+        kennung = f"{modell_kennung(lang_code)}-{satztrennung}"
+        seiten_analyse = cache.lade_analyse(sha, kennung)
+        if seiten_analyse is None:
+            nlp = lade_spacy_modell(lang_code)
+            if doc is None:
+                doc = fitz.open(voller_pfad_pdf)
+            seiten_analyse = _analysiere_dokument(doc, nlp, SUPPORTED_LANGUAGES[lang_code]['nltk'], satztrennung, n_process=n_process)
+            cache.speichere_analyse(sha, kennung, seiten_analyse)
+        else:
+            print("  Seitenanalyse aus dem Cache geladen.")
+        return lang_code, kennung, seiten_analyse
+    finally:
+        if doc: doc.close()
+
+# Ein Provenienz-Segment pro Satz: Seite, Offsets im Seitentext und Lage in der mit " " verbundenen Passage.
+def _satz_provenienz(satz_tupel):
+    segmente = []
+    position = 0
+    for satz, seitenzahl, offset in satz_tupel:
+        segmente.append({
+            "seite": seitenzahl,
+            "start": offset,
+            "ende": None if offset is None else offset + len(satz),
+            "text_start": position,
+            "text_ende": position + len(satz)
+        })
+        position += len(satz) + 1
+    return segmente
+
+# Sucht in einer (gecachten) Seiten-Analyse nach Keyword-Sätzen und baut daraus die Passagen.
+# Mit 'neu_matcher' und 'alt_matcher' (inkrementeller Modus) werden die Cluster weiterhin über alle Suchbegriffe gebildet,
+# aber nur Cluster zurückgegeben, die einen Treffer der neuen Begriffe enthalten oder deren Kontext eine Seite erreicht,
+# die erst durch die neuen Begriffe hinzukommt; jeweils als (passage, kern). 'kern' enthält (seite, satz)
+# für die Sätze vom ersten bis zum letzten Keyword-Satz des Clusters; bestehende Passagen, die einen dieser Sätze enthalten,
+# sind in diesem Cluster aufgegangen und werden beim Zusammenführen ersetzt.
+def _finde_passagen(seiten_analyse, lemma_matcher, keyword_matcher, max_sentence_gap_for_cluster, dateiname, neu_matcher=None, alt_matcher=None):
+    alle_saetze_des_dokuments = []
+    keyword_sentence_indices = []
+    neue_treffer_indices = set()
+    neue_seiten = set()
+
+    # Schleife über alle Seiten des Dokuments. Nur Seiten mit Keyword liefern Sätze (und damit Kontext).
+    for seite in seiten_analyse:
+        treffer_saetze = _saetze_mit_treffer(seite["lemmata"], lemma_matcher)
+        if treffer_saetze is None:
+            continue
+        neue_treffer = set()
+        if neu_matcher is not None:
+            neue_treffer = _saetze_mit_treffer(seite["lemmata"], neu_matcher) or set()
+            if alt_matcher is None or _saetze_mit_treffer(seite["lemmata"], alt_matcher) is None:
+                neue_seiten.add(seite["seite"])
+        for i, (satz, offset) in enumerate(zip(seite["saetze"], seite["offsets"])):
+            if i in treffer_saetze or i in neue_treffer:
+                keyword_sentence_indices.append(len(alle_saetze_des_dokuments))
+            if i in neue_treffer:
+                neue_treffer_indices.add(len(alle_saetze_des_dokuments))
+            alle_saetze_des_dokuments.append((satz, seite["seite"], offset))
+
+    if not alle_saetze_des_dokuments:
+        print(f"Keine relevanten Sätze in '{dateiname}' gefunden.")
+        return []
+
+    if not keyword_sentence_indices:
+        return []
+
+    sentence_clusters = []
+    current_cluster = [keyword_sentence_indices[0]]
+    # Schleife über die Keyword-Indizes zur Cluster-Bildung.
+    for i in range(1, len(keyword_sentence_indices)):
+        if keyword_sentence_indices[i] - current_cluster[-1] <= max_sentence_gap_for_cluster:
+            current_cluster.append(keyword_sentence_indices[i])
+        else:
+            sentence_clusters.append(current_cluster)
+            current_cluster = [keyword_sentence_indices[i]]
+    sentence_clusters.append(current_cluster)
+
+    extrahierte_textbloecke_fuer_diese_pdf = []
+    processed_snippets_for_this_pdf = set()
+
+    # Schleife über die Satz-Cluster zur Extraktion.
+    for cluster in sentence_clusters:
+        first_keyword_idx, last_keyword_idx = cluster[0], cluster[-1]
+        start_context_idx = max(0, first_keyword_idx - 5)
+        end_context_idx = min(len(alle_saetze_des_dokuments) - 1, last_keyword_idx + 5)
+
+        context_window_tuples = alle_saetze_des_dokuments[start_context_idx : end_context_idx + 1]
+        if neu_matcher is not None and not neue_treffer_indices.intersection(cluster) \
+                and not any(s_tuple[1] in neue_seiten for s_tuple in context_window_tuples):
+            continue
+        focused_passage = " ".join(s_tuple[0] for s_tuple in context_window_tuples).strip()
+
+        if focused_passage and focused_passage not in processed_snippets_for_this_pdf:
+            page_numbers = {s_tuple[1] for s_tuple in context_window_tuples}
+            min_page, max_page = min(page_numbers), max(page_numbers)
+            page_range_str = str(min_page) if min_page == max_page else f"{min_page}-{max_page}"
 
-            sentence_clusters = []
-            if keyword_sentence_indices:
-                current_cluster = [keyword_sentence_indices[0]]
-                # Schleife über die Keyword-Indizes zur Cluster-Bildung.
-                for i in range(1, len(keyword_sentence_indices)):
-                    if keyword_sentence_indices[i] - current_cluster[-1] <= max_sentence_gap_for_cluster:
-                        current_cluster.append(keyword_sentence_indices[i])
-                    else:
-                        sentence_clusters.append(current_cluster)
-                        current_cluster = [keyword_sentence_indices[i]]
-                sentence_clusters.append(current_cluster)
-            
-            extrahierte_textbloecke_fuer_diese_pdf = []
-            processed_snippets_for_this_pdf = set()
-
-            # Schleife über die Satz-Cluster zur Extraktion.
-            for cluster in sentence_clusters:
-                first_keyword_idx, last_keyword_idx = cluster[0], cluster[-1]
-                start_context_idx = max(0, first_keyword_idx - 5)
-                end_context_idx = min(len(alle_saetze_des_dokuments) - 1, last_keyword_idx + 5)
-                
-                context_window_tuples = alle_saetze_des_dokuments[start_context_idx : end_context_idx + 1]
-                focused_passage = " ".join(s_tuple[0] for s_tuple in context_window_tuples).strip()
-                
-                if focused_passage and focused_passage not in processed_snippets_for_this_pdf:
-                    page_numbers = {s_tuple[1] for s_tuple in context_window_tuples}
-                    min_page, max_page = min(page_numbers), max(page_numbers)
-                    page_range_str = str(min_page) if min_page == max_page else f"{min_page}-{max_page}"
-                    
-                    # Identifiziere, welche spezifischen Keywords im gefundenen Textabschnitt enthalten sind.
-                    found_keywords_in_passage = set()
-                    for keyword in aktuelle_suchbegriffe:
-                        # Suche case-insensitiv nach dem Keyword im Text
-                        if re.search(r'\b' + re.escape(keyword) + r'\b', focused_passage, re.IGNORECASE):
-                            found_keywords_in_passage.add(keyword)
-                    
-                    # Füge Feld "found_keywords" zum Output-Dictionary hinzu.
-                    extrahierte_textbloecke_fuer_diese_pdf.append({
-                        "page_range": page_range_str, 
-                        "passage_text": focused_passage,
-                        "found_keywords": list(found_keywords_in_passage) 
-                    })
-                    processed_snippets_for_this_pdf.add(focused_passage)
-            
-            if extrahierte_textbloecke_fuer_diese_pdf: 
-                basisname_ohne_ext = os.path.splitext(dateiname)[0]
-                json_dateipfad = os.path.join(target_output_dir, f"{basisname_ohne_ext}.json")
+            # Identifiziere, welche spezifischen Keywords im gefundenen Textabschnitt enthalten sind.
+            # Die Reihenfolge folgt der Suchbegriff-Liste, damit die Ausgabe in jedem Prozess identisch ist.
+            found_keywords_in_passage = keyword_matcher.found_keywords(focused_passage)
+
+            # Füge Feld "found_keywords" zum Output-Dictionary hinzu.
+            # "provenienz" verortet jeden Satz der Passage auf seiner Seite (Offsets im normalisierten Seitentext).
+            passage = {
+                "page_range": page_range_str,
+                "passage_text": focused_passage,
+                "found_keywords": found_keywords_in_passage,
+                "provenienz": _satz_provenienz(context_window_tuples)
+            }
+            if neu_matcher is not None:
+                kern = [(seitenzahl, satz) for satz, seitenzahl, _ in alle_saetze_des_dokuments[first_keyword_idx : last_keyword_idx + 1]]
+                passage = (passage, kern)
+            extrahierte_textbloecke_fuer_diese_pdf.append(passage)
+            processed_snippets_for_this_pdf.add(focused_passage)
+
+    return extrahierte_textbloecke_fuer_diese_pdf
+
+
+# Verarbeitet eine einzelne PDF und gibt (Sprache, gefundene Textpassagen) zurück.
+# Läuft wahlweise im Hauptprozess oder in einem Worker-Prozess und schreibt daher selbst keine Dateien.
+# Mit 'nur_suchbegriffe' werden nur Passagen zurückgegeben, deren Cluster einen dieser (neuen) Begriffe enthält,
+# als (passage, kern)-Paare für _fuehre_passagen_zusammen; Cluster und found_keywords nutzen weiterhin alle Begriffe.
+def _verarbeite_pdf(voller_pfad_pdf, dateiname, alle_suchbegriffe, max_sentence_gap_for_cluster, cache_ordner=analyse_cache_ordner, satztrennung=satztrennung, n_process=spacy_n_process, nur_suchbegriffe=None):
+    """Gibt die Sprache und die Liste der extrahierten Passagen zurück (leer, wenn nichts Relevantes gefunden wurde)."""
+    print(f"\n--- Verarbeite Datei: {dateiname} ---")
+    cache = AnalyseCache(cache_ordner)
+    lang_code, kennung, seiten_analyse = _lade_oder_analysiere(voller_pfad_pdf, cache, satztrennung, n_process)
+
+    if not lang_code:
+        print(f"  Dokument '{dateiname}' enthält keinen extrahierbaren Text. Überspringe.")
+        return lang_code, []
+
+    if lang_code not in SUPPORTED_LANGUAGES:
+        print(f"  Dokument '{dateiname}' als '{lang_code}' erkannt. Sprache nicht unterstützt. Überspringe.")
+        return lang_code, []
+
+    print(f"  Sprache erkannt: {lang_code}")
+    aktuelle_suchbegriffe = alle_suchbegriffe.get(lang_code)
+    if not aktuelle_suchbegriffe:
+        print(f"  Keine Suchbegriffe für die Sprache '{lang_code}' in der JSON-Datei gefunden. Überspringe.")
+        return lang_code, []
+
+    lemma_matcher, keyword_matcher = _lade_keyword_matcher(lang_code, aktuelle_suchbegriffe, kennung, cache)
+    neu_matcher, alt_matcher = None, None
+    if nur_suchbegriffe is not None:
+        print(f"  Inkrementelle Suche nach {len(nur_suchbegriffe)} neuen Suchbegriffen.")
+        neu_matcher, _ = _lade_keyword_matcher(lang_code, nur_suchbegriffe, kennung, cache)
+        alte_suchbegriffe = [kw for kw in aktuelle_suchbegriffe if kw not in set(nur_suchbegriffe)]
+        if alte_suchbegriffe:
+            alt_matcher, _ = _lade_keyword_matcher(lang_code, alte_suchbegriffe, kennung, cache)
+    return lang_code, _finde_passagen(seiten_analyse, lemma_matcher, keyword_matcher, max_sentence_gap_for_cluster, dateiname, neu_matcher, alt_matcher)
+
+# Fingerprint einer Suchbegriff-Liste; unabhängig von Reihenfolge und Duplikaten.
+def _suchbegriffe_fingerprint(suchbegriffe):
+    kanonisch = json.dumps(sorted(set(suchbegriffe or [])), ensure_ascii=False)
+    return hashlib.sha256(kanonisch.encode('utf-8')).hexdigest()[:16]
+
+# Prüft, ob eine bestehende Passage einen der Kern-Sätze (seite, satz) eines neuen Clusters enthält.
+# Ohne Provenienz (Dateien aus älteren Läufen) wird auf den Text der Passage zurückgegriffen.
+def _enthaelt_kern(passage, kern):
+    text = passage.get("passage_text", "")
+    segmente = [s for s in passage.get("provenienz") or [] if "text_start" in s]
+    if segmente:
+        return any((s["seite"], text[s["text_start"]:s["text_ende"]]) in kern for s in segmente)
+    return any(satz in text for _, satz in kern)
+
+# Lage einer Passage im Dokument (Seite, Offset ihres ersten Satzes); None ohne verwertbare Provenienz.
+def _dokument_position(passage):
+    segmente = passage.get("provenienz") or []
+    if not segmente or segmente[0].get("start") is None:
+        return None
+    return segmente[0]["seite"], segmente[0]["start"]
+
+# Führt neue Passagen ((passage, kern)-Paare aus _finde_passagen) in eine bestehende Passagen-Datei ein.
+# Bestehende Passagen, die im Cluster einer neuen Passage aufgegangen sind, werden durch diese ersetzt.
+# Gibt True zurück, wenn sich der Inhalt geändert hat.
+def _fuehre_passagen_zusammen(json_dateipfad, dateiname, neue_passagen, keyword_matcher):
+    if os.path.exists(json_dateipfad):
+        with open(json_dateipfad, 'r', encoding='utf-8') as f:
+            daten = json.load(f)
+    else:
+        daten = {"source_pdf": dateiname, "extracted_passages": []}
+
+    passagen = daten.setdefault("extracted_passages", [])
+    geaendert = False
+    # Bestehende Passagen können die neuen Begriffe bereits enthalten.
+    for passage in passagen:
+        vorhandene = passage.get("found_keywords", [])
+        ergaenzt = vorhandene + [kw for kw in keyword_matcher.found_keywords(passage.get("passage_text", "")) if kw not in vorhandene]
+        if ergaenzt != vorhandene:
+            passage["found_keywords"] = ergaenzt
+            geaendert = True
+
+    for passage, kern in neue_passagen:
+        kern = {tuple(k) for k in kern}
+        ersetzt = [i for i, alt in enumerate(passagen) if _enthaelt_kern(alt, kern)]
+        if [passagen[i].get("passage_text") for i in ersetzt] == [passage["passage_text"]]:
+            continue
+        # Die neue Passage übernimmt die Position der ersten ersetzten Passage bzw. wird nach ihrer Lage im Dokument einsortiert.
+        if ersetzt:
+            position = ersetzt[0]
+        else:
+            position = len(passagen)
+            neu_position = _dokument_position(passage)
+            if neu_position is not None:
+                for i, alt in enumerate(passagen):
+                    alt_position = _dokument_position(alt)
+                    if alt_position is not None and alt_position > neu_position:
+                        position = i
+                        break
+        ersetzt = set(ersetzt)
+        passagen[:] = [alt for i, alt in enumerate(passagen) if i not in ersetzt]
+        passagen.insert(position, passage)
+        geaendert = True
+
+    if geaendert:
+        with open(json_dateipfad, 'w', encoding='utf-8') as jsonfile:
+            json.dump(daten, jsonfile, ensure_ascii=False, indent=4)
+    return geaendert
+
+# Setzt den Status der Folgestufen zurück, damit eine ergänzte Passagen-Datei dort erneut verarbeitet wird.
+def _setze_folgestufen_zurueck(basisname_ohne_ext):
+    store = get_status_store()
+    for stage_key, suffix in FOLGESTUFEN:
+        store.entferne(f"{basisname_ohne_ext}{suffix}", stage_key)
+
+# Schreibt die Passagen einer PDF, markiert die Datei als verarbeitet und merkt sich den Suchbegriff-Fingerprint.
+def _speichere_ergebnis(dateiname, lang_code, extrahierte_textbloecke, target_output_dir, alle_suchbegriffe, nur_suchbegriffe=None):
+    basisname_ohne_ext = os.path.splitext(dateiname)[0]
+    json_dateipfad = os.path.join(target_output_dir, f"{basisname_ohne_ext}.json")
+    store = get_status_store()
+
+    with store.transaktion():
+        if nur_suchbegriffe is None:
+            if extrahierte_textbloecke:
                 with open(json_dateipfad, 'w', encoding='utf-8') as jsonfile:
-                    json.dump({"source_pdf": dateiname, "extracted_passages": extrahierte_textbloecke_fuer_diese_pdf}, jsonfile, ensure_ascii=False, indent=4)
+                    json.dump({"source_pdf": dateiname, "extracted_passages": extrahierte_textbloecke}, jsonfile, ensure_ascii=False, indent=4)
                 print(f"Textpassagen für '{dateiname}' wurden gespeichert.")
-            
             save_status(dateiname, CURRENT_STAGE_KEY)
+        else:
+            keyword_matcher = KeywordMatcher(alle_suchbegriffe.get(lang_code, []))
+            if _fuehre_passagen_zusammen(json_dateipfad, dateiname, extrahierte_textbloecke, keyword_matcher):
+                _setze_folgestufen_zurueck(basisname_ohne_ext)
+                print(f"Textpassagen für '{dateiname}' wurden um neue Suchbegriffe ergänzt.")
+            else:
+                print(f"Keine neuen Passagen für '{dateiname}'.")
+
+        store.set_meta(CURRENT_STAGE_KEY, dateiname, {
+            "lang": lang_code,
+            "suchbegriffe": _suchbegriffe_fingerprint(alle_suchbegriffe.get(lang_code))
+        })
 
+# Ermittelt für bereits verarbeitete PDFs, welche Suchbegriffe seit der letzten Verarbeitung hinzugekommen sind.
+def _inkrementelle_auftraege(erledigte_dateien, input_ordner, alle_suchbegriffe, cache_ordner):
+    store = get_status_store()
+    cache = AnalyseCache(cache_ordner)
+    auftraege = []
+    with store.transaktion():
+        for dateiname in erledigte_dateien:
+            meta = store.get_meta(CURRENT_STAGE_KEY, dateiname)
+            if meta is None:
+                # Vor Einführung der Fingerprints verarbeitet: aktuellen Stand als Ausgangsbasis festhalten.
+                try:
+                    lang_code = _ermittle_sprache(os.path.join(input_ordner, dateiname), cache)
+                except Exception as e:
+                    print(f"  Warnung: Sprache von '{dateiname}' konnte nicht ermittelt werden: {e}")
+                    continue
+                store.set_meta(CURRENT_STAGE_KEY, dateiname, {
+                    "lang": lang_code,
+                    "suchbegriffe": _suchbegriffe_fingerprint(alle_suchbegriffe.get(lang_code))
+                })
+                continue
+
+            lang_code = meta.get("lang")
+            if lang_code not in SUPPORTED_LANGUAGES:
+                continue
+            aktuelle_suchbegriffe = alle_suchbegriffe.get(lang_code) or []
+            if meta.get("suchbegriffe") == _suchbegriffe_fingerprint(aktuelle_suchbegriffe):
+                continue
+
+            alte_suchbegriffe = set(store.get_meta(SUCHBEGRIFFE_SETS_KEY, meta.get("suchbegriffe"), []))
+            neue_suchbegriffe = [kw for kw in dict.fromkeys(aktuelle_suchbegriffe) if kw not in alte_suchbegriffe]
+            if neue_suchbegriffe:
+                auftraege.append((dateiname, neue_suchbegriffe))
+            else:
+                # Nur entfernte Begriffe: bestehende Passagen bleiben erhalten.
+                store.set_meta(CURRENT_STAGE_KEY, dateiname, dict(meta, suchbegriffe=_suchbegriffe_fingerprint(aktuelle_suchbegriffe)))
+    return auftraege
+
+
+# Verarbeitet PDFs, erkennt die Sprache und führt eine sprachspezifische Analyse durch.
+# Mit workers > 1 werden die PDFs auf einen Prozess-Pool verteilt; jeder Worker lädt seine eigenen spaCy-Modelle.
+# Bereits verarbeitete PDFs werden nur dann erneut durchsucht, wenn seit ihrer Verarbeitung Suchbegriffe hinzugekommen sind.
+def text_extraction(input_ordner, output_ordner, max_sentence_gap_for_cluster=5, workers=text_extraction_workers, cache_ordner=analyse_cache_ordner):
+    SUCHBEGRIFFE_JSON_PFAD = "./functions/suchbegriffe.json" 
+    alle_suchbegriffe_geladen = lade_suchbegriffe(SUCHBEGRIFFE_JSON_PFAD)
+    alle_suchbegriffe=alle_suchbegriffe_geladen
+
+    target_output_dir = os.path.join(output_ordner, "biodiv_text_passages")
+    os.makedirs(target_output_dir, exist_ok=True)
+
+    # Jede verwendete Suchbegriff-Liste wird unter ihrem Fingerprint registriert, um später neue Begriffe zu erkennen.
+    store = get_status_store()
+    with store.transaktion():
+        for suchbegriffe in alle_suchbegriffe.values():
+            store.set_meta(SUCHBEGRIFFE_SETS_KEY, _suchbegriffe_fingerprint(suchbegriffe), sorted(set(suchbegriffe)))
+
+    pdf_dateien = [d for d in os.listdir(input_ordner) if d.lower().endswith(".pdf")]
+    offene_dateien = pending_files(pdf_dateien, CURRENT_STAGE_KEY)
+    print(f"{len(offene_dateien)} von {len(pdf_dateien)} PDFs müssen noch verarbeitet werden.")
+
+    offene_menge = set(offene_dateien)
+    erledigte_dateien = [d for d in pdf_dateien if d not in offene_menge]
+    auftraege = [(dateiname, None) for dateiname in offene_dateien]
+    inkrementell = _inkrementelle_auftraege(erledigte_dateien, input_ordner, alle_suchbegriffe, cache_ordner)
+    if inkrementell:
+        print(f"{len(inkrementell)} bereits verarbeitete PDFs werden nach neuen Suchbegriffen durchsucht.")
+    auftraege.extend(inkrementell)
+
+    if workers and workers > 1 and len(auftraege) > 1:
+        print(f"Starte Prozess-Pool mit {workers} Workern.")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Innerhalb der Worker läuft spaCy einprozessig, sonst würden Prozesse doppelt verschachtelt.
+            futures = {
+                executor.submit(_verarbeite_pdf, os.path.join(input_ordner, dateiname), dateiname, alle_suchbegriffe, max_sentence_gap_for_cluster, cache_ordner, n_process=1, nur_suchbegriffe=nur_suchbegriffe): (dateiname, nur_suchbegriffe)
+                for dateiname, nur_suchbegriffe in auftraege
+            }
+            # Ergebnisse werden im Hauptprozess geschrieben, sobald ein Worker fertig ist.
+            for future in as_completed(futures):
+                dateiname, nur_suchbegriffe = futures[future]
+                try:
+                    lang_code, extrahierte_textbloecke = future.result()
+                    _speichere_ergebnis(dateiname, lang_code, extrahierte_textbloecke, target_output_dir, alle_suchbegriffe, nur_suchbegriffe)
+                except Exception as e:
+                    print(f"Ein unerwarteter Fehler bei der Verarbeitung der Datei {dateiname} aufgetreten: {e}")
+        return
+
+    # Schleife über alle anstehenden Dateien im Input-Ordner.
+    for dateiname, nur_suchbegriffe in auftraege:
+        voller_pfad_pdf = os.path.join(input_ordner, dateiname)
+        try:
+            lang_code, extrahierte_textbloecke = _verarbeite_pdf(voller_pfad_pdf, dateiname, alle_suchbegriffe, max_sentence_gap_for_cluster, cache_ordner, nur_suchbegriffe=nur_suchbegriffe)
+            _speichere_ergebnis(dateiname, lang_code, extrahierte_textbloecke, target_output_dir, alle_suchbegriffe, nur_suchbegriffe)
         except Exception as e:
             print(f"Ein unerwarteter Fehler bei der Verarbeitung der Datei {dateiname} aufgetreten: {e}")
-        finally:
-            if doc: doc.close()
\ No newline at end of file
@@ -1,10 +1,10 @@
 import os
-import time
 from dotenv import load_dotenv
-import google.generativeai as genai
 import json
 import nltk
-from functions.status import load_status, save_status
+from functions.llm_client import get_llm_client
+from functions.provenienz import satz_positionen, verorte_bereich
+from functions.status import pending_files, save_status
 
 prompt_extraction = """
 You are a highly intelligent text analysis assistant specializing in corporate sustainability reports.
@@ -53,106 +53,100 @@ CURRENT_STAGE_KEY_GEMINI_VALIDATION = "relevant_text_passages_processing"
 
 
 
-api_cache: dict[str, list[int]] = {}
+# Liest die 1-basierten Satz-Indizes aus der API-Antwort und gibt sie 0-basiert zurück. Ungültige Antworten lösen einen ValueError aus.
+def _parse_key_sentence_indices(raw: str) -> list[int]:
+    parsed = json.loads(raw)
+    if not isinstance(parsed, dict) or not isinstance(parsed.get("key_sentence_indices"), list):
+        raise ValueError("Antwort enthält keine Liste 'key_sentence_indices'.")
+    return [int(i) - 1 for i in parsed["key_sentence_indices"]]
 
 
-def get_key_sentence_indices_from_api(gemini_model_version, passage_text: str) -> list[int]:
-    try:
-        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-        gemini_model = genai.GenerativeModel(gemini_model_version)
-    except Exception as e:
-        print(f"Fehler bei der Konfiguration der Gemini API: {e}")
-        gemini_model = None
-
-    # Liest JSONs, identifiziert Kern-Sätze per Index, baut Kontextfenster und schreibt die Ergebnisse in neue Output-JSONs.
-    if gemini_model is None:
-        print("Gemini-Modell nicht initialisiert.")
-        return
+def get_key_sentence_indices_from_api(gemini_model_version, all_sentences: list[str]) -> list[int]:
     # Identifiziert relevante Sätze mittels KI und gibt deren Indizes zurück.
-   
-    # Zerlegt den Text in Sätze
-    all_sentences = nltk.sent_tokenize(passage_text)
+    # Erwartet die bereits zerlegten Sätze der Passage, damit Prompt (und Cache-Schlüssel) und Indizes auf derselben Zerlegung beruhen.
     if not all_sentences:
         return []
+    llm_client = get_llm_client(gemini_model_version)
 
     # Erstellt einen nummerierten String für den Prompt
     numbered_sentences_str = "\n".join(f"{i+1}. {s}" for i, s in enumerate(all_sentences))
-    
-    # Cache-Schlüssel ist der nummerierte Text, um Eindeutigkeit zu gewährleisten
-    cache_key = numbered_sentences_str
-    if cache_key in api_cache:
-        return api_cache[cache_key]
 
     prompt_text = prompt_extraction.format(numbered_sentences=numbered_sentences_str)
     generation_config = {"response_mime_type": "application/json"}
     
     max_versuche = 3
-    # Schleife für die API-Aufrufe
+    # Schleife für die API-Aufrufe. Rate-Limits und Serverfehler wiederholt bereits der LLM-Client mit Backoff.
+    # Gültige Antworten landen im persistenten LLM-Cache und werden bei erneuten Läufen direkt wiederverwendet.
     for versuch in range(max_versuche):
         try:
-            response = gemini_model.generate_content(prompt_text, generation_config=generation_config)
-            raw = response.text.strip()
+            raw = llm_client.generate(
+                prompt_text,
+                generation_config=generation_config,
+                template_id="key_sentence_indices",
+                validate=_parse_key_sentence_indices
+            ).strip()
             
             if raw:
-                parsed = json.loads(raw)
-                if isinstance(parsed, dict) and "key_sentence_indices" in parsed:
-                    # Konvertiere Indizes (die 1-basiert vom Prompt kommen) in 0-basierte Indizes für Python
-                    indices = [int(i) - 1 for i in parsed["key_sentence_indices"]]
-                    api_cache[cache_key] = indices
-                    return indices
+                # Konvertiere Indizes (die 1-basiert vom Prompt kommen) in 0-basierte Indizes für Python; Indizes außerhalb der Liste werden verworfen
+                return [i for i in _parse_key_sentence_indices(raw) if 0 <= i < len(all_sentences)]
         except Exception as e:
             print(f"  Warnung bei API-Aufruf (Versuch {versuch + 1}/{max_versuche}): {e}")
-            if versuch < max_versuche - 1:
-                time.sleep(5)
             continue
     
     print(f"  Fehler: Passage konnte nach {max_versuche} Versuchen nicht verarbeitet werden.")
     return []
 
 
-def build_context_passages(all_sentences: list[str], key_indices: list[int], window_size: int = 2) -> list[str]:
-    """
-    Baut Kontextfenster um die gegebenen Kern-Satz-Indizes.
-    """
-    if not key_indices:
-        return []
-
-    final_passages = []
+# Liefert die Satz-Bereiche (start, ende) der Kontextfenster um die gegebenen Kern-Satz-Indizes.
+def _kontext_fenster(anzahl_saetze: int, key_indices: list[int], window_size: int = 2) -> list[tuple[int, int]]:
+    fenster = []
     processed_indices = set()
 
-    # Sortiere die Indizes, um die Passagen in der richtigen Reihenfolge zu erstellen
-    key_indices.sort()
-
-    # Schleife über jeden von der KI identifizierten Index
-    for key_index in key_indices:
+    # Schleife über jeden von der KI identifizierten Index, in aufsteigender Reihenfolge
+    for key_index in sorted(key_indices):
         if key_index in processed_indices:
             continue
 
         start_index = max(0, key_index - window_size)
-        end_index = min(len(all_sentences), key_index + window_size + 1)
-        
-        context_window_sentences = all_sentences[start_index:end_index]
-        final_passages.append(" ".join(context_window_sentences))
-        
+        end_index = min(anzahl_saetze, key_index + window_size + 1)
+        fenster.append((start_index, end_index))
+
         # Markiere alle Sätze in diesem Fenster als verarbeitet, um Überlappungen zu vermeiden
-        for i in range(start_index, end_index):
-            processed_indices.add(i)
-            
-    return final_passages
+        processed_indices.update(range(start_index, end_index))
+
+    return fenster
+
+
+def build_context_passages(all_sentences: list[str], key_indices: list[int], window_size: int = 2) -> list[str]:
+    """
+    Baut Kontextfenster um die gegebenen Kern-Satz-Indizes.
+    """
+    return [" ".join(all_sentences[start:ende]) for start, ende in _kontext_fenster(len(all_sentences), key_indices, window_size)]
+
+
+# Überträgt die Provenienz der Original-Passage auf ein Kontextfenster (Text-Positionen bezogen auf das Fenster).
+def _kontext_provenienz(segmente: list[dict], satz_starts: list, saetze: list[str]) -> list[dict]:
+    provenienz = []
+    position = 0
+    for satz, start in zip(saetze, satz_starts):
+        if start is not None:
+            provenienz.extend(verorte_bereich(segmente, start, start + len(satz), basis=position))
+        position += len(satz) + 1
+    return provenienz
 
 
 def text_validation_gemini(gemini_model_version, basis_ordner: str, relevanter_ordner_pfad: str) -> None:
 
 
     input_folder = os.path.join(basis_ordner, "biodiv_text_passages")
+    llm_client = get_llm_client(gemini_model_version)
     output_folder = relevanter_ordner_pfad
     os.makedirs(output_folder, exist_ok=True)
 
-    # Schleife über alle Dateien im Input-Ordner
-    for fname in os.listdir(input_folder):
-        if not (fname.lower().endswith(".json") and not load_status(fname, CURRENT_STAGE_KEY_GEMINI_VALIDATION)):
-            continue
+    json_dateien = [f for f in os.listdir(input_folder) if f.lower().endswith(".json")]
 
+    # Schleife über alle noch offenen Dateien im Input-Ordner
+    for fname in pending_files(json_dateien, CURRENT_STAGE_KEY_GEMINI_VALIDATION):
         print(f"\n--- Validiere Text aus Datei: {fname} ---")
         fpath = os.path.join(input_folder, fname)
 
@@ -163,29 +157,36 @@ def text_validation_gemini(gemini_model_version, basis_ordner: str, relevanter_o
             print(f"  Ungültige JSON in '{fname}' – übersprungen.")
             continue
 
+        # Zerlege jede Passage genau einmal in Sätze; dieselbe Zerlegung dient für Prompt, Kontextfenster und Provenienz
+        passagen = []
+        for p in data.get("extracted_passages", []):
+            if p.get("passage_text", ""):
+                all_sentences = nltk.sent_tokenize(p["passage_text"])
+                if all_sentences:
+                    passagen.append((p, all_sentences))
+
+        # Schritt 1: Kern-Satz-Indizes für alle Passagen der Datei nebenläufig mit der KI identifizieren
+        alle_key_indices = llm_client.map(
+            lambda passage: get_key_sentence_indices_from_api(gemini_model_version, passage[1]),
+            passagen
+        )
+
         all_context_passages_for_file = []
         # Schleife über jede Passage in der Eingabedatei
-        for p in data.get("extracted_passages", []):
-            original_passage_text = p.get("passage_text", "")
-            if not original_passage_text:
-                continue
-            
-            # Zerlege den Originaltext in Sätze
-            all_sentences = nltk.sent_tokenize(original_passage_text)
-            if not all_sentences:
-                continue
+        for (p, all_sentences), key_indices in zip(passagen, alle_key_indices):
+            original_passage_text = p["passage_text"]
 
-            # Schritt 1: Kern-Satz-Indizes mit der KI identifizieren
-            key_indices = get_key_sentence_indices_from_api(gemini_model_version, original_passage_text)
-            
-            # Schritt 2: Kontextfenster um die Indizes bauen
-            context_passages = build_context_passages(all_sentences, key_indices, window_size=2)
-            
-            if context_passages:
+            # Schritt 2: Kontextfenster um die Indizes bauen und die Seiten-Provenienz mitführen
+            fenster = _kontext_fenster(len(all_sentences), key_indices, window_size=2)
+            satz_starts = satz_positionen(original_passage_text, all_sentences)
+            segmente = p.get("provenienz", [])
+
+            if fenster:
                 all_context_passages_for_file.append({
                     "page_range": p.get("page_range", "Unbekannt"),
-                    "passage_text": context_passages,
-                    "found_keywords": p.get("found_keywords", [])
+                    "passage_text": [" ".join(all_sentences[start:ende]) for start, ende in fenster],
+                    "found_keywords": p.get("found_keywords", []),
+                    "provenienz": [_kontext_provenienz(segmente, satz_starts[start:ende], all_sentences[start:ende]) for start, ende in fenster]
                 })
 
         if all_context_passages_for_file:
@@ -195,4 +196,6 @@ def text_validation_gemini(gemini_model_version, basis_ordner: str, relevanter_o
                 json.dump(out_data, out_f, ensure_ascii=False, indent=4)
             print(f"  Kontext-Passagen für '{fname}' extrahiert und gespeichert.")
         
-        save_status(fname, CURRENT_STAGE_KEY_GEMINI_VALIDATION)
\ No newline at end of file
+        save_status(fname, CURRENT_STAGE_KEY_GEMINI_VALIDATION)
+
+    print(llm_client.cache.statistik())
\ No newline at end of file